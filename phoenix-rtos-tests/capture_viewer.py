@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+import argparse
+
+from trunner.capture import print_lines, print_summary, read_capture, split_lines
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Program shows timing of the DUT input and output saved by the runner with --timestamps: "
+                    "gaps between received lines and time from sending a line to the first received byte."
+    )
+
+    parser.add_argument("capture", type=argparse.FileType("rb"), help="capture.bin file from the log directory")
+    parser.add_argument("-l", "--lines", action="store_true", help="Print every line with its timing")
+    parser.add_argument("--encoding", default="utf-8", help="Encoding of the DUT output. Defaults to %(default)s")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    lines = split_lines(list(read_capture(args.capture)), args.encoding)
+    if args.lines:
+        print_lines(lines)
+
+    print_summary(lines)
+
+
+if __name__ == "__main__":
+    main()
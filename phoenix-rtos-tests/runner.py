@@ -7,8 +7,9 @@ from pathlib import Path
 from typing import Dict, List, Tuple, Type
 
 import trunner
-from trunner import resolve_project_path
+from trunner import aio, resolve_project_path
 from trunner.extensions import ExtensionError, load_extensions
+from trunner.farm import FarmRunner, farm_contexts
 from trunner.host import EmulatorHost, Host, RpiHost
 from trunner import TestRunner
 from trunner.dut import PortError
@@ -104,14 +105,24 @@ def parse_args(targets: Dict[str, Type[TargetBase]], hosts: Dict[str, Type[Host]
         help="Stream the DUT output during the test execution. Defaults to %(default)s",
     )
 
+    parser.add_argument(
+        "--async-io",
+        default=False,
+        action="store_true",
+        help=(
+            "Multiplex the I/O of the DUT and helper processes (phoenixd, openocd, gdb) "
+            "in a single asyncio event loop instead of reading every stream separately."
+        ),
+    )
+
     parser.add_argument(
         "-O",
         "--output",
         action="store",
         const="report.xml",
         nargs='?',
-        help=("Write machine-readable test results as csv and xml file. "
-              "When no value is provided uses %(const)s"),
+        help=("Write machine-readable test results as csv and xml file, boot telemetry as json file "
+              "and the journal of results as jsonl file. When no value is provided uses %(const)s"),
     )
 
     parser.add_argument(
@@ -127,6 +138,16 @@ def parse_args(targets: Dict[str, Type[TargetBase]], hosts: Dict[str, Type[Host]
         help="Specify the connection speed of serial. By default uses %(default)d",
     )
 
+    parser.add_argument(
+        "--farm",
+        default=False,
+        action="store_true",
+        help=(
+            "Run the campaign on all connected boards of the target at once. Boards are found by the serial "
+            "port hint of the target, tests are distributed between them. Implies --async-io."
+        ),
+    )
+
     parser.add_argument(
         "--no-flash",
         default=False,
@@ -134,6 +155,23 @@ def parse_args(targets: Dict[str, Type[TargetBase]], hosts: Dict[str, Type[Host]
         help="Board will not be flashed by runner.",
     )
 
+    parser.add_argument(
+        "--force-flash",
+        default=False,
+        action="store_true",
+        help="Flash the board even if the runner knows it already holds the image.",
+    )
+
+    parser.add_argument(
+        "--delta-flash",
+        default=False,
+        action="store_true",
+        help=(
+            "Copy only the parts of the image that changed since the board was flashed last time. "
+            "Manifests of flashed images are kept in $TRUNNER_STATE_DIR (default ~/.cache/trunner)."
+        ),
+    )
+
     parser.add_argument(
         "--no-test",
         default=False,
@@ -176,6 +214,27 @@ def parse_args(targets: Dict[str, Type[TargetBase]], hosts: Dict[str, Type[Host]
         type=is_dir,
     )
 
+    parser.add_argument(
+        "--resume",
+        default=False,
+        action="store_true",
+        help=(
+            "Resume the interrupted test campaign: tests which already finished according to the result journal "
+            "written next to --output results are not run again and reports are built from the journal. "
+            "Requires --output."
+        ),
+    )
+
+    parser.add_argument(
+        "--timestamps",
+        default=False,
+        action="store_true",
+        help=(
+            "Save the DUT input and output with host timestamps as capture.bin in the log directories "
+            "(requires --logdir). Show it with capture_viewer.py."
+        ),
+    )
+
     class keyValue(argparse.Action):
         def __call__(self, parser, namespace, values, option_string=None):
             kwargs = getattr(namespace, self.dest)
@@ -211,6 +270,12 @@ def parse_args(targets: Dict[str, Type[TargetBase]], hosts: Dict[str, Type[Host]
     if not args.test:
         args.test = [resolve_project_path()]
 
+    if args.resume and not args.output:
+        parser.error("--resume requires --output")
+
+    if args.timestamps and not args.logdir:
+        parser.error("--timestamps requires --logdir")
+
     if args.output and "." in args.output:
         # remove extension for output stem if possibly exists
         args.output = args.output.rsplit(".", 1)[0]
@@ -261,6 +326,9 @@ def main():
 
     args = parse_args(targets, hosts)
 
+    if args.async_io or args.farm:
+        aio.enable()
+
     ctx = TestContext(
         port=args.port,
         baudrate=args.baudrate,
@@ -273,6 +341,10 @@ def main():
         stream_output=args.stream,
         output=args.output,
         kwargs=args.kwargs,
+        delta_flash=args.delta_flash,
+        force_flash=args.force_flash,
+        timestamps=args.timestamps,
+        resume=args.resume,
     )
 
     host_cls = hosts[args.host]
@@ -280,6 +352,20 @@ def main():
     ctx = dataclasses.replace(ctx, host=host)
 
     target_cls = targets[args.target]
+
+    if args.farm:
+        try:
+            ctxs = farm_contexts(ctx, target_cls)
+        except PortError as e:
+            print(e)
+            return 2
+
+        # Set global context, targets of all boards are the same
+        trunner.ctx = ctxs[0]
+
+        runner = FarmRunner(ctxs, test_paths=args.test)
+        return 0 if runner.run() else 1
+
     try:
         target = target_cls.from_context(ctx)
     except PortError as e:
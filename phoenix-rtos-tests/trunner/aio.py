@@ -0,0 +1,382 @@
+"""Asyncio based I/O core for DUTs and helper processes.
+
+Every serial port and spawned process is registered as a stream in a single asyncio event loop that runs in
+a background thread. The loop reads all streams as soon as data arrives and buffers it, so helper processes
+(phoenixd, openocd, gdb) no longer need dedicated reader threads to keep their output drained.
+
+Harnesses keep using the synchronous pexpect API: StreamSpawn subclasses pexpect SpawnBase, so expect(),
+expect_exact(), before, buffer and logfiles work as with pexpect.spawn and pexpect.fdpexpect.fdspawn.
+
+The core is disabled by default. When it is enabled with enable(), the spawn() and fdspawn() factories
+return stream objects instead of the pexpect ones.
+"""
+
+import asyncio
+import concurrent.futures
+import errno
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import pexpect
+import pexpect.fdpexpect
+import ptyprocess
+from pexpect.exceptions import EOF, TIMEOUT, ExceptionPexpect
+from pexpect.spawnbase import SpawnBase
+from pexpect.utils import split_command_line, which
+
+
+_enabled = False
+
+
+def enable(enabled: bool = True):
+    """Makes spawn() and fdspawn() return streams multiplexed by the shared event loop."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def spawn(command, args=None, **kwargs):
+    """Drop-in replacement for pexpect.spawn that uses the asyncio I/O core if it's enabled."""
+    if _enabled:
+        return ProcessStreamSpawn(command, args, **kwargs)
+
+    return pexpect.spawn(command, [] if args is None else args, **kwargs)
+
+
+def fdspawn(fd, *args, **kwargs):
+    """Drop-in replacement for pexpect.fdpexpect.fdspawn that uses the asyncio I/O core if it's enabled."""
+    if _enabled:
+        return FdStreamSpawn(fd, *args, **kwargs)
+
+    return pexpect.fdpexpect.fdspawn(fd, *args, **kwargs)
+
+
+class EventLoop:
+    """Asyncio event loop shared by all streams, running in a background daemon thread."""
+
+    _instance: Optional["EventLoop"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="trunner-aio", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "EventLoop":
+        """Returns the shared event loop, starting it on first use."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+
+            return cls._instance
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def call(self, fn: Callable, *args):
+        """Calls fn(*args) in the loop thread, waits for it and returns its result."""
+        if self.in_loop_thread():
+            return fn(*args)
+
+        future = concurrent.futures.Future()
+
+        def wrapper():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(wrapper)
+        return future.result()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Runs coroutine in the loop from another thread and returns its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+class StreamSpawn(SpawnBase):
+    """Pexpect-compatible synchronous facade over a file descriptor read by the shared event loop.
+
+    Data read by the loop is kept in a buffer until read_nonblocking() consumes it, which is what all
+    pexpect expect methods build on. Streams that are not interesting after some point can be switched
+    to drain mode with drain(), in which the loop passes all data straight to the logfiles.
+
+    Attributes:
+        on_receive: If set, called in the loop thread with every chunk of raw data read from the stream and
+            the monotonic time of reading it.
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        timeout=30,
+        maxread=2000,
+        searchwindowsize=None,
+        logfile=None,
+        encoding=None,
+        codec_errors="strict",
+    ):
+        super().__init__(timeout, maxread, searchwindowsize, logfile, encoding=encoding, codec_errors=codec_errors)
+        self.child_fd = fd
+        self.closed = False
+        self._io = EventLoop.get()
+        self._cond = threading.Condition()
+        self._pending = bytearray()
+        self._eof = False
+        self._draining = False
+        self._attached = False
+        self.on_receive: Optional[Callable[[bytes, float], None]] = None
+
+        self._io.call(self._attach)
+
+    def _attach(self):
+        self._io.loop.add_reader(self.child_fd, self._on_readable)
+        self._attached = True
+
+    def _detach(self):
+        if self._attached:
+            self._io.loop.remove_reader(self.child_fd)
+            self._attached = False
+
+    def _on_readable(self):
+        # Called in the loop thread
+        try:
+            data = os.read(self.child_fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # EIO is returned by PTY master after the child exits (Linux-style EOF)
+            if e.errno not in (errno.EIO, errno.EBADF):
+                self._log_error(e)
+            data = b""
+
+        if data and self.on_receive is not None:
+            self.on_receive(data, time.monotonic())
+
+        with self._cond:
+            if not data:
+                self._detach()
+                self._eof = True
+            elif self._draining:
+                self._log(self._decoder.decode(data, final=False), "read")
+            else:
+                self._pending += data
+
+            self._cond.notify_all()
+
+    def _log_error(self, exc: Exception):
+        if self.logfile is not None:
+            self.logfile.write(f"\n[trunner: read error: {exc}]\n")
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        """Returns up to size decoded characters received from the stream.
+
+        Waits up to timeout seconds for the data (self.timeout if timeout is -1, forever if None). Raises
+        TIMEOUT if nothing was received in time and EOF if the stream has ended and the buffer is empty.
+        """
+
+        if timeout == -1:
+            timeout = self.timeout
+
+        with self._cond:
+            if not self._pending and not self._eof:
+                self._cond.wait_for(lambda: self._pending or self._eof, timeout)
+
+            data = bytes(self._pending[:size])
+            del self._pending[:size]
+
+            if not data:
+                if self._eof:
+                    self.flag_eof = True
+                    raise EOF("End Of File (EOF).")
+
+                raise TIMEOUT("Timeout exceeded.")
+
+        s = self._decoder.decode(data, final=False)
+        self._log(s, "read")
+        return s
+
+    def drain(self):
+        """Stops buffering received data, from now on it's only passed to logfiles.
+
+        It's intended for helper processes which must have their output read constantly, but that output
+        isn't needed apart from logs.
+        """
+
+        with self._cond:
+            if self._pending:
+                self._log(self._decoder.decode(bytes(self._pending), final=False), "read")
+                self._pending.clear()
+
+            self._draining = True
+
+    def send(self, s):
+        """Sends string s to the stream, returns number of bytes written."""
+        s = self._coerce_send_string(s)
+        self._log(s, "send")
+
+        b = self._encoder.encode(s, final=False)
+        return os.write(self.child_fd, b)
+
+    def sendline(self, s=""):
+        n = self.send(s)
+        return n + self.send(self.linesep)
+
+    def write(self, s):
+        self.send(s)
+
+    def writelines(self, sequence):
+        for s in sequence:
+            self.send(s)
+
+    def _stop(self):
+        """Stops reading the file descriptor, it can be closed afterwards."""
+        if self.child_fd != -1:
+            self._io.call(self._detach)
+
+
+class FdStreamSpawn(StreamSpawn):
+    """Stream for a file descriptor opened by the caller, for example serial port.
+
+    Unlike pexpect fdspawn, close() doesn't close the file descriptor, it only stops reading it. The owner of
+    the descriptor (e.g. pyserial) closes it.
+    """
+
+    def __init__(self, fd, args=None, **kwargs):  # pylint: disable=unused-argument
+        if not isinstance(fd, int) and hasattr(fd, "fileno"):
+            fd = fd.fileno()
+
+        if not isinstance(fd, int):
+            raise ExceptionPexpect("The fd argument is not an int")
+
+        self.args = None
+        self.command = None
+        super().__init__(fd, **kwargs)
+        self.name = f"<file descriptor {fd}>"
+
+    def isalive(self):
+        if self.child_fd == -1:
+            return False
+
+        try:
+            os.fstat(self.child_fd)
+            return True
+        except OSError:
+            return False
+
+    def close(self):
+        self._stop()
+        self.child_fd = -1
+        self.closed = True
+
+
+class ProcessStreamSpawn(StreamSpawn):
+    """Stream for a process spawned in a PTY, the counterpart of pexpect.spawn."""
+
+    def __init__(
+        self,
+        command,
+        args=None,
+        cwd=None,
+        env=None,
+        echo=True,
+        preexec_fn=None,
+        dimensions=None,
+        **kwargs,
+    ):
+        if args is None:
+            argv = split_command_line(command)
+        else:
+            argv = [command, *args]
+
+        resolved = which(argv[0], env=env)
+        if resolved is None:
+            raise ExceptionPexpect(f"The command was not found or was not executable: {argv[0]}.")
+
+        argv[0] = resolved
+        self.command = resolved
+        self.args = argv
+
+        spawn_kwargs = {"cwd": cwd, "env": env, "echo": echo, "preexec_fn": preexec_fn}
+        if dimensions is not None:
+            spawn_kwargs["dimensions"] = dimensions
+
+        self.ptyproc = ptyprocess.PtyProcess.spawn(argv, **spawn_kwargs)
+
+        super().__init__(self.ptyproc.fd, **kwargs)
+        self.pid = self.ptyproc.pid
+        self.terminated = False
+        self.name = f"<{' '.join(argv)}>"
+
+    def send(self, s):
+        # Keep pexpect.spawn behaviour, some programs drop input sent right after they print a prompt
+        if self.delaybeforesend is not None:
+            time.sleep(self.delaybeforesend)
+
+        return super().send(s)
+
+    def _log_control(self, byte):
+        if self.encoding is not None:
+            byte = byte.decode(self.encoding, "replace")
+
+        self._log(byte, "send")
+
+    def sendcontrol(self, char):
+        """Sends control character char (e.g. "c" for Ctrl-C) to the process, returns number of bytes written."""
+        n, byte = self.ptyproc.sendcontrol(char)
+        self._log_control(byte)
+        return n
+
+    def sendeof(self):
+        """Sends the EOF character of the PTY, the process reads end of file if it's at the beginning of line."""
+        _, byte = self.ptyproc.sendeof()
+        self._log_control(byte)
+
+    def sendintr(self):
+        """Sends the interrupt character of the PTY, the process gets SIGINT."""
+        _, byte = self.ptyproc.sendintr()
+        self._log_control(byte)
+
+    def _update_status(self):
+        self.status = self.ptyproc.status
+        self.exitstatus = self.ptyproc.exitstatus
+        self.signalstatus = self.ptyproc.signalstatus
+        self.terminated = self.ptyproc.terminated
+
+    def isalive(self):
+        alive = self.ptyproc.isalive()
+        if not alive:
+            self._update_status()
+
+        return alive
+
+    def wait(self):
+        """Waits until the child exits and returns its exit status."""
+        self.ptyproc.wait()
+        self._update_status()
+        return self.exitstatus
+
+    def kill(self, sig):
+        if self.isalive():
+            os.kill(self.pid, sig)
+
+    def terminate(self, force=False):
+        return self.ptyproc.terminate(force=force)
+
+    def close(self, force=True):
+        """Stops reading the process output, closes PTY and terminates the process."""
+        self._stop()
+        self.ptyproc.close(force=force)
+        self.isalive()
+        self.child_fd = -1
+        self.closed = True
@@ -0,0 +1,216 @@
+"""Timestamped capture of the DUT input and output.
+
+Text logs of the DUT show what was exchanged, but not when. The capture keeps every chunk received from or sent
+to the DUT together with the monotonic host time of its arrival (or sending) in a compact binary file. Each
+record is a header (time in seconds, direction, payload length) followed by the raw payload.
+
+With the asyncio I/O core received chunks are timestamped in the event loop as soon as they are read from the
+port, with plain pexpect when the harness consumes them.
+
+The capture can be inspected with capture_viewer.py.
+"""
+
+import bisect
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, TextIO
+
+HEADER = struct.Struct("<dBI")
+
+RECEIVED = 0
+SENT = 1
+
+
+@dataclass
+class Chunk:
+    """Chunk of data exchanged with the DUT.
+
+    Attributes:
+        time: Monotonic host time in seconds.
+        direction: RECEIVED or SENT.
+        data: Raw bytes of the chunk.
+    """
+
+    time: float
+    direction: int
+    data: bytes
+
+
+class Capture:
+    """In-memory capture of the data exchanged with the DUT, saved to a file after a test."""
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self._records = bytearray()
+        self._lock = threading.Lock()
+
+    def record(self, direction: int, data: bytes, at: Optional[float] = None):
+        if not data:
+            return
+
+        if at is None:
+            at = time.monotonic()
+
+        with self._lock:
+            self._records += HEADER.pack(at, direction, len(data))
+            self._records += data
+
+    def received(self, data: bytes, at: Optional[float] = None):
+        self.record(RECEIVED, data, at)
+
+    def sent(self, data: bytes, at: Optional[float] = None):
+        self.record(SENT, data, at)
+
+    def tee(self, log: TextIO, direction: int) -> "CaptureLog":
+        """Returns a logfile for pexpect that writes to log and records the written text."""
+        return CaptureLog(self, log, direction)
+
+    def getvalue(self) -> bytes:
+        with self._lock:
+            return bytes(self._records)
+
+
+class CaptureLog:
+    """Pexpect logfile that passes the text to the wrapped log and records it in the capture."""
+
+    def __init__(self, capture: Capture, log: Optional[TextIO], direction: int):
+        self.capture = capture
+        self.log = log
+        self.direction = direction
+
+    def write(self, message):
+        data = message.encode(self.capture.encoding, errors="replace") if isinstance(message, str) else message
+        self.capture.record(self.direction, data)
+
+        if self.log is not None:
+            self.log.write(message)
+
+    def flush(self):
+        if self.log is not None:
+            self.log.flush()
+
+
+def read_capture(f: BinaryIO) -> Iterator[Chunk]:
+    while True:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+
+        at, direction, size = HEADER.unpack(header)
+        data = f.read(size)
+        if len(data) < size:
+            # capture truncated by crash of the runner
+            return
+
+        yield Chunk(at, direction, data)
+
+
+@dataclass
+class Line:
+    """Line of the exchanged data.
+
+    Attributes:
+        start: Time of the first byte of the line.
+        end: Time of the last byte (newline included) of the line.
+        direction: RECEIVED or SENT.
+        text: Decoded line without the line terminator.
+        latency: For sent lines - time from the last byte sent to the first byte received afterwards.
+    """
+
+    start: float
+    end: float
+    direction: int
+    text: str
+    latency: Optional[float] = None
+
+
+def split_lines(chunks: List[Chunk], encoding: str = "utf-8") -> List[Line]:
+    """Splits the chunks into lines of each direction, keeping the times of their first and last byte."""
+
+    lines: List[Line] = []
+    partial = {}
+    ended_cr = {}
+
+    for chunk in chunks:
+        for part in chunk.data.splitlines(keepends=True):
+            if part == b"\n" and ended_cr.get(chunk.direction) and chunk.direction not in partial:
+                # second half of CRLF split between chunks
+                ended_cr[chunk.direction] = False
+                continue
+
+            start, data = partial.pop(chunk.direction, (chunk.time, b""))
+            data += part
+            if not data.endswith((b"\n", b"\r")):
+                partial[chunk.direction] = (start, data)
+                continue
+
+            ended_cr[chunk.direction] = data.endswith(b"\r")
+            text = data.rstrip(b"\r\n").decode(encoding, errors="replace")
+            lines.append(Line(start, chunk.time, chunk.direction, text))
+
+    for direction, (start, data) in partial.items():
+        lines.append(Line(start, chunks[-1].time, direction, data.decode(encoding, errors="replace")))
+
+    lines.sort(key=lambda line: line.start)
+
+    received = [chunk.time for chunk in chunks if chunk.direction == RECEIVED]
+    received.sort()
+    for line in lines:
+        if line.direction != SENT:
+            continue
+
+        idx = bisect.bisect_left(received, line.end)
+        if idx < len(received):
+            line.latency = received[idx] - line.end
+
+    return lines
+
+
+def _format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:9.3f}"
+
+
+def print_lines(lines: List[Line], out: TextIO = sys.stdout):
+    """Prints lines with time since the first one and the gap since the previous line of the same direction."""
+
+    if not lines:
+        return
+
+    origin = lines[0].start
+    last_end = {}
+
+    out.write(f"{'time[ms]':>9} {'gap[ms]':>9} {'resp[ms]':>9}\n")
+    for line in lines:
+        prev = last_end.get(line.direction)
+        gap = _format_ms(line.start - prev) if prev is not None else " " * 9
+        latency = _format_ms(line.latency) if line.latency is not None else " " * 9
+        marker = ">" if line.direction == SENT else "<"
+        out.write(f"{_format_ms(line.start - origin)} {gap} {latency} {marker} {line.text}\n")
+        last_end[line.direction] = line.end
+
+
+def print_summary(lines: List[Line], out: TextIO = sys.stdout):
+    """Prints the largest gaps between received lines and the response times of sent lines."""
+
+    received = [line for line in lines if line.direction == RECEIVED]
+    gaps = sorted(
+        ((cur.start - prev.end, cur) for prev, cur in zip(received, received[1:])),
+        key=lambda gap: gap[0],
+        reverse=True,
+    )
+
+    out.write("Largest gaps between received lines [ms]:\n")
+    for gap, line in gaps[:10]:
+        out.write(f"{_format_ms(gap)}  before: {line.text}\n")
+
+    latencies = [line for line in lines if line.latency is not None]
+    if latencies:
+        values = sorted(line.latency for line in latencies)
+        out.write(
+            f"Response to sent lines [ms]: count {len(values)}, min {_format_ms(values[0]).strip()}, "
+            f"median {_format_ms(values[len(values) // 2]).strip()}, max {_format_ms(values[-1]).strip()}\n"
+        )
+
@@ -24,7 +24,13 @@ class TestContext:
         should_test: True if tests should be run.
         verbosity: Verbose level of the output of tests.
         stream_output: Stream DUT output to stdout during test execution.
-        output: If not None - file name stem to store the test results ([stem].csv, [stem].xml).
+        output: If not None - file name stem to store the test results ([stem].csv, [stem].xml),
+            telemetry ([stem].telemetry.json) and the result journal ([stem].journal.jsonl).
+        delta_flash: Flash only the blocks of the image that changed since the board was flashed last time.
+        force_flash: Flash the device even if it already holds the image.
+        timestamps: Save timestamped DUT input and output (capture.bin) next to the logs in logdir.
+        resume: Take results of the tests that already finished from the result journal
+            ([stem].journal.jsonl) of the interrupted campaign and run only the remaining tests.
     """
 
     port: Optional[str]
@@ -40,3 +46,7 @@ class TestContext:
     kwargs: dict = field(default_factory=dict)
     target: Optional[TargetBase] = None
     host: Optional[Host] = None
+    delta_flash: bool = False
+    force_flash: bool = False
+    timestamps: bool = False
+    resume: bool = False
@@ -8,9 +8,11 @@ from typing import Any, Optional, Tuple
 import termios
 import pexpect
 from pexpect.exceptions import EOF
-import pexpect.fdpexpect
 import serial
 
+from trunner import aio
+from trunner.capture import RECEIVED, SENT, Capture
+
 
 class PortError(Exception):
     pass
@@ -44,6 +46,7 @@ class Dut(ABC):
     def __init__(self):
         self.pexpect_proc = None
         self._logfiles: Optional[Tuple[StringIO, StringIO, StringIO]] = None
+        self._capture: Optional[Capture] = None
 
     def __getattr__(self, __name: str) -> Any:
         return getattr(self.pexpect_proc, __name)
@@ -54,8 +57,14 @@ class Dut(ABC):
         except AttributeError:
             setattr(self.pexpect_proc, __name, __value)
 
-    def set_logfiles(self, rd: StringIO, wr: StringIO, all: StringIO):
+    def set_logfiles(self, rd: StringIO, wr: StringIO, all: StringIO, capture: Optional[Capture] = None):
+        """Sets logs of the DUT output, input and both of them.
+
+        If capture is given, every chunk of the input and output is also recorded there with a timestamp.
+        """
+
         self._logfiles = rd, wr, all
+        self._capture = capture
         self._set_logfiles()
 
     def get_logfiles(self) -> Tuple[StringIO, StringIO, StringIO]:
@@ -64,11 +73,30 @@ class Dut(ABC):
 
         return self._logfiles
 
+    def get_capture(self) -> Optional[Capture]:
+        return self._capture
+
     def _set_logfiles(self):
-        if self.pexpect_proc and self._logfiles is not None:
-            self.pexpect_proc.logfile_read = self._logfiles[0]
-            self.pexpect_proc.logfile_send = self._logfiles[1]
-            self.pexpect_proc.logfile = self._logfiles[2]
+        if not self.pexpect_proc or self._logfiles is None:
+            return
+
+        logfile_read, logfile_send, logfile = self._logfiles
+        on_receive = None
+
+        if self._capture is not None:
+            logfile_send = self._capture.tee(logfile_send, SENT)
+            if isinstance(self.pexpect_proc, aio.StreamSpawn):
+                # timestamp the data when the event loop reads it, not when a harness gets to it
+                on_receive = self._capture.received
+            else:
+                logfile_read = self._capture.tee(logfile_read, RECEIVED)
+
+        if isinstance(self.pexpect_proc, aio.StreamSpawn):
+            self.pexpect_proc.on_receive = on_receive
+
+        self.pexpect_proc.logfile_read = logfile_read
+        self.pexpect_proc.logfile_send = logfile_send
+        self.pexpect_proc.logfile = logfile
 
     def read(self, size: int = 512, timeout: float = 0.1) -> str:
         """read out RAW output from the DUT with configurable timeout"""
@@ -132,6 +160,9 @@ class SerialDut(Dut):
             return
 
         self.pexpect_proc.flush()
+        if isinstance(self.pexpect_proc, aio.FdStreamSpawn):
+            # stop reading the port in the event loop before pyserial closes it
+            self.pexpect_proc.close()
         self.serial.close()
 
     def open(self):
@@ -140,7 +171,7 @@ class SerialDut(Dut):
         except serial.SerialException as e:
             raise PortError(e) from e
 
-        self.pexpect_proc = pexpect.fdpexpect.fdspawn(self.serial, *self.args, **self.kwargs)
+        self.pexpect_proc = aio.fdspawn(self.serial, *self.args, **self.kwargs)
 
 
 class ProcessDut(Dut):
@@ -157,7 +188,7 @@ class ProcessDut(Dut):
             self.pexpect_proc.close()
 
     def open(self):
-        self.pexpect_proc = pexpect.spawn(*self.args, **self.kwargs)
+        self.pexpect_proc = aio.spawn(*self.args, **self.kwargs)
         self._set_logfiles()
 
     def set_args(self, *args, **kwargs):
@@ -201,7 +232,7 @@ class QemuDut(ProcessDut):
         # qemu when using stdio serial enforces ONLCR termios flag (converting `\n` to `\r\n`)
         # on proper guest OSes this results in `\r\r\n` which might be incorrectly interpreted by CI log viewers
         # use custom preexec_fn to setup termios of child PTY
-        self.pexpect_proc = pexpect.spawn(*self.args, preexec_fn=self._set_termios_raw, **self.kwargs)
+        self.pexpect_proc = aio.spawn(*self.args, preexec_fn=self._set_termios_raw, **self.kwargs)
         self._set_logfiles()
 
 
@@ -0,0 +1,224 @@
+import dataclasses
+import math
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Sequence, Type
+
+from trunner.ctx import TestContext
+from trunner.dut import PortError
+from trunner.harness import BootLock
+from trunner.target import TargetBase, find_ports
+from trunner.test_runner import TestRunner, _add_tests_module_to_syspath, init_logdir, save_logfiles, set_logfiles
+from trunner.types import TestOptions, TestResult
+
+
+def board_name(ctx: TestContext) -> str:
+    """Returns the short name of the board used in farm mode output (name of its serial port)."""
+    return Path(ctx.port).name
+
+
+def farm_contexts(ctx: TestContext, target_cls: Type[TargetBase]) -> List[TestContext]:
+    """Returns a context with a separate target instance for every connected board of target_cls.
+
+    Boards are found by the port_hint of the target class. Every board logs to its own subdirectory of
+    logdir. Streaming output is disabled, as outputs of several boards would be interleaved.
+    """
+
+    if target_cls.port_hint is None:
+        raise PortError(f"Target {target_cls.name} doesn't use serial ports, farm mode is not supported")
+
+    ports = find_ports(target_cls.port_hint)
+    if not ports:
+        raise PortError(
+            "Couldn't find any port to communicate with devices! Make sure devices are connected. "
+            f"Hint used to find ports: {target_cls.port_hint}"
+        )
+
+    hosts = [ctx.host.board_host(port) for port in ports]
+    if len(ports) > 1 and ctx.host.has_gpio() and any(host is ctx.host for host in hosts):
+        raise PortError(
+            f"Host {ctx.host.name} controls only one board using GPIO, it can't be used in farm mode "
+            f"with {len(ports)} boards connected"
+        )
+
+    ctxs = []
+    for port, host in zip(ports, hosts):
+        board_ctx = dataclasses.replace(
+            ctx,
+            port=port,
+            host=host,
+            stream_output=False,
+            logdir=f"{ctx.logdir}/{Path(port).name}" if ctx.logdir else None,
+        )
+        board_ctx = dataclasses.replace(board_ctx, target=target_cls.from_context(board_ctx))
+        ctxs.append(host.add_to_context(board_ctx))
+
+    return ctxs
+
+
+class WorkStealingQueue:
+    """Queue of tests shared by the farm workers.
+
+    Tests are split into contiguous chunks, one for each worker, so consecutive tests (usually from the
+    same yaml) run on the same board in the original order. A worker that runs out of its own tests steals
+    them from the back of the longest chunk left.
+    """
+
+    def __init__(self, items: Sequence, workers: int):
+        self._lock = threading.Lock()
+        size = math.ceil(len(items) / workers) if workers else 0
+        self._queues = [deque(items[i * size:(i + 1) * size]) for i in range(workers)]
+
+    def get(self, worker: int):
+        """Returns the next item for the worker or None if there is nothing left."""
+
+        with self._lock:
+            own = self._queues[worker]
+            if own:
+                return own.popleft()
+
+            victim = max(self._queues, key=len)
+            if victim:
+                return victim.pop()
+
+            return None
+
+
+class FarmRunner:
+    """Runs a test campaign on several boards of the same target at once.
+
+    Every board has its own TestRunner, target and DUT, and is driven by a separate worker thread. Tests are
+    dispatched between boards with work stealing. Results are reported in the order of tests, as if the
+    campaign was run on a single board, only the jUnit XML report gets them in the order they finish.
+
+    Plo USB devices of different boards have the same vid:pid, so it's not possible to tell them apart.
+    Every reboot brings up plo and its USB device, so boards are flashed one by one and the boards share
+    the boot lock of their targets. It's held from the reboot until the bootloader stage (e.g. loading
+    applications with phoenixd) ends, the tests themselves run on all boards at once.
+    """
+
+    def __init__(self, ctxs: Sequence[TestContext], test_paths):
+        self.runners = [TestRunner(ctx, test_paths) for ctx in ctxs]
+        self.plo_lock = threading.Lock()
+        self.print_lock = threading.Lock()
+
+    def _print(self, runner: TestRunner, msg: str):
+        with self.print_lock:
+            print(f"[{board_name(runner.ctx)}] {msg}", end="", flush=True)
+
+    def _work(
+        self,
+        worker: int,
+        runner: TestRunner,
+        tests: Sequence[TestOptions],
+        queue: WorkStealingQueue,
+        results: Dict[int, TestResult],
+    ):
+        # Ensure first test will start with reboot
+        last_test_failed = True
+
+        while True:
+            idx = queue.get(worker)
+            if idx is None:
+                break
+
+            test = tests[idx]
+
+            try:
+                result = runner.run_test(test, last_test_failed)
+            except Exception:  # pylint: disable=broad-except
+                # The board is unusable (e.g. disconnected), leave the remaining tests to other boards
+                result = TestResult(test.name)
+                result.fail_unknown_exception()
+                results[idx] = result
+                self.runners[0].add_result(result)
+                self._print(runner, f"{test.name}: {result.to_str(runner.ctx.verbosity)}")
+                break
+
+            results[idx] = result
+            self.runners[0].add_result(result)
+            self._print(runner, f"{test.name}: {result.to_str(runner.ctx.verbosity)}")
+
+            if result.is_skip():
+                continue
+
+            last_test_failed = result.is_fail()
+            save_logfiles(runner.target.dut, result.shortname, runner.ctx.logdir)
+
+    def run(self) -> bool:
+        """Runs the entire test campaign on all boards.
+
+        Returns true if there are no failed tests.
+        """
+
+        # Harnesses are bound to the DUT of the board, so every board needs its own test options
+        tests = [runner.parse_tests() for runner in self.runners]
+
+        for runner in self.runners:
+            init_logdir(runner.ctx.logdir, clear=not runner.ctx.resume)
+
+        main = self.runners[0]
+        main.start_report()
+        results: List[TestResult] = []
+        active = []
+
+        for runner, board_tests in zip(self.runners, tests):
+            if runner.needs_flash():
+                name = f"flash:{board_name(runner.ctx)}"
+                flash_result = main.resumed_flash(name)
+                if flash_result is None:
+                    set_logfiles(runner.target.dut, runner.ctx)
+                    flash_result = runner.flash(name=name)
+                    save_logfiles(runner.target.dut, "flash", runner.ctx.logdir)
+                    main.add_result(flash_result)
+
+                results.append(flash_result)
+
+                if not flash_result.is_ok():
+                    continue
+
+            active.append((runner, board_tests))
+
+        if main.ctx.should_test and active:
+            _add_tests_module_to_syspath(main.ctx.project_path)
+
+            test_results: Dict[int, TestResult] = {}
+            for idx, test in enumerate(tests[0]):
+                result = main.resumed_result(test.name)
+                if result is not None:
+                    test_results[idx] = result
+
+            for runner, _ in active:
+                runner.target.boot_lock = BootLock(self.plo_lock)
+
+            pending = [idx for idx in range(len(tests[0])) if idx not in test_results]
+            queue = WorkStealingQueue(pending, len(active))
+            print(f"Running {len(pending)} tests on {len(active)} boards: "
+                  + ", ".join(board_name(runner.ctx) for runner, _ in active))
+
+            threads = [
+                threading.Thread(
+                    target=self._work,
+                    args=(worker, runner, board_tests, queue, test_results),
+                    name=f"farm-{board_name(runner.ctx)}",
+                )
+                for worker, (runner, board_tests) in enumerate(active)
+            ]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            for idx, test in enumerate(tests[0]):
+                if idx not in test_results:
+                    # All workers gave up before running this test
+                    test_results[idx] = TestResult(test.name)
+                    test_results[idx].fail("Test was not run, none of the boards is usable")
+                    main.add_result(test_results[idx])
+
+                results.append(test_results[idx])
+
+        return main.report(results)
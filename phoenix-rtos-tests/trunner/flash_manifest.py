@@ -0,0 +1,127 @@
+"""Host-side record of the images flashed to boards.
+
+After a successful flash the runner stores a manifest of the image for the board: its size, digest and
+hashes of fixed-size blocks. Comparing it with the manifest of a new image gives the blocks that have to be
+written to update the flash, so only they are transferred (delta flashing).
+
+Manifests are kept in the state directory and keyed by the serial number of the board's debug probe, so they
+stay valid when boards are reconnected to other ports.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from trunner.state import state_dir
+
+
+BLOCK_SIZE = 0x10000
+
+
+def manifest_path(board: str, memory_bank: str) -> Path:
+    name = re.sub(r"[^\w.-]", "_", f"{board}-{memory_bank}")
+    return state_dir() / "flash" / f"{name}.json"
+
+
+@dataclass
+class FlashManifest:
+    """Manifest of the image flashed to the memory bank of a board.
+
+    Attributes:
+        size: Size of the image in bytes.
+        digest: SHA-256 of the whole image.
+        block_size: Size of the blocks the image is split into.
+        blocks: SHA-256 of the image blocks, the last one can be shorter.
+    """
+
+    size: int
+    digest: str
+    block_size: int = BLOCK_SIZE
+    blocks: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_image(cls, path, block_size: int = BLOCK_SIZE) -> "FlashManifest":
+        image_hash = hashlib.sha256()
+        blocks = []
+        size = 0
+
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+
+                image_hash.update(block)
+                blocks.append(hashlib.sha256(block).hexdigest())
+                size += len(block)
+
+        return cls(size=size, digest=image_hash.hexdigest(), block_size=block_size, blocks=blocks)
+
+    @classmethod
+    def load(cls, path) -> Optional["FlashManifest"]:
+        """Returns the manifest stored in path, None if there is none or it can't be read."""
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def changed_runs(self, new: "FlashManifest") -> Optional[List[Tuple[int, int]]]:
+        """Returns (offset, size) runs of the new image which differ from this one.
+
+        Returns None if the images can't be compared block by block.
+        """
+
+        if new.block_size != self.block_size:
+            return None
+
+        runs = []
+        for idx, block in enumerate(new.blocks):
+            if idx < len(self.blocks) and self.blocks[idx] == block:
+                continue
+
+            offset = idx * new.block_size
+            size = min(new.block_size, new.size - offset)
+            if runs and runs[-1][0] + runs[-1][1] == offset:
+                runs[-1] = (runs[-1][0], runs[-1][1] + size)
+            else:
+                runs.append((offset, size))
+
+        return runs
+
+
+def coalesce_runs(runs: List[Tuple[int, int]], max_runs: int) -> List[Tuple[int, int]]:
+    """Merges the closest runs until there are at most max_runs of them.
+
+    Unchanged data between the merged runs is written again, which is cheaper than an extra copy command.
+    """
+
+    runs = list(runs)
+    while len(runs) > max_runs:
+        gaps = [runs[i + 1][0] - (runs[i][0] + runs[i][1]) for i in range(len(runs) - 1)]
+        i = gaps.index(min(gaps))
+        runs[i:i + 2] = [(runs[i][0], runs[i + 1][0] + runs[i + 1][1] - runs[i][0])]
+
+    return runs
@@ -3,6 +3,8 @@ from .base import (
     TerminalHarness,
     IntermediateHarness,
     VoidHarness,
+    BootLock,
+    BootLockReleaseHarness,
     RebooterHarness,
     TestStartRunningHarness,
     FlashError,
@@ -35,6 +37,8 @@ __all__ = [
     "IntermediateHarness",
     "VoidHarness",
     "Rebooter",
+    "BootLock",
+    "BootLockReleaseHarness",
     "RebooterHarness",
     "TestStartRunningHarness",
     "PloImageLoader",
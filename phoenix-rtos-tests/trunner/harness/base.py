@@ -1,11 +1,14 @@
+import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Set
 
 from trunner.text import bold
 from trunner.host import Host
 from trunner.dut import Dut
 from trunner.types import TestResult, TestStage, is_github_actions
+from trunner.reboot_profile import RebootProfile
+from trunner.usb import UsbWatcher
 
 
 class HarnessError(Exception):
@@ -71,26 +74,84 @@ class FlashError(ProcessError):
 
 
 class Rebooter:
-    """Class that provides all necessary methods needed for rebooting target device."""
+    """Class that provides all necessary methods needed for rebooting target device.
 
-    def __init__(self, host: Host, dut: Dut):
+    If the rebooter has a profile of the board, it records the boot time measured by the following stage
+    (see record_boot()) and tunes delays and timeouts based on it.
+
+    Attributes:
+        host: Host which controls the reset and power of the device.
+        dut: Device that is rebooted.
+        profile: Optional profile with boot times measured on the board.
+        released_at: Time (monotonic) of the last reset release, None if the boot is not being measured.
+    """
+
+    # vid:pid of the plo USB device, which has to disappear after reset
+    plo_usb = (0x16F9, 0x0003)
+    # Boot event which bounds the delays after reset release, the first one the board reaches after reboot
+    boot_event = "plo"
+
+    def __init__(self, host: Host, dut: Dut, profile: Optional[RebootProfile] = None):
         self.host = host
         self.dut = dut
+        self.profile = profile
+        self.released_at: Optional[float] = None
+        self._recorded: Set[str] = set()
+
+    def _released(self):
+        self.released_at = time.monotonic()
+        self._recorded.clear()
+
+    def boot_delay(self, default: float) -> float:
+        """Returns delay after reset release, default if boot time of the board is not known."""
+        if self.profile is None:
+            return default
+
+        return self.profile.delay(self.boot_event, default)
+
+    def boot_timeout(self, event: str, default: float) -> float:
+        """Returns timeout to wait for the boot event after reboot, default if it's not known."""
+        if self.profile is None or self.released_at is None:
+            return default
+
+        return self.profile.timeout(event, default)
+
+    def record_boot(self, event: str, at: Optional[float] = None):
+        """Records the time from the last reset release to the event, which occurred at given time (or just now).
+
+        Only the first occurrence of the event after the reset release is recorded.
+        """
+        if self.profile is None or self.released_at is None or event in self._recorded:
+            return
+
+        self._recorded.add(event)
+        self.profile.record(event, (time.monotonic() if at is None else at) - self.released_at)
 
     def _reboot_soft(self):
-        self.host.set_reset(0)
-        time.sleep(0.05)
-        self.dut.clear_buffer()
-        self.host.set_reset(1)
-        # delay needed for plo usb device to disappear
-        time.sleep(0.25)
+        with UsbWatcher(*self.plo_usb) as watcher:
+            plo_devices = watcher.devices()
+
+            self.host.set_reset(0)
+            # Reset has to be held long enough for the board to register it, it can't be measured
+            time.sleep(0.05)
+            self.dut.clear_buffer()
+            self.host.set_reset(1)
+            self._released()
+
+            # wait for plo usb device to disappear, if the board was in plo. It's not waited for longer than
+            # the board needs to boot, as the following stage waits for the board anyway.
+            deadline = self.released_at + self.boot_delay(0.25)
+            for device in plo_devices:
+                watcher.wait_for_removal(device, timeout=max(0.0, deadline - time.monotonic()))
 
     def _reboot_hard(self):
+        # Power off time is needed for the board to discharge, it can't be measured
         self.host.set_power(False)
         time.sleep(0.5)
         self.dut.clear_buffer()
         self.host.set_power(True)
-        time.sleep(0.5)
+        self._released()
+        time.sleep(self.boot_delay(0.5))
 
     def _reboot_dut_gpio(self, hard):
         if hard:
@@ -107,6 +168,7 @@ class Rebooter:
     def __call__(self, flash=False, hard=False):
         """Sets flash mode and perform hard or soft reboot based on `hard` flag."""
 
+        self.released_at = None
         self._set_flash_mode(flash)
 
         if self.host.has_gpio():
@@ -115,6 +177,10 @@ class Rebooter:
             # Perform rebooting with user interaction
             self._reboot_dut_text(hard=hard)
 
+        if flash:
+            # Boot in flash mode is different, don't measure it
+            self.released_at = None
+
 
 class HarnessBase(ABC):
     """Base class for harnesses functors that are tied together."""
@@ -172,20 +238,101 @@ class VoidHarness(TerminalHarness):
         return result
 
 
-class RebooterHarness(IntermediateHarness):
-    """Special harness to perform reboot of the device."""
+class BootLock:
+    """Lock taken by a board for the reboot and the bootloader stage that follows it.
+
+    In farm mode boards share the underlying lock, as plo USB devices of different boards can't be told
+    apart. Releasing the lock which is not held by the board does nothing.
+    """
+
+    def __init__(self, lock: threading.Lock):
+        self.lock = lock
+        self.held = False
+
+    def acquire(self):
+        if not self.held:
+            self.lock.acquire()
+            self.held = True
 
-    def __init__(self, rebooter, flash: bool = False, hard: bool = False):
+    def release(self):
+        if self.held:
+            self.held = False
+            self.lock.release()
+
+
+class RebooterHarness(IntermediateHarness):
+    """Special harness to perform reboot of the device.
+
+    Attributes:
+        rebooter: Rebooter of the device.
+        flash: If set, the device is rebooted to the flash mode.
+        hard: If set, the device is power cycled.
+        lock: Optional lock taken for the reboot.
+        keep_lock: If set, the lock is kept after the reboot, until BootLockReleaseHarness releases it (or
+            the following harnesses end).
+    """
+
+    def __init__(
+        self,
+        rebooter,
+        flash: bool = False,
+        hard: bool = False,
+        lock: Optional[BootLock] = None,
+        keep_lock: bool = False,
+    ):
         super().__init__()
         self.rebooter = rebooter
         self.flash = flash
         self.hard = hard
+        self.lock = lock
+        self.keep_lock = keep_lock
 
     def __call__(self, result: TestResult) -> TestResult:
         """Call rebooter with set flags and continue to execute the next harness."""
 
+        if self.lock is None:
+            return self._reboot(result)
+
+        self.lock.acquire()
+        try:
+            return self._reboot(result)
+        finally:
+            self.lock.release()
+
+    def _reboot(self, result: TestResult) -> TestResult:
         result.set_stage(TestStage.REBOOT)
         self.rebooter(flash=self.flash, hard=self.hard)
+
+        if self.lock is not None and not self.keep_lock:
+            self.lock.release()
+
+        # Not all rebooters (e.g. emulated targets) know when the device was started
+        released_at = getattr(self.rebooter, "released_at", None)
+        if released_at is None or self.flash:
+            return self.next_harness(result)
+
+        result.telemetry.mark("power_on", released_at)
+        result = self.next_harness(result)
+
+        # Boot milestones reached by the following harnesses are measured on the board as well
+        for event in ("plo", "kernel"):
+            if event in result.telemetry.marks:
+                self.rebooter.record_boot(event, result.telemetry.marks[event])
+
+        return result
+
+
+class BootLockReleaseHarness(IntermediateHarness):
+    """Releases the lock kept by RebooterHarness, when the bootloader stage has finished."""
+
+    def __init__(self, lock: Optional[BootLock]):
+        super().__init__()
+        self.lock = lock
+
+    def __call__(self, result: TestResult) -> TestResult:
+        if self.lock is not None:
+            self.lock.release()
+
         return self.next_harness(result)
 
 
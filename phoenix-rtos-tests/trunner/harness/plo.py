@@ -1,12 +1,18 @@
+import os
+import tempfile
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import Callable, Optional, Sequence
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
 
 import pexpect
 
 from trunner.dut import Dut
+from trunner.flash_manifest import BLOCK_SIZE, FlashManifest, coalesce_runs, manifest_path
 from trunner.text import bold
 from trunner.tools import Phoenixd
-from trunner.types import AppOptions, TestResult, TestStage
+from trunner.types import AppOptions, Telemetry, TestResult, TestStage
 from .base import HarnessError, IntermediateHarness, Rebooter, TerminalHarness
 
 
@@ -24,6 +30,22 @@ class PloJffs2CleanmarkerSpec:
         return f"0x{self.start_block:x}:0x{self.number_of_blocks:x}:0x{self.block_size:x}:0x{self.cleanmarker_size:x}"
 
 
+@dataclass(frozen=True)
+class Jffs2Stats:
+    """Statistics of the jffs2 cleanmarkers formatting."""
+
+    blocks: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Measured throughput in blocks per second."""
+        return self.blocks / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f"jffs2: formatted {self.blocks} blocks in {self.elapsed:.1f} s ({self.rate:.1f} blocks/s)"
+
+
 class PloError(HarnessError):
     """Exception thrown by PloInterface class."""
 
@@ -69,11 +91,11 @@ class PloInterface:
     def __init__(self, dut: Dut):
         self.dut = dut
 
-    def enter_bootloader(self):
+    def enter_bootloader(self, timeout: float = 3):
         """Interrupts timer counting to enter plo."""
 
         try:
-            self.dut.expect_exact("Waiting for input", timeout=3)
+            self.dut.expect_exact("Waiting for input", timeout=timeout)
         except (pexpect.TIMEOUT, pexpect.EOF) as e:
             raise PloError("Failed to go into bootloader mode", output=self.dut.before) from e
 
@@ -127,6 +149,46 @@ class PloInterface:
             e.cmd = cmd
             raise e
 
+    def cmd_batch(self, cmds: Sequence[str], timeout: Optional[int] = None, window: int = 96):
+        """Sends commands without waiting for each one to finish before sending the next one.
+
+        Plo reads the console only between commands, the following ones wait in the UART receive FIFO
+        (128 bytes on the smallest targets, older data is dropped when it overflows). Commands are sent
+        as long as the ones that haven't finished fit in the window, then their results are checked in order.
+        In case of error throws PloError exception.
+        """
+
+        pending = deque()
+        in_flight = 0
+
+        def finish():
+            nonlocal in_flight
+
+            cmd = pending.popleft()
+            in_flight -= len(cmd) + 1
+
+            try:
+                self.dut.expect_exact(cmd)
+            except pexpect.TIMEOUT as e:
+                raise PloError("failed to read echoed command", cmd=cmd, output=self.dut.before) from e
+
+            try:
+                self._assert_prompt(timeout=timeout)
+            except PloError as e:
+                e.cmd = cmd
+                raise e
+
+        for cmd in cmds:
+            while pending and in_flight + len(cmd) + 1 > window:
+                finish()
+
+            self.dut.send(cmd + "\r")
+            pending.append(cmd)
+            in_flight += len(cmd) + 1
+
+        while pending:
+            finish()
+
     def erase(self, device: str, offset: int, size: int, timeout: Optional[int] = None):
         """Performs erase command."""
 
@@ -146,8 +208,17 @@ class PloInterface:
             e.cmd = cmd
             raise e
 
-    def jffs2(self, device: str, erase: bool, cleanmarkers: PloJffs2CleanmarkerSpec, block_timeout: int):
-        """Performs jffs2 command."""
+    def jffs2(
+        self, device: str, erase: bool, cleanmarkers: PloJffs2CleanmarkerSpec, block_timeout: float
+    ) -> Jffs2Stats:
+        """Performs jffs2 command and returns its statistics.
+
+        Progress lines are consumed in bulk, all received at once are matched by a single search and only the
+        last counter is used, so lines that were lost or merged don't matter. The command ends with the plo
+        prompt, "written cleanmarks" is printed only when plo echo is on, so it's accepted, but not required.
+        The command fails if there is no progress for block_timeout or if the average throughput falls below
+        one block per block_timeout.
+        """
 
         block_count = cleanmarkers.number_of_blocks
 
@@ -157,20 +228,59 @@ class PloInterface:
 
         self.send_cmd(cmd)
 
-        for i in range(0, block_count):
+        start = time.monotonic()
+        deadline = start + block_count * block_timeout
+        block = 0
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                raise PloError(
+                    f"jffs2 too slow, formatted {block}/{block_count} blocks in {now - start:.1f} s",
+                    cmd=cmd,
+                    output=self.dut.before,
+                )
+
             try:
-                self.dut.expect_exact(f"jffs2: block {i}/{block_count}", timeout=block_timeout)
-            except pexpect.TIMEOUT as e:
+                idx = self.dut.expect(
+                    [
+                        r"\(plo\)%",
+                        r"jffs2: written cleanmarks",
+                        r"jffs2: block (\d+)/\d+(?:\s*jffs2: block (\d+)/\d+)*",
+                        r"\x1b\[31m[^\n]*\n",
+                    ],
+                    timeout=min(block_timeout, deadline - now),
+                )
+            except (pexpect.TIMEOUT, pexpect.EOF) as e:
                 raise PloError("Wrong jffs2 command output!", cmd=cmd, output=self.dut.before) from e
 
-        self._assert_prompt()
+            if idx == 0:
+                break
+
+            if idx == 1:
+                continue
+
+            if idx == 3:
+                raise PloError("jffs2 command failed", cmd=cmd, output=self.dut.before + self.dut.after)
+
+            # The repeated group captures only the last counter received
+            block = int(self.dut.match.group(2) or self.dut.match.group(1))
+
+        return Jffs2Stats(blocks=block_count, elapsed=time.monotonic() - start)
+
+    @staticmethod
+    def app_cmd(
+        device: str, file: str, imap: str, dmap: str, exec: bool = False
+    ) -> str:  # pylint: disable=redefined-builtin
+        """Returns app command."""
+        x = "-x" if exec else ""
+        return f"app {device} {x} {file} {imap} {dmap}"
 
     def app(
         self, device: str, file: str, imap: str, dmap: str, exec: bool = False
     ):  # pylint: disable=redefined-builtin
         """Performs app command."""
-        x = "-x" if exec else ""
-        self.cmd(f"app {device} {x} {file} {imap} {dmap}", timeout=30)
+        self.cmd(self.app_cmd(device, file, imap, dmap, exec), timeout=30)
 
     def copy(
         self,
@@ -206,9 +316,14 @@ class PloInterface:
             timeout=timeout,
         )
 
+    @staticmethod
+    def alias_cmd(name: str, offset: int, size: int) -> str:
+        """Returns alias command."""
+        return f"alias {name} {offset:#x} {size:#x}"
+
     def alias(self, name: str, offset: int, size: int):
         """Sets alias for the memory region."""
-        self.cmd(f"alias {name} {offset:#x} {size:#x}", timeout=4)
+        self.cmd(self.alias_cmd(name, offset, size), timeout=4)
 
     def go(self):
         """Sends go command to jump out from plo."""
@@ -231,7 +346,7 @@ class PloJffsImageProperty(PloImageProperty):
     flash_device_id: str
     cleanmarkers_args: PloJffs2CleanmarkerSpec
     # For new flash memories, block_timeout should be set with documentation.
-    block_timeout: int
+    block_timeout: float
 
 
 class PloImageLoader(TerminalHarness, PloInterface):
@@ -240,14 +355,29 @@ class PloImageLoader(TerminalHarness, PloInterface):
     It loads plo bootloader using plo_loader callback and then, with the help of a phoenixd program,
     loads the main OS image described by the PloImageProperty class.
 
+    If the board is known, the manifest of the flashed image is saved for it. In delta mode the manifest is
+    compared with the new image and only the changed blocks are copied, each run of them from a separate
+    file, as plo can't copy a part of a file. JFFS2 images are always flashed whole, because the file system
+    modifies its partition at runtime.
+
     Attributes:
         dut: Device on which harness will be run.
         rebooter: Rebooter object needed to do reboot of the dut.
         plo_loader: A callback that performs plo loading to the RAM memory.
         phoenixd: Phoenixd object that wraps phoenixd program.
+        board: Identifier of the board (serial number) used to keep its flash manifest, None disables it.
+        delta: Copy only the blocks that changed since the previous flash of the board.
+        jffs2_stats: Statistics of the last formatting of the jffs2 partition.
+        telemetry: If set, the duration of the jffs2 formatting is recorded there.
 
     """
 
+    # Every copied file gets an alias in plo, which has a small table of them
+    max_delta_runs = 8
+    # Above this ratio of the image size copying the whole image is not much slower
+    max_delta_ratio = 0.5
+    delta_block_size = BLOCK_SIZE
+
     def __init__(
         self,
         dut: Dut,
@@ -255,6 +385,9 @@ class PloImageLoader(TerminalHarness, PloInterface):
         image: PloImageProperty,
         plo_loader: TerminalHarness,
         phoenixd: Phoenixd,
+        board: Optional[str] = None,
+        delta: bool = False,
+        telemetry: Optional[Telemetry] = None,
     ):
         TerminalHarness.__init__(self)
         PloInterface.__init__(self, dut)
@@ -263,13 +396,34 @@ class PloImageLoader(TerminalHarness, PloInterface):
         self.image = image
         self.plo_loader = plo_loader
         self.phoenixd = phoenixd
+        self.board = board
+        self.delta = delta
+        self.jffs2_stats: Optional[Jffs2Stats] = None
+        self.telemetry = telemetry
 
-    def __call__(self):
-        self.rebooter(flash=True, hard=True)
-        self.plo_loader()
+    def _delta_runs(self, old: Optional[FlashManifest], new: FlashManifest) -> Optional[List[Tuple[int, int]]]:
+        """Returns runs of the image to copy, None if the whole image should be flashed."""
+
+        if not self.delta or old is None or isinstance(self.image, PloJffsImageProperty):
+            return None
+
+        runs = old.changed_runs(new)
+        if runs is None:
+            return None
 
+        runs = coalesce_runs(runs, self.max_delta_runs)
+        if sum(size for _, size in runs) > new.size * self.max_delta_ratio:
+            return None
+
+        return runs
+
+    def _flash_full(self):
         if isinstance(self.image, PloJffsImageProperty):
-            self.jffs2(self.image.flash_device_id, True, self.image.cleanmarkers_args, self.image.block_timeout)
+            self.jffs2_stats = self.jffs2(
+                self.image.flash_device_id, True, self.image.cleanmarkers_args, self.image.block_timeout
+            )
+            if self.telemetry is not None:
+                self.telemetry.add_duration("jffs2_format", self.jffs2_stats.elapsed)
 
         with self.phoenixd.run():
             self.copy_file2mem(
@@ -279,6 +433,53 @@ class PloImageLoader(TerminalHarness, PloInterface):
                 timeout=120,
             )
 
+    def _flash_delta(self, image_path: Path, runs: List[Tuple[int, int]]):
+        with tempfile.TemporaryDirectory(prefix="trunner-delta-") as delta_dir:
+            files = []
+            with open(image_path, "rb") as image:
+                for i, (offset, size) in enumerate(runs):
+                    image.seek(offset)
+                    name = f"delta{i}"
+                    Path(delta_dir, name).write_bytes(image.read(size))
+                    files.append((name, offset, size))
+
+            self.phoenixd.set_directory(delta_dir)
+            try:
+                with self.phoenixd.run():
+                    for name, offset, size in files:
+                        self.copy_file2mem(
+                            src=self.image.source,
+                            file=name,
+                            dst=self.image.memory_bank,
+                            off=offset,
+                            size=size,
+                            timeout=120,
+                        )
+            finally:
+                self.phoenixd.set_directory(image_path.parent)
+
+    def __call__(self):
+        image_path = Path(os.path.realpath(self.phoenixd.dir)) / self.image.file
+        runs = None
+
+        if self.board is not None:
+            path = manifest_path(self.board, self.image.memory_bank)
+            new_manifest = FlashManifest.from_image(image_path, self.delta_block_size)
+            runs = self._delta_runs(FlashManifest.load(path), new_manifest)
+            # Content of the flash is unknown until the image is written successfully
+            FlashManifest.remove(path)
+
+        self.rebooter(flash=True, hard=True)
+        self.plo_loader()
+
+        if runs is None:
+            self._flash_full()
+        elif runs:
+            self._flash_delta(image_path, runs)
+
+        if self.board is not None:
+            new_manifest.save(path)
+
         self.rebooter(flash=False, hard=True)
 
 
@@ -321,20 +522,36 @@ class PloHarness(IntermediateHarness, PloInterface):
     Attributes:
         dut: Device on which harness will be run.
         app_loader: Optional app loader harness to copy the binaries to the syspage.
+        rebooter: Optional rebooter of the device, it gets the measured time to reach plo.
 
     """
 
-    def __init__(self, dut: Dut, app_loader: Optional[Callable[[], None]] = None):
+    def __init__(
+        self,
+        dut: Dut,
+        app_loader: Optional[Callable[[], None]] = None,
+        rebooter: Optional[Rebooter] = None,
+    ):
         IntermediateHarness.__init__(self)
         PloInterface.__init__(self, dut)
         self.dut = dut
         self.app_loader = app_loader
+        self.rebooter = rebooter
 
     def __call__(self, result: TestResult) -> TestResult:
         result.set_stage(TestStage.FLASH)
-        self.enter_bootloader()
+
+        if self.rebooter is not None:
+            self.enter_bootloader(timeout=self.rebooter.boot_timeout("plo", 3))
+            self.rebooter.record_boot("plo")
+        else:
+            self.enter_bootloader()
+
+        result.telemetry.mark("plo")
         self.wait_prompt()
         if self.app_loader:
+            start = time.monotonic()
             self.app_loader()
+            result.telemetry.add_duration("app_load", time.monotonic() - start)
         self.go()
         return self.next_harness(result)
@@ -1,4 +1,5 @@
 import shlex
+import time
 from typing import Optional, List
 
 import pexpect
@@ -52,6 +53,9 @@ class ShellHarness(IntermediateHarness):
 
     """
 
+    # The first line printed by the kernel, marks the end of the bootloader in boot telemetry
+    kernel_banner = "Phoenix-RTOS microkernel"
+
     def __init__(
         self,
         dut: Dut,
@@ -77,8 +81,29 @@ class ShellHarness(IntermediateHarness):
                 output=self.dut.before,
             ) from e
 
+    def _assert_boot_prompt(self, result: TestResult):
+        """Waits for the first prompt after reboot, marking the kernel banner and the prompt on the way."""
+
+        try:
+            idx = self.dut.expect_exact([self.kernel_banner, self.prompt], timeout=self.prompt_timeout)
+        except (pexpect.TIMEOUT, pexpect.EOF) as e:
+            raise ShellError(
+                msg="Couldn't find a prompt!",
+                expected=self.prompt,
+                output=self.dut.before,
+            ) from e
+
+        if idx == 0:
+            result.telemetry.mark("kernel")
+            self.assert_prompt()
+
+        result.telemetry.mark("shell")
+
     def __call__(self, result: TestResult) -> TestResult:
-        self.assert_prompt()
+        if result.telemetry.is_booting():
+            self._assert_boot_prompt(result)
+        else:
+            self.assert_prompt()
 
         # suppress klog output to console while test is running to avoid problems with parsing
         if self.suppress_dmesg:
@@ -86,6 +111,7 @@ class ShellHarness(IntermediateHarness):
             self.assert_prompt()
 
         if self.cmd is not None:
+            start = time.monotonic()
             self.dut.send(self.cmd + "\n")
             try:
                 self.dut.expect(f"{self.cmd}(\r+)\n")
@@ -96,6 +122,8 @@ class ShellHarness(IntermediateHarness):
                     output=self.dut.before,
                 ) from e
 
+            result.telemetry.add_command(self.cmd, time.monotonic() - start)
+
         result.set_stage(TestStage.RUN)
         test_result = self.next_harness(result)
         self.assert_prompt()
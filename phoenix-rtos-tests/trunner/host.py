@@ -21,6 +21,14 @@ class Host(ABC):  # pylint: disable=too-few-public-methods
         """Host can use this method to add things to ctx or modify it. A new context is returned."""
         return ctx
 
+    def board_host(self, port: str) -> "Host":  # pylint: disable=unused-argument
+        """Returns the host object that controls the board connected to the given serial port.
+
+        It's used in farm mode, where one runner drives several boards. Hosts able to reset and power
+        the boards independently should return a separate object for each board.
+        """
+        return self
+
 
 class EmulatorHost(Host):
     """Host class for the targets that are intended to run on PC (for example, emulated targets)."""
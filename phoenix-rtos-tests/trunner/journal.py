@@ -0,0 +1,120 @@
+"""Append-only journal of the test results.
+
+Every finished result is appended to a JSON Lines file and synced to disk before the next test starts, so a
+crash of the host, an interrupted runner or a hung board doesn't lose the results of the campaign. The first
+line identifies the target of the campaign, the following ones hold the results.
+
+When the campaign is resumed, results of the tests that already finished are taken from the journal instead
+of running the tests again, and the reports are built from them.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, TextIO, Tuple
+
+from trunner.types import TestResult
+
+
+def read_journal(path: str) -> Tuple[Optional[Dict], List[TestResult]]:
+    """Returns the header and the results stored in the journal.
+
+    Reading stops at the first damaged line (e.g. partially written when the host crashed).
+    """
+
+    header = None
+    results = []
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for idx, line in enumerate(f):
+                try:
+                    data = json.loads(line)
+                    if idx == 0:
+                        header = data
+                    else:
+                        results.append(TestResult.from_journal(data))
+                except (ValueError, KeyError, TypeError):
+                    break
+    except FileNotFoundError:
+        pass
+
+    return header, results
+
+
+class ResultJournal:
+    """Journal of the results of the test campaign run on the target.
+
+    Attributes:
+        path: Path of the journal file.
+        target: Name of the target the campaign is run on.
+        resumed: Results restored from the journal which were not taken yet, by test name.
+    """
+
+    def __init__(self, path: str, target: str):
+        self.path = path
+        self.target = target
+        self.resumed: Dict[str, Deque[TestResult]] = {}
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    def open(self, resume: bool = False):
+        """Opens the journal. Without resume (or if the journal is from another target) it's started anew."""
+
+        if resume:
+            header, results = read_journal(self.path)
+            if header is not None and header.get("target") != self.target:
+                print(f"Journal {self.path} was written for {header.get('target')}, starting the campaign anew")
+                resume = False
+            elif header is None:
+                resume = False
+
+        if resume:
+            for result in results:
+                self.resumed.setdefault(result.name, deque()).append(result)
+
+            print(f"Resuming the campaign, {len(results)} results restored from {self.path}")
+
+            # keep only the valid part of the journal, so a damaged line isn't followed by new results
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"target": self.target}) + "\n")
+                for result in results:
+                    f.write(json.dumps(result.to_journal()) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write(self._file, {"target": self.target})
+
+    @staticmethod
+    def _write(f: TextIO, data: Dict):
+        f.write(json.dumps(data) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def take(self, name: str) -> Optional[TestResult]:
+        """Returns the next restored result of the test with the given name, None if there is no such result."""
+
+        with self._lock:
+            results = self.resumed.get(name)
+            if not results:
+                return None
+
+            return results.popleft()
+
+    def append(self, result: TestResult):
+        """Appends the finished result, it's on disk when the method returns."""
+
+        with self._lock:
+            self._write(self._file, result.to_journal())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
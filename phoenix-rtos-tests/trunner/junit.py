@@ -0,0 +1,188 @@
+"""Streaming writer of test results in JUnit XML format.
+
+Test suites are appended to the report as soon as their tests finish, without building the whole document in
+memory. After every suite the closing tag of the document is written and the totals in the root element are
+updated in place, so the report is valid up to the last finished test even if the runner is killed.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+# Characters not allowed in XML 1.0 documents, even as character references
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Totals in the root element are rewritten in place, so it has a fixed width
+_ROOT_WIDTH = 120
+_HEADER = b'<?xml version="1.0" encoding="utf-8"?>\n'
+_FOOTER = b"</testsuites>\n"
+
+
+def _text(s: str) -> str:
+    return escape(_INVALID_XML_CHARS.sub("", s))
+
+
+def _attr(s) -> str:
+    return quoteattr(_INVALID_XML_CHARS.sub("", str(s)))
+
+
+@dataclass
+class JUnitTestCase:
+    """Single test case of the report.
+
+    Attributes:
+        name: Name of the test case.
+        classname: Name of the test the case belongs to.
+        time: Duration of the test case in seconds.
+        result: Tag of the result element ("failure" or "skipped"), None if the test case passed.
+        message: Short reason of the failure or skip.
+        system_out: Detailed output of the test case.
+    """
+
+    name: str
+    classname: str
+    time: float = 0.0
+    result: Optional[str] = None
+    message: str = ""
+    system_out: str = ""
+
+    def to_xml(self) -> str:
+        attrs = f"name={_attr(self.name)} classname={_attr(self.classname)} time={_attr(self.time)}"
+        if self.result is None and not self.system_out:
+            return f"\t\t<testcase {attrs}/>\n"
+
+        out = [f"\t\t<testcase {attrs}>\n"]
+        if self.result is not None:
+            out.append(f"\t\t\t<{self.result} message={_attr(self.message)}/>\n")
+        if self.system_out:
+            out.append(f"\t\t\t<system-out>{_text(self.system_out)}</system-out>\n")
+        out.append("\t\t</testcase>\n")
+
+        return "".join(out)
+
+
+@dataclass
+class JUnitTestSuite:
+    """Test suite of the report, one for every test run by the runner.
+
+    Attributes:
+        name: Name of the test suite.
+        timestamp: Start time of the test in ISO 8601 format.
+        testcases: Test cases of the suite.
+    """
+
+    name: str
+    timestamp: Optional[str] = None
+    testcases: List[JUnitTestCase] = field(default_factory=list)
+
+    def count(self, result: str) -> int:
+        return sum(1 for case in self.testcases if case.result == result)
+
+    @property
+    def time(self) -> float:
+        return round(sum(case.time for case in self.testcases), 3)
+
+    def to_xml(self, hostname: str = "", properties: Optional[Dict[str, str]] = None) -> str:
+        attrs = [f"name={_attr(self.name)}"]
+        if self.timestamp:
+            attrs.append(f"timestamp={_attr(self.timestamp)}")
+        attrs.extend(
+            [
+                f"tests={_attr(len(self.testcases))}",
+                'errors="0"',
+                f"failures={_attr(self.count('failure'))}",
+                f"skipped={_attr(self.count('skipped'))}",
+                f"time={_attr(self.time)}",
+            ]
+        )
+        if hostname:
+            attrs.append(f"hostname={_attr(hostname)}")
+
+        out = [f"\t<testsuite {' '.join(attrs)}>\n"]
+        if properties:
+            out.append("\t\t<properties>\n")
+            for name, value in properties.items():
+                out.append(f"\t\t\t<property name={_attr(name)} value={_attr(value)}/>\n")
+            out.append("\t\t</properties>\n")
+
+        out.extend(case.to_xml() for case in self.testcases)
+        out.append("\t</testsuite>\n")
+
+        return "".join(out)
+
+
+class JUnitWriter:
+    """Writes test suites to the JUnit XML report one by one.
+
+    Attributes:
+        path: Path of the report.
+        hostname: Host name set in every test suite.
+        properties: Properties added to every test suite.
+    """
+
+    def __init__(self, path: str, hostname: str = "", properties: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.hostname = hostname
+        self.properties = properties or {}
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._end = 0
+        self._tests = 0
+        self._failures = 0
+        self._skipped = 0
+        self._time = 0.0
+
+    def open(self):
+        self._file = open(self.path, "wb")
+        self._file.write(_HEADER)
+        self._write_root()
+        self._end = self._file.tell()
+        self._write_footer()
+
+    def _write_root(self):
+        root = (
+            f'<testsuites tests="{self._tests}" failures="{self._failures}" errors="0" '
+            f'skipped="{self._skipped}" time="{round(self._time, 3)}"'
+        )
+        self._file.seek(len(_HEADER))
+        self._file.write(f"{root:<{_ROOT_WIDTH}}>\n".encode())
+
+    def _write_footer(self):
+        self._file.seek(self._end)
+        self._file.write(_FOOTER)
+        self._file.truncate()
+        self._file.flush()
+
+    def write(self, suite: JUnitTestSuite):
+        """Appends the test suite to the opened report, the report is complete after each call."""
+
+        data = suite.to_xml(self.hostname, self.properties).encode("utf-8")
+
+        with self._lock:
+            self._file.seek(self._end)
+            self._file.write(data)
+            self._end = self._file.tell()
+
+            self._tests += len(suite.testcases)
+            self._failures += suite.count("failure")
+            self._skipped += suite.count("skipped")
+            self._time += suite.time
+
+            self._write_footer()
+            self._write_root()
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,100 @@
+"""Boot times of boards measured during previous reboots.
+
+Rebooters used fixed delays and the following stages fixed timeouts, chosen for the slowest board. With the
+profile of the board they are derived from the measured time from reset (or power on) release to the plo
+prompt. Without enough measurements the fixed values are used.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List
+
+from trunner.state import state_dir
+
+
+class RebootProfile:
+    """Measured boot times of one board, stored in the state directory.
+
+    Attributes:
+        path: File in which the measurements are stored.
+        samples: The most recent measurements (in seconds) of each boot event.
+    """
+
+    # Measurements kept for every event, older ones are dropped
+    max_samples = 20
+    # Measurements needed before the fixed values are replaced
+    min_samples = 3
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.samples: Dict[str, List[float]] = self._load()
+
+    @classmethod
+    def for_board(cls, target: str, board: str) -> "RebootProfile":
+        name = re.sub(r"[^\w.-]", "_", f"{target}-{board}")
+        return cls(state_dir() / "reboot" / f"{name}.json")
+
+    def _load(self) -> Dict[str, List[float]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                samples = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(samples, dict):
+            return {}
+
+        return samples
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.samples, f)
+
+        os.replace(tmp_path, self.path)
+
+    def record(self, event: str, seconds: float):
+        """Adds a measurement of the time from reset release to the event."""
+
+        samples = self.samples.setdefault(event, [])
+        samples.append(round(seconds, 4))
+        del samples[: -self.max_samples]
+
+        try:
+            self._save()
+        except OSError:
+            # Profile is only an optimization, the runner works without it
+            pass
+
+    def _known(self, event: str) -> List[float]:
+        samples = self.samples.get(event, [])
+        return samples if len(samples) >= self.min_samples else []
+
+    def timeout(self, event: str, default: float, margin: float = 2.0, floor: float = 1.0) -> float:
+        """Returns timeout to wait for the event: the longest measured time with a margin.
+
+        It's never shorter than floor and never longer than the default value.
+        """
+
+        samples = self._known(event)
+        if not samples:
+            return default
+
+        return min(default, max(floor, max(samples) * margin))
+
+    def delay(self, event: str, default: float, floor: float = 0.05) -> float:
+        """Returns delay after reset release, which doesn't have to be longer than the board needs for the event.
+
+        Stage that waits for the event overlaps with the rest of the boot, so the delay is limited to the
+        shortest measured time. It's never shorter than floor and never longer than the default value.
+        """
+
+        samples = self._known(event)
+        if not samples:
+            return default
+
+        return min(default, max(floor, min(samples)))
@@ -0,0 +1,31 @@
+"""State of boards kept by the runner between campaigns (flashed images, measured boot times)."""
+
+import os
+from pathlib import Path
+
+from serial.tools import list_ports
+
+
+def state_dir() -> Path:
+    """Returns the directory where the runner keeps the state of boards between runs.
+
+    It's $TRUNNER_STATE_DIR if set, ~/.cache/trunner by default.
+    """
+
+    path = os.environ.get("TRUNNER_STATE_DIR")
+    if path:
+        return Path(path)
+
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "trunner"
+
+
+def board_serial(port: str) -> str:
+    """Returns the USB serial number of the device behind port, or the resolved port path if it has none."""
+
+    real_port = os.path.realpath(port)
+    for info in list_ports.comports():
+        if info.device in (port, real_port) and info.serial_number:
+            return info.serial_number
+
+    return real_port
@@ -1,4 +1,4 @@
-from .base import TargetBase, find_port
+from .base import TargetBase, find_port, find_ports
 from .armv7m7 import IMXRT106xEvkTarget, IMXRT117xEvkTarget, ARMv7M7Target
 from .armv7m4 import STM32L4x6Target
 from .armv7a7 import IMX6ULLEvkTarget
@@ -22,5 +22,6 @@ __all__ = [
     "Zynq7000ZedboardTarget",
     "TargetBase",
     "find_port",
+    "find_ports",
     "IMX6ULLEvkTarget",
 ]
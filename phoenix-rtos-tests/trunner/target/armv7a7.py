@@ -50,6 +50,7 @@ class ARMv7A7Target(TargetBase, PloInterface, Rebooter):
             image=self.image,
             plo_loader=plo_loader,
             phoenixd=Phoenixd(directory=self.boot_dir()),
+            telemetry=self.flash_telemetry,
         )
 
         loader()
@@ -59,7 +60,7 @@ class ARMv7A7Target(TargetBase, PloInterface, Rebooter):
         builder = HarnessBuilder()
 
         if test.should_reboot:
-            builder.add(RebooterHarness(self.rebooter))
+            builder.add(RebooterHarness(self.rebooter, lock=self.boot_lock))
 
         if test.shell is not None:
             builder.add(ShellHarness(self.dut, self.shell_prompt, test.shell.cmd))
@@ -90,9 +91,10 @@ class IMX6ULLEvkTarget(ARMv7A7Target):
         block_timeout=3.2,
     )
     name = "armv7a7-imx6ull-evk"
+    port_hint = "10c4:ea60"  # vid:pid Product=CP2102 USB to UART Bridge Controller for imx6ull-evk
 
     def __init__(self, host: Host, port: Optional[str] = None, baudrate: int = 115200):
         if not port:
-            port = find_port("10c4:ea60")  # vid:pid Product=CP2102 USB to UART Bridge Controller for imx6ull-evk
+            port = find_port(self.port_hint)
 
         super().__init__(host, port, baudrate)
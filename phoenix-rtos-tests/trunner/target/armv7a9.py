@@ -19,7 +19,9 @@ from trunner.harness import (
 )
 from trunner.harness import TerminalHarness
 from trunner.host import Host
-from trunner.tools import Phoenixd, OpenocdGdbServer, wait_for_vid_pid
+from trunner.reboot_profile import RebootProfile
+from trunner.state import board_serial
+from trunner.tools import Phoenixd, OpenocdSession, wait_for_vid_pid
 from trunner.types import TestResult, TestOptions
 from .base import TargetBase, find_port
 
@@ -27,6 +29,9 @@ from .base import TargetBase, find_port
 class ARMv7A9TargetRebooter(Rebooter):
     # TODO add text mode reboot
 
+    # Tests on this target don't enter plo after reboot, the kernel banner is the first milestone seen
+    boot_event = "kernel"
+
     def _reboot_soft(self):
         self._reboot_hard()
 
@@ -36,25 +41,26 @@ class ARMv7A9TargetRebooter(Rebooter):
         time.sleep(0.75)
         self.dut.clear_buffer()
         self.host.set_power(True)
-        time.sleep(0.05)
+        self._released()
+        time.sleep(self.boot_delay(0.05))
 
     def _set_flash_mode(self, flash):
         self.host.set_flash_mode(not flash)
 
 
 class ZynqZedboardGdbPloLoader(TerminalHarness, PloInterface):
-    def __init__(self, dut: Dut, script: str, cwd: Optional[str] = None):
+    def __init__(self, dut: Dut, script: str, gdbserver: OpenocdSession, cwd: Optional[str] = None):
         TerminalHarness.__init__(self)
         PloInterface.__init__(self, dut)
         self.script = script
         self.cwd = cwd
-        self.gdbserver = OpenocdGdbServer(board="digilent_zedboard")
+        self.gdbserver = gdbserver
 
     def __call__(self):
         """Loads plo image to RAM using gdb."""
 
-        # after reboot we need to wait for smt2 device
-        wait_for_vid_pid(vid=0x0403, pid=0x6014, timeout=5)
+        # after reboot we need to wait for smt2 device, openocd is restarted if it was re-enumerated
+        wait_for_vid_pid(*self.gdbserver.probe, timeout=5)
 
         with self.gdbserver.run():
             try:
@@ -82,7 +88,8 @@ class ARMv7A9Target(TargetBase):
 
     def __init__(self, host: Host, port: str, baudrate: int = 115200):
         self.dut = SerialDut(port, baudrate, encoding="utf-8", codec_errors="ignore")
-        self.rebooter = ARMv7A9TargetRebooter(host, self.dut)
+        profile = RebootProfile.for_board(self.name, board_serial(port))
+        self.rebooter = ARMv7A9TargetRebooter(host, self.dut, profile)
         super().__init__()
 
     @classmethod
@@ -98,7 +105,7 @@ class ARMv7A9Target(TargetBase):
         builder = HarnessBuilder()
 
         if test.should_reboot:
-            builder.add(RebooterHarness(self.rebooter))
+            builder.add(RebooterHarness(self.rebooter, lock=self.boot_lock))
 
         if test.shell is not None:
             builder.add(ShellHarness(self.dut, self.shell_prompt, test.shell.cmd))
@@ -129,17 +136,21 @@ class Zynq7000ZedboardTarget(ARMv7A9Target):
         block_timeout=5.2,
     )
     name = "armv7a9-zynq7000-zedboard"
+    port_hint = "04b4:0008"
 
     def __init__(self, host: Host, port: Optional[str] = None, baudrate: int = 115200):
         if port is None:
-            port = find_port("04b4:0008")
+            port = find_port(self.port_hint)
 
         super().__init__(host, port, baudrate)
+        # SMT2 probe is powered by the board, so openocd is restarted after the board is power cycled
+        self.gdbserver = OpenocdSession(board="digilent_zedboard", probe=(0x0403, 0x6014))
 
     def flash_dut(self):
         plo_loader = ZynqZedboardGdbPloLoader(
             dut=self.dut,
             script=f"{self._project_dir()}/phoenix-rtos-build/scripts/upload-zynq7000-smt2.gdb",
+            gdbserver=self.gdbserver,
             cwd=self.boot_dir(),
         )
 
@@ -149,6 +160,7 @@ class Zynq7000ZedboardTarget(ARMv7A9Target):
             image=self.image,
             plo_loader=plo_loader,
             phoenixd=Phoenixd(directory=self.boot_dir()),
+            telemetry=self.flash_telemetry,
         )
 
         loader()
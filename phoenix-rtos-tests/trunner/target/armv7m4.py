@@ -1,7 +1,8 @@
 import subprocess
+import tempfile
 import time
 from pathlib import Path
-from typing import Callable, Optional, Sequence
+from typing import Callable, List, Optional, Sequence, Tuple
 
 from trunner.ctx import TestContext
 from trunner.dut import Dut, SerialDut
@@ -15,10 +16,11 @@ from trunner.harness import (
     TestStartRunningHarness,
     Rebooter,
     RebooterHarness,
+    BootLockReleaseHarness,
     HarnessBuilder,
     FlashError,
 )
-from trunner.tools import GdbInteractive, OpenocdGdbServer
+from trunner.tools import GdbInteractive, OpenocdSession
 from trunner.types import AppOptions, TestOptions, TestResult
 from .base import TargetBase, find_port
 
@@ -37,24 +39,35 @@ class STM32L4x6OpenocdGdbServerHarness(IntermediateHarness):
 
     Attributes:
         harness: Harness that will be run under gdb server context.
+        gdbserver: Openocd session of the board, the board is reset when the session is entered.
 
     """
 
-    def __init__(self, harness: Callable[[TestResult], TestResult]):
+    def __init__(self, harness: Callable[[TestResult], TestResult], gdbserver: OpenocdSession):
         super().__init__()
         self.harness = harness
+        self.gdbserver = gdbserver
 
     def __call__(self, result: TestResult) -> TestResult:
-        # Set of config parameters used in Openocd to flash up stm32l4a6
-        openocd_args = ["-c", "reset_config srst_only srst_nogate connect_assert_srst", "-c", "init;reset"]
-
-        with OpenocdGdbServer(interface="stlink", target="stm32l4x", extra_args=openocd_args).run():
+        with self.gdbserver.run():
             self.harness(result)
 
         return self.next_harness(result)
 
 
 class STM32L4x6PloAppLoader(TerminalHarness, PloInterface):
+    """Harness to load the applications to RAM using gdb and map them with plo.
+
+    All applications are packed into one blob, each aligned to the page size, which is loaded with a single
+    gdb restore. Then plo alias and app commands for all of them are sent as one pipelined sequence.
+
+    Attributes:
+        dut: Device on which harness will be run.
+        apps: Sequence of applications that will be loaded.
+        gdb: Gdb used to load the applications to RAM.
+
+    """
+
     def __init__(self, dut: Dut, apps: Sequence[AppOptions], gdb: GdbInteractive):
         TerminalHarness.__init__(self)
         PloInterface.__init__(self, dut)
@@ -71,34 +84,45 @@ class STM32L4x6PloAppLoader(TerminalHarness, PloInterface):
         offset = (self.page_sz - sz) % self.page_sz
         return sz + offset
 
-    def __call__(self):
-        # First, load the apps into ram memory using gdb
-        with self.gdb.run():
-            offset = self.load_offset
-            self.gdb.connect()
+    def _pack_apps(self, blob) -> List[Tuple[AppOptions, int, int]]:
+        """Writes page aligned apps to the blob file, returns (app, offset, size) of each of them."""
 
-            for app in self.apps:
-                path = self.gdb.cwd / Path(app.file)
-                sz = self._aligned_app_size(path)
+        layout = []
+        offset = self.load_offset
 
-                self.gdb.load(path, self.ram_addr + offset)
-                offset += sz
+        for app in self.apps:
+            path = self.gdb.cwd / Path(app.file)
+            data = path.read_bytes()
+            aligned_sz = self._aligned_app_size(path)
 
-            self.gdb.cont()
+            blob.write(data.ljust(aligned_sz, b"\0"))
+            layout.append((app, offset, len(data)))
+            offset += aligned_sz
 
-            # When closing right after continuing plo will get stuck
-            time.sleep(0.5)
+        return layout
 
-        # Secondly, map loaded binaries as runnable programs
-        offset = self.load_offset
-        for app in self.apps:
-            path = self.gdb.cwd / Path(app.file)
-            sz = path.stat().st_size
+    def __call__(self):
+        # First, load the apps into ram memory using gdb
+        with tempfile.TemporaryDirectory(prefix="trunner-apps-") as tmpdir:
+            blob_path = Path(tmpdir) / "apps.bin"
+            with open(blob_path, "wb") as blob:
+                layout = self._pack_apps(blob)
+
+            with self.gdb.run():
+                self.gdb.connect()
+                self.gdb.load(blob_path, self.ram_addr + self.load_offset)
+                self.gdb.cont()
 
-            self.alias(app.file, offset=offset, size=sz)
-            self.app("ramdev", app.file, "ram", "ram")
+                # When closing right after continuing plo will get stuck
+                time.sleep(0.5)
 
-            offset += self._aligned_app_size(path)
+        # Secondly, map loaded binaries as runnable programs
+        cmds = []
+        for app, offset, sz in layout:
+            cmds.append(self.alias_cmd(app.file, offset=offset, size=sz))
+            cmds.append(self.app_cmd("ramdev", app.file, "ram", "ram"))
+
+        self.cmd_batch(cmds, timeout=30)
 
 
 class STM32L4x6Target(TargetBase):
@@ -107,14 +131,25 @@ class STM32L4x6Target(TargetBase):
     experimental = False
     image_file = "phoenix.disk"
     image_addr = 0x08000000
+    # Try to find USB-Serial controller
+    port_hint = "USB-Serial|UART"
+    # vid:pid of ST-LINK/V2-1 on Nucleo boards
+    stlink_usb = (0x0483, 0x374B)
 
     def __init__(self, host: Host, port: Optional[str] = None, baudrate: int = 115200):
         if port is None:
-            # Try to find USB-Serial controller
-            port = find_port("USB-Serial|UART")
+            port = find_port(self.port_hint)
 
         self.dut = SerialDut(port, baudrate, encoding="utf-8", codec_errors="ignore")
         self.rebooter = ARMv7M4Rebooter(host, self.dut)
+        self.gdbserver = OpenocdSession(
+            interface="stlink",
+            target="stm32l4x",
+            # Set of config parameters used in Openocd to flash up stm32l4a6
+            extra_args=["-c", "reset_config srst_only srst_nogate connect_assert_srst", "-c", "init;reset"],
+            probe=self.stlink_usb,
+            reuse_cmds=["reset"],
+        )
         super().__init__()
 
     @classmethod
@@ -122,6 +157,9 @@ class STM32L4x6Target(TargetBase):
         return cls(ctx.host, ctx.port, ctx.baudrate)
 
     def flash_dut(self):
+        # Flashing uses a separate openocd, which needs the probe
+        self.gdbserver.close()
+
         try:
             subprocess.run(
                 [
@@ -153,7 +191,11 @@ class STM32L4x6Target(TargetBase):
         builder = HarnessBuilder()
 
         if test.should_reboot:
-            builder.add(RebooterHarness(self.rebooter, hard=False))
+            builder.add(
+                RebooterHarness(
+                    self.rebooter, hard=False, lock=self.boot_lock, keep_lock=test.bootloader is not None
+                )
+            )
 
         if test.bootloader is not None:
             app_loader = None
@@ -166,6 +208,7 @@ class STM32L4x6Target(TargetBase):
                 )
 
             builder.add(PloHarness(self.dut, app_loader=app_loader))
+            builder.add(BootLockReleaseHarness(self.boot_lock))
 
         if test.bootloader is not None and test.bootloader.apps:
             # In the case we are loading apps using OpenGdbServer we would like to run plo
@@ -173,7 +216,7 @@ class STM32L4x6Target(TargetBase):
             # server context and continue building harness
             setup = builder.get_harness()
             builder = HarnessBuilder()
-            builder.add(STM32L4x6OpenocdGdbServerHarness(setup))
+            builder.add(STM32L4x6OpenocdGdbServerHarness(setup, self.gdbserver))
 
         if test.shell is not None:
             builder.add(
@@ -1,6 +1,10 @@
+from pathlib import Path
 from typing import Callable, Optional
+
 from trunner.dut import SerialDut
+from trunner.flash_manifest import FlashManifest, manifest_path
 from trunner.harness import (
+    BootLockReleaseHarness,
     HarnessBuilder,
     PloImageLoader,
     PloImageProperty,
@@ -12,6 +16,8 @@ from trunner.harness import (
     TestStartRunningHarness,
 )
 from trunner.host import Host
+from trunner.reboot_profile import RebootProfile
+from trunner.state import board_serial
 from trunner.tools import Phoenixd, Psu
 from trunner.types import TestOptions, TestResult
 from .base import TargetBase, PsuPloLoader, find_port
@@ -35,12 +41,16 @@ class ARMv7M7Target(TargetBase):
 
     def __init__(self, host: Host, port: str, baudrate: int = 115200):
         self.dut = SerialDut(port, baudrate, encoding="utf-8", codec_errors="ignore")
-        self.rebooter = ARMv7M7TargetRebooter(host, self.dut)
+        profile = RebootProfile.for_board(self.name, board_serial(port))
+        self.rebooter = ARMv7M7TargetRebooter(host, self.dut, profile)
+        self.delta_flash = False
         super().__init__()
 
     @classmethod
     def from_context(cls, ctx):
-        return cls(ctx.host, ctx.port, ctx.baudrate)
+        target = cls(ctx.host, ctx.port, ctx.baudrate)
+        target.delta_flash = ctx.delta_flash
+        return target
 
     def flash_dut(self):
         plo_loader = PsuPloLoader(
@@ -54,15 +64,36 @@ class ARMv7M7Target(TargetBase):
             image=self.image,
             plo_loader=plo_loader,
             phoenixd=Phoenixd(directory=self.boot_dir()),
+            board=board_serial(self.dut.port),
+            delta=self.delta_flash,
+            telemetry=self.flash_telemetry,
         )
 
         loader()
 
+    def is_flashed(self) -> bool:
+        # The manifest is saved by PloImageLoader after a successful flash
+        manifest = FlashManifest.load(manifest_path(board_serial(self.dut.port), self.image.memory_bank))
+        if manifest is None:
+            return False
+
+        try:
+            image = FlashManifest.from_image(Path(self.boot_dir()) / self.image.file, manifest.block_size)
+        except OSError:
+            return False
+
+        return image.digest == manifest.digest
+
     def build_test(self, test: TestOptions) -> Callable[[TestResult], TestResult]:
         builder = HarnessBuilder()
 
         if test.should_reboot:
-            builder.add(RebooterHarness(self.rebooter, hard=False))
+            # Phoenixd attaches to the plo USB device in the bootloader stage, keep the lock until it's done
+            builder.add(
+                RebooterHarness(
+                    self.rebooter, hard=False, lock=self.boot_lock, keep_lock=test.bootloader is not None
+                )
+            )
 
         if test.bootloader is not None:
             app_loader = None
@@ -74,7 +105,8 @@ class ARMv7M7Target(TargetBase):
                     phoenixd=Phoenixd(directory=self.root_dir() / test.shell.path),
                 )
 
-            builder.add(PloHarness(self.dut, app_loader=app_loader))
+            builder.add(PloHarness(self.dut, app_loader=app_loader, rebooter=self.rebooter))
+            builder.add(BootLockReleaseHarness(self.boot_lock))
 
         if test.shell is not None:
             builder.add(ShellHarness(self.dut, self.shell_prompt, test.shell.cmd))
@@ -87,9 +119,11 @@ class ARMv7M7Target(TargetBase):
 
 
 class IMXTarget(ARMv7M7Target):
+    port_hint = "0D28:0204"  # vid:pid
+
     def __init__(self, host: Host, port: Optional[str] = None, baudrate: int = 115200):
         if not port:
-            port = find_port("0D28:0204")  # vid:pid
+            port = find_port(self.port_hint)
 
         super().__init__(host, port, baudrate)
 
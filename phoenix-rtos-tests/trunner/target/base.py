@@ -1,35 +1,37 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Callable
+from typing import Callable, List, Optional
 
 from serial.tools import list_ports
 
 from trunner.dut import Dut
 from trunner.tools import Psu
-from trunner.harness import TerminalHarness, PloInterface
+from trunner.harness import BootLock, TerminalHarness, PloInterface
 from trunner.dut import PortNotFound
-from trunner.types import TestOptions, TestResult
+from trunner.types import Telemetry, TestOptions, TestResult
 
 
-def find_port(port_hint: str) -> str:
-    port = None
+def find_ports(port_hint: str) -> List[str]:
+    """Returns sorted paths of all serial ports matching the hint (regex or vid:pid)."""
+    return sorted(p.device for p in list_ports.grep(port_hint))
 
-    for p in list_ports.grep(port_hint):
-        if port is not None:
-            raise PortNotFound(
-                "More than one port was found! Maybe more than one device is connected? Hint used to find port:"
-                f" {port_hint}"
-            )
 
-        port = p
+def find_port(port_hint: str) -> str:
+    ports = find_ports(port_hint)
 
-    if port is None:
+    if len(ports) > 1:
+        raise PortNotFound(
+            "More than one port was found! Maybe more than one device is connected? Hint used to find port:"
+            f" {port_hint}"
+        )
+
+    if not ports:
         raise PortNotFound(
             "Couldn't find port to communicate with device! Make sure device is connected. Hint used to find port:"
             f" {port_hint}"
         )
 
-    return port.device
+    return ports[0]
 
 
 class PsuPloLoader(TerminalHarness, PloInterface):
@@ -52,17 +54,23 @@ class TargetBase(ABC):
         shell_prompt: Prompt that target shell uses.
         rootfs: Flag that tells if target uses real filesystem.
         experimental: If set, target must be explcitly specified in yaml config.
+        port_hint: Hint (regex or vid:pid) to find the serial port of the board, None if target doesn't use it.
+        flash_telemetry: Telemetry of the flashing, the runner sets it to the one of the flash result.
+        boot_lock: Optional lock held from the reboot until the bootloader stage ends, set in farm mode.
     """
 
     name = "base"
     shell_prompt = "(psh)% "
     rootfs = True
     experimental = False
+    port_hint: Optional[str] = None
 
     def __init__(self):
         self.project_dir = self._project_dir()
         self.prompt_timeout = -1
         self.dut: Dut
+        self.flash_telemetry = Telemetry()
+        self.boot_lock: Optional[BootLock] = None
 
     @classmethod
     @abstractmethod
@@ -94,6 +102,10 @@ class TargetBase(ABC):
     def flash_dut(self):
         """Flashes the system image into target device."""
 
+    def is_flashed(self) -> bool:
+        """Returns true if the device already holds the image that flash_dut() would flash."""
+        return False
+
     @abstractmethod
     def build_test(self, test: TestOptions) -> Callable[[TestResult], TestResult]:
         """Returns the complete harness to run the test secified in `test` argument"""
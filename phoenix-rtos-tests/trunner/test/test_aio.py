@@ -0,0 +1,124 @@
+import io
+import os
+import signal
+import sys
+
+import pexpect
+import pytest
+
+from trunner import aio
+from trunner.dut import HostDut
+
+
+@pytest.fixture
+def enabled_aio():
+    aio.enable()
+    yield
+    aio.enable(False)
+
+
+def test_factories_return_pexpect_objects_when_disabled():
+    proc = aio.spawn("true")
+    try:
+        assert isinstance(proc, pexpect.spawn)
+    finally:
+        proc.close()
+
+
+def test_process_expect_and_send(enabled_aio):
+    proc = aio.spawn("sh", ["-c", "echo ready; read x; echo got $x; exit 3"], encoding="utf-8", timeout=5)
+    assert isinstance(proc, aio.ProcessStreamSpawn)
+
+    proc.expect_exact("ready")
+    proc.sendline("abc")
+    proc.expect(r"got (\w+)")
+    assert proc.match.group(1) == "abc"
+
+    proc.expect(pexpect.EOF)
+    assert proc.wait() == 3
+    proc.close()
+
+
+def test_fd_stream_timeout_and_close():
+    master, slave = os.openpty()
+    proc = aio.FdStreamSpawn(master, encoding="utf-8")
+
+    try:
+        with pytest.raises(pexpect.TIMEOUT):
+            proc.expect_exact("never", timeout=0.2)
+
+        os.write(slave, b"Waiting for input\r\n")
+        proc.expect_exact("Waiting for input", timeout=2)
+
+        proc.close()
+        assert not proc.isalive()
+        # close() must leave the descriptor to its owner
+        os.fstat(master)
+    finally:
+        os.close(slave)
+        os.close(master)
+
+
+def test_drain_passes_data_only_to_logfile(enabled_aio):
+    logfile = io.StringIO()
+    proc = aio.spawn("sh", ["-c", "echo start; sleep 0.2; echo drained; sleep 5"], encoding="utf-8",
+                     logfile=logfile)
+
+    proc.expect_exact("start", timeout=5)
+    proc.drain()
+
+    with pytest.raises(pexpect.TIMEOUT):
+        proc.expect_exact("drained", timeout=1)
+
+    assert "drained" in logfile.getvalue()
+    proc.close(force=True)
+
+
+def test_host_dut_with_aio(enabled_aio):
+    dut = HostDut()
+    dut.set_args("sh -c 'echo hello world'", encoding="utf-8")
+    dut.open()
+
+    dut.expect_exact("hello world", timeout=5)
+    assert dut.wait() == 0
+
+
+# Interpreter with a prompt, like micropython REPL, which exits at end of input
+FAKE_REPL = "while True:\n    try:\n        line = input('>>> ')\n    except EOFError:\n        break\n    print(eval(line))\nprint('bye')"
+
+
+def repl_harness(dut):
+    # Same steps as micropython_repl harness
+    dut.expect_exact(">>> ")
+    dut.sendline("1 + 1")
+    dut.expect_exact("2")
+    dut.expect_exact(">>> ")
+    dut.sendcontrol("d")
+    dut.expect_exact("bye")
+
+
+@pytest.mark.parametrize("use_aio", [False, True], ids=["pexpect", "aio"])
+def test_host_dut_sends_control_characters(use_aio):
+    aio.enable(use_aio)
+    try:
+        dut = HostDut()
+        dut.set_args(f"{sys.executable} -c \"{FAKE_REPL}\"", encoding="utf-8", timeout=5)
+        dut.open()
+
+        repl_harness(dut)
+        assert dut.wait() == 0
+
+        dut.set_args(f"{sys.executable} -c input()", encoding="utf-8", timeout=5)
+        dut.open()
+        dut.sendeof()
+        dut.expect_exact("EOFError")
+        dut.wait()
+
+        dut.set_args("sleep 10", encoding="utf-8", timeout=5)
+        dut.open()
+        dut.sendintr()
+        dut.expect(pexpect.EOF)
+        dut.wait()
+        assert dut.pexpect_proc.signalstatus == signal.SIGINT
+    finally:
+        aio.enable(False)
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from trunner import aio
+from trunner.capture import RECEIVED, SENT, Capture, Chunk, print_summary, read_capture, split_lines
+from trunner.dut import HostDut
+
+
+@pytest.fixture(params=[False, True], ids=["pexpect", "aio"])
+def dut(request):
+    aio.enable(request.param)
+    dut = HostDut()
+    dut.set_args("sh -c 'stty -echo; echo ready; read x; sleep 0.2; echo got $x'", encoding="utf-8", timeout=5)
+    dut.open()
+    yield dut
+    dut.close()
+    aio.enable(False)
+
+
+def test_dut_exchange_is_captured(dut):
+    capture = Capture()
+    logs = io.StringIO(), io.StringIO(), io.StringIO()
+    dut.set_logfiles(*logs, capture)
+
+    dut.expect_exact("ready")
+    dut.sendline("abc")
+    dut.expect_exact("got abc")
+
+    chunks = list(read_capture(io.BytesIO(capture.getvalue())))
+    assert b"".join(c.data for c in chunks if c.direction == SENT) == b"abc\n"
+    assert b"got abc" in b"".join(c.data for c in chunks if c.direction == RECEIVED)
+    # text logs are written as without the capture
+    assert "abc" in logs[1].getvalue()
+
+    sent = next(line for line in split_lines(chunks) if line.direction == SENT)
+    assert sent.text == "abc"
+    assert sent.latency >= 0.2
+
+
+def test_split_lines_joins_chunks():
+    chunks = [
+        Chunk(1.0, RECEIVED, b"(psh)% "),
+        Chunk(2.0, SENT, b"ls\r\n"),
+        Chunk(2.1, RECEIVED, b"ls\r"),
+        Chunk(2.2, RECEIVED, b"\nbin  de"),
+        Chunk(2.5, RECEIVED, b"v\r\n(psh)% "),
+    ]
+
+    lines = split_lines(chunks)
+    assert [(line.direction, line.text) for line in lines] == [
+        (RECEIVED, "(psh)% ls"),
+        (SENT, "ls"),
+        (RECEIVED, "bin  dev"),
+        (RECEIVED, "(psh)% "),
+    ]
+    assert lines[1].latency == pytest.approx(0.1)
+    assert (lines[2].start, lines[2].end) == (2.2, 2.5)
+
+    out = io.StringIO()
+    print_summary(lines, out)
+    assert "count 1" in out.getvalue()
+
+
+def test_truncated_capture_is_read_up_to_last_record():
+    capture = Capture()
+    capture.received(b"first", at=1.0)
+    capture.sent(b"second", at=2.0)
+
+    data = capture.getvalue()[:-2]
+    assert list(read_capture(io.BytesIO(data))) == [Chunk(1.0, RECEIVED, b"first")]
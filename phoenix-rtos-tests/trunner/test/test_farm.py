@@ -0,0 +1,176 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from trunner.dut import HostDut
+from trunner.farm import FarmRunner, WorkStealingQueue
+from trunner.harness import BootLock, BootLockReleaseHarness, IntermediateHarness, RebooterHarness
+from trunner.test_runner import TestRunner
+from trunner.types import TestOptions, TestResult
+
+# Pytest tries to collect some classes as tests, mark them as not testable
+TestOptions.__test__ = False
+TestResult.__test__ = False
+TestRunner.__test__ = False
+
+
+def test_queue_keeps_chunks_in_order():
+    queue = WorkStealingQueue(range(6), 2)
+
+    assert [queue.get(0), queue.get(0), queue.get(0)] == [0, 1, 2]
+    assert [queue.get(1), queue.get(1)] == [3, 4]
+
+
+def test_queue_steals_from_longest_chunk():
+    queue = WorkStealingQueue(range(9), 3)
+
+    # worker 2 finishes its chunk, then steals from the back of the others
+    assert [queue.get(2) for _ in range(3)] == [6, 7, 8]
+    assert queue.get(1) == 3
+    assert queue.get(2) == 2
+    assert queue.get(2) == 1
+    assert queue.get(2) == 5
+    assert queue.get(0) == 0
+    assert queue.get(1) == 4
+    assert queue.get(0) is None
+    assert queue.get(1) is None
+
+
+class FakeRunner:
+    def __init__(self, port, fail_on=()):
+        self.ctx = SimpleNamespace(port=port, verbosity=0, logdir=None)
+        self.target = SimpleNamespace(dut=None)
+        self.fail_on = fail_on
+        self.ran = []
+        self.reported = []
+
+    def run_test(self, test, last_test_failed):
+        if test.name in self.fail_on:
+            raise OSError("board disconnected")
+
+        self.ran.append(test.name)
+        return TestResult(test.name)
+
+    def add_result(self, result):
+        self.reported.append(result.name)
+
+
+def test_broken_board_leaves_tests_to_others(capsys):
+    tests = [TestOptions(name=f"test{i}") for i in range(8)]
+    runners = [FakeRunner("/dev/ttyACM0", fail_on=("test1",)), FakeRunner("/dev/ttyACM1")]
+
+    farm = FarmRunner([], test_paths=[])
+    farm.runners = runners
+    queue = WorkStealingQueue(range(len(tests)), len(runners))
+    results = {}
+
+    threads = [
+        threading.Thread(target=farm._work, args=(worker, runner, tests, queue, results))
+        for worker, runner in enumerate(runners)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == list(range(8))
+    assert results[1].is_fail()
+    assert runners[0].ran == ["test0"]
+    assert sorted(runners[1].ran) == [f"test{i}" for i in range(8) if i not in (0, 1)]
+    # results are written to the report of the first runner as soon as they are known
+    assert sorted(runners[0].reported) == [test.name for test in tests]
+    assert "[ttyACM1]" in capsys.readouterr().out
+
+
+class BootStage(IntermediateHarness):
+    """Stands for the bootloader stage, records how many boards are in it at once."""
+
+    active = 0
+    max_active = 0
+    counter_lock = threading.Lock()
+
+    def __call__(self, result):
+        cls = BootStage
+        with cls.counter_lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+
+        time.sleep(0.01)
+
+        with cls.counter_lock:
+            cls.active -= 1
+
+        if result.name == "broken":
+            raise OSError("phoenixd failed")
+
+        return self.next_harness(result)
+
+
+def build_test(lock, body):
+    reboot = RebooterHarness(lambda flash, hard: None, lock=lock, keep_lock=True)
+    reboot.chain(BootStage()).chain(BootLockReleaseHarness(lock)).chain(body)
+    return reboot
+
+
+def test_boot_lock_covers_only_bootloader_stage():
+    plo_lock = threading.Lock()
+    # Both boards have to be in the test body at once, it would time out if the lock covered it
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    def body(result):
+        barrier.wait()
+        return result
+
+    def board():
+        lock = BootLock(plo_lock)
+        for _ in range(3):
+            results.append(build_test(lock, body)(TestResult("test")))
+
+        with pytest.raises(OSError):
+            build_test(lock, body)(TestResult("broken"))
+
+    threads = [threading.Thread(target=board) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 6
+    assert BootStage.max_active == 1
+    # failed bootloader stage doesn't leave the lock taken
+    assert not plo_lock.locked()
+
+
+class FlashOnlyRunner(TestRunner):
+    def parse_tests(self):
+        return []
+
+
+def test_flash_logs_are_saved(tmp_path, capsys):
+    dut = HostDut()
+    dut.set_args("echo flashing", encoding="utf-8", timeout=5)
+
+    def flash_dut():
+        dut.open()
+        dut.expect_exact("flashing")
+
+    ctx = SimpleNamespace(
+        port="/dev/ttyACM0",
+        logdir=str(tmp_path / "ttyACM0"),
+        resume=False,
+        output=None,
+        should_flash=True,
+        force_flash=False,
+        should_test=False,
+        stream_output=False,
+        timestamps=False,
+        target=SimpleNamespace(dut=dut, is_flashed=lambda: False, flash_dut=flash_dut, flash_telemetry=None),
+    )
+
+    farm = FarmRunner([], test_paths=[])
+    farm.runners = [FlashOnlyRunner(ctx, test_paths=[])]
+    assert farm.run()
+    assert "flashing" in (tmp_path / "ttyACM0" / "flash" / "out.log").read_text()
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from trunner.flash_manifest import FlashManifest, coalesce_runs, manifest_path
+from trunner.harness import PloImageLoader, PloImageProperty
+from trunner.test_runner import TestRunner
+
+# Pytest tries to collect TestRunner as a test, mark it as not testable
+TestRunner.__test__ = False
+
+
+BLOCK = 0x100
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRUNNER_STATE_DIR", str(tmp_path / "state"))
+
+
+def write_image(path, blocks):
+    path.write_bytes(b"".join(bytes([b]) * BLOCK for b in blocks))
+    return path
+
+
+def test_changed_runs(tmp_path):
+    old = FlashManifest.from_image(write_image(tmp_path / "old", [0, 1, 2, 3, 4]), BLOCK)
+    new = FlashManifest.from_image(write_image(tmp_path / "new", [0, 9, 9, 3, 4, 5]), BLOCK)
+
+    assert old.changed_runs(new) == [(BLOCK, 2 * BLOCK), (5 * BLOCK, BLOCK)]
+    assert old.changed_runs(old) == []
+    assert old.changed_runs(FlashManifest.from_image(tmp_path / "new", 2 * BLOCK)) is None
+
+
+def test_manifest_save_and_load(tmp_path):
+    manifest = FlashManifest.from_image(write_image(tmp_path / "img", [1, 2]), BLOCK)
+    path = manifest_path("board/1", "flash0")
+
+    manifest.save(path)
+    assert FlashManifest.load(path) == manifest
+
+    path.write_text("{broken")
+    assert FlashManifest.load(path) is None
+
+
+def test_coalesce_merges_closest_runs():
+    runs = [(0, 1), (10, 1), (12, 1), (100, 1)]
+
+    assert coalesce_runs(runs, 4) == runs
+    assert coalesce_runs(runs, 3) == [(0, 1), (10, 3), (100, 1)]
+    assert coalesce_runs(runs, 1) == [(0, 101)]
+
+
+class FakePhoenixd:
+    def __init__(self, directory):
+        self.dir = directory
+
+    def set_directory(self, directory):
+        self.dir = directory
+
+    @contextmanager
+    def run(self):
+        yield
+
+
+class FakeLoader(PloImageLoader):
+    delta_block_size = BLOCK
+
+    def __init__(self, phoenixd, board, delta):
+        super().__init__(
+            dut=None,
+            rebooter=lambda **_: None,
+            image=PloImageProperty(file="phoenix.disk", source="usb0", memory_bank="flash0"),
+            plo_loader=lambda: None,
+            phoenixd=phoenixd,
+            board=board,
+            delta=delta,
+        )
+        self.copies = []
+
+    def copy_file2mem(self, src, file, dst="flash1", off=0, size=0, timeout=-1):
+        data = Path(self.phoenixd.dir, file).read_bytes()
+        self.copies.append((file, off, size, data))
+
+
+def test_delta_flash_copies_changed_blocks(tmp_path):
+    boot = tmp_path / "boot"
+    boot.mkdir()
+    write_image(boot / "phoenix.disk", [0, 1, 2, 3, 4, 5, 6, 7])
+    phoenixd = FakePhoenixd(boot)
+
+    loader = FakeLoader(phoenixd, "board", delta=True)
+    loader()
+    assert [copy[:3] for copy in loader.copies] == [("phoenix.disk", 0, 0)]
+
+    write_image(boot / "phoenix.disk", [0, 1, 9, 3, 4, 5, 6, 7])
+    loader.copies.clear()
+    loader()
+    assert loader.copies == [("delta0", 2 * BLOCK, BLOCK, bytes([9]) * BLOCK)]
+    assert phoenixd.dir == boot.resolve()
+
+    # Without delta mode the whole image is copied, but the manifest is kept up to date
+    write_image(boot / "phoenix.disk", [0, 1, 2, 3, 4, 5, 6, 7])
+    loader.delta = False
+    loader.copies.clear()
+    loader()
+    assert [copy[:3] for copy in loader.copies] == [("phoenix.disk", 0, 0)]
+
+    loader.delta = True
+    loader.copies.clear()
+    loader()
+    assert loader.copies == []
+
+
+@pytest.mark.parametrize(
+    "should_flash, force_flash, is_flashed, expected",
+    [
+        (True, False, False, True),
+        (True, False, True, False),
+        (True, True, True, True),
+        (False, False, False, False),
+    ],
+)
+def test_needs_flash(should_flash, force_flash, is_flashed, expected):
+    ctx = SimpleNamespace(
+        should_flash=should_flash,
+        force_flash=force_flash,
+        target=SimpleNamespace(is_flashed=lambda: is_flashed),
+    )
+
+    assert TestRunner(ctx, test_paths=[]).needs_flash() == expected
@@ -0,0 +1,92 @@
+import xml.etree.ElementTree as ET
+from types import SimpleNamespace
+
+import pytest
+
+from trunner.journal import read_journal
+from trunner.test_runner import TestRunner
+from trunner.types import Status, TestOptions, TestResult, TestStage
+
+# Pytest tries to collect some classes as tests, mark them as not testable
+TestOptions.__test__ = False
+TestResult.__test__ = False
+TestRunner.__test__ = False
+TestStage.__test__ = False
+
+
+class FakeRunner(TestRunner):
+    def __init__(self, ctx, crash_on=None):
+        super().__init__(ctx, test_paths=[])
+        self.crash_on = crash_on
+        self.ran = []
+
+    def run_test(self, test, last_test_failed):
+        if test.name == self.crash_on:
+            raise KeyboardInterrupt()
+
+        self.ran.append(test.name)
+        result = TestResult(test.name)
+        result.set_stage(TestStage.RUN)
+        result.add_subresult("case", Status.FAIL if test.name == "test1" else Status.OK, "msg")
+        result.telemetry.mark("shell", 1.0)
+        result.set_stage(TestStage.DONE)
+        if test.name == "test1":
+            result.fail("failed")
+
+        return result
+
+
+def make_ctx(tmp_path, resume):
+    return SimpleNamespace(
+        output=str(tmp_path / "report"),
+        target=SimpleNamespace(name="ia32-generic-qemu", dut=None),
+        host=SimpleNamespace(name="emu"),
+        resume=resume,
+        verbosity=0,
+        stream_output=False,
+        logdir=None,
+    )
+
+
+def test_result_survives_journal():
+    result = TestResult("test")
+    result.set_stage(TestStage.RUN)
+    result.add_subresult("sub", Status.SKIP, "skipped")
+    result.telemetry.add_command("ls", 0.01)
+    result.fail("failed", summary="summary")
+
+    restored = TestResult.from_journal(result.to_journal())
+    assert restored.to_csv() == result.to_csv()
+    assert restored.to_str(2) == result.to_str(2)
+    assert restored.to_telemetry() == result.to_telemetry()
+
+
+def test_resume_skips_finished_tests(tmp_path):
+    tests = [TestOptions(name=f"test{i}") for i in range(4)]
+
+    runner = FakeRunner(make_ctx(tmp_path, resume=False), crash_on="test2")
+    runner.start_report()
+    with pytest.raises(KeyboardInterrupt):
+        runner.run_tests(tests)
+
+    # simulate a line damaged by the crash
+    with open(tmp_path / "report.journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"name": "test2", "sta')
+
+    header, results = read_journal(tmp_path / "report.journal.jsonl")
+    assert header == {"target": "ia32-generic-qemu"}
+    assert [res.name for res in results] == ["test0", "test1"]
+
+    runner = FakeRunner(make_ctx(tmp_path, resume=True))
+    runner.start_report()
+    results = runner.run_tests(tests)
+    assert runner.ran == ["test2", "test3"]
+    assert not runner.report(results)
+
+    root = ET.parse(tmp_path / "report.xml").getroot()
+    assert [suite.attrib["name"] for suite in root] == [f"ia32-generic-qemu:test{i}" for i in range(4)]
+    assert root.attrib["failures"] == "1"
+    assert (tmp_path / "report.csv").read_text().count("test1,,FAIL") == 1
+
+    _, results = read_journal(tmp_path / "report.journal.jsonl")
+    assert [res.name for res in results] == [f"test{i}" for i in range(4)]
@@ -0,0 +1,65 @@
+import xml.etree.ElementTree as ET
+from types import SimpleNamespace
+
+from trunner.junit import JUnitTestCase, JUnitTestSuite, JUnitWriter
+from trunner.test_runner import TestRunner
+from trunner.types import Status, TestResult, TestStage
+
+# Pytest tries to collect some classes as tests, mark them as not testable
+TestResult.__test__ = False
+TestRunner.__test__ = False
+TestStage.__test__ = False
+
+
+def test_report_is_valid_after_every_suite(tmp_path):
+    path = tmp_path / "report.xml"
+
+    with JUnitWriter(str(path), hostname="host") as writer:
+        assert ET.parse(path).getroot().attrib["tests"] == "0"
+
+        writer.write(JUnitTestSuite("t:a", testcases=[JUnitTestCase("t:a", "a", time=0.5)]))
+        writer.write(
+            JUnitTestSuite(
+                "t:b",
+                testcases=[
+                    JUnitTestCase("t:b.1", "b", result="failure", message='bad "value" <&>', system_out="\x07out ]]>"),
+                    JUnitTestCase("t:b.2", "b", result="skipped", message="skip"),
+                ],
+            )
+        )
+
+        # report is complete before the writer is closed
+        root = ET.parse(path).getroot()
+
+    assert root.attrib == {"tests": "3", "failures": "1", "errors": "0", "skipped": "1", "time": "0.5"}
+    suites = root.findall("testsuite")
+    assert [suite.attrib["name"] for suite in suites] == ["t:a", "t:b"]
+    assert suites[1].attrib["hostname"] == "host"
+    assert suites[1].find("testcase/failure").attrib["message"] == 'bad "value" <&>'
+    assert suites[1].find("testcase/system-out").text == "out ]]>"
+
+
+def test_runner_writes_results_as_they_are_added(tmp_path):
+    ctx = SimpleNamespace(
+        output=str(tmp_path / "report"),
+        target=SimpleNamespace(name="ia32-generic-qemu"),
+        host=SimpleNamespace(name="emu"),
+        resume=False,
+    )
+    runner = TestRunner(ctx, test_paths=[])
+    runner.start_report()
+
+    result = TestResult("phoenix-rtos-tests/psh/test-ls")
+    result.set_stage(TestStage.RUN)
+    result.add_subresult("ls_dir", Status.OK)
+    result.add_subresult("ls_missing", Status.FAIL, "\033[31mNo such file\033[0m\nmore details")
+    result.fail()
+    runner.add_result(result)
+
+    suite = ET.parse(tmp_path / "report.xml").getroot().find("testsuite")
+    assert suite.attrib["name"] == "ia32-generic-qemu:phoenix-rtos-tests/psh/test-ls"
+    failure = suite.find("testcase[@name='ia32-generic-qemu:phoenix-rtos-tests/psh/test-ls.ls_missing']/failure")
+    assert failure.attrib["message"] == "No such file"
+
+    runner._export_results_xml([result])
+    assert ET.parse(tmp_path / "report.xml").getroot().attrib["failures"] == "1"
@@ -0,0 +1,136 @@
+import os
+import socket
+import sys
+
+import pytest
+
+import trunner.tools.gdb
+from trunner import aio
+from trunner.tools import OpenocdSession
+from trunner.tools.gdb import OpenocdError
+
+# Serves the openocd TCL protocol on the port given as the last argument, commands are logged to cmds.log
+FAKE_OPENOCD = f"""#!{sys.executable}
+import re, socket, sys
+
+server = socket.create_server(("localhost", int(sys.argv[-1])))
+print("Info : Listening on port 3333 for gdb connections", flush=True)
+
+while True:
+    conn, _ = server.accept()
+    script = conn.recv(4096).rstrip(b"\\x1a").decode()
+    cmd = re.fullmatch(r"format {{%d %s}} \\[catch {{(.*)}} trunner_out\\] \\$trunner_out", script).group(1)
+    with open("cmds.log", "a") as log:
+        log.write(cmd + "\\n")
+    if cmd == "flood":
+        for _ in range(2000):
+            print("Info : " + "x" * 100, flush=True)
+    if cmd != "drop":
+        conn.sendall(b"1 failed\\x1a" if cmd == "fail" else b"0 ok\\x1a")
+    conn.close()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(params=[False, True], ids=["pexpect", "aio"])
+def session(request, tmp_path, monkeypatch):
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    (bindir / "openocd").write_text(FAKE_OPENOCD)
+    (bindir / "openocd").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+
+    probes = [[(1, 5)]]
+    monkeypatch.setattr(trunner.tools.gdb, "usb_device_ids", lambda vid, pid: probes[0])
+
+    aio.enable(request.param)
+    port = free_port()
+    session = OpenocdSession(
+        interface="stlink",
+        target="stm32l4x",
+        extra_args=[str(port)],
+        probe=(0x0483, 0x374B),
+        reuse_cmds=["reset"],
+        tcl_port=port,
+    )
+    yield session, probes, tmp_path / "cmds.log"
+    session.close()
+    aio.enable(False)
+
+
+def test_session_is_reused(session):
+    session, _, cmds = session
+
+    for _ in range(3):
+        with session.run():
+            assert session.is_running()
+
+    assert session.starts == 1
+    assert cmds.read_text().split() == ["reset", "reset"]
+
+
+def test_session_restarts_after_reenumeration(session):
+    session, probes, _ = session
+
+    with session.run():
+        pass
+
+    probes[0] = [(1, 6)]
+
+    with session.run():
+        pass
+
+    assert session.starts == 2
+
+
+def test_session_restarts_after_failed_command(session):
+    session, _, _ = session
+
+    with session.run():
+        pass
+
+    session.reuse_cmds = ["fail"]
+    with pytest.raises(OpenocdError):
+        with session.run():
+            pass
+
+    assert not session.is_running()
+
+    session.reuse_cmds = ["reset"]
+    with session.run():
+        pass
+
+    assert session.starts == 2
+
+
+@pytest.mark.parametrize("cmd", ["fail", "drop"])
+def test_failed_command_raises(session, cmd):
+    session, _, _ = session
+
+    with session.run():
+        assert session.command("reset") == "ok"
+
+        with pytest.raises(OpenocdError):
+            session.command(cmd)
+
+
+def test_output_is_read_and_only_its_end_kept(session):
+    session, _, _ = session
+
+    with session.run():
+        session.logfile.max_chars = 1000
+
+        # fake openocd replies after writing all its output, which blocks if the output isn't read
+        session.command("flood", timeout=30)
+
+        assert "Info : xxx" in session.logfile.getvalue()
+        assert len(session.logfile.getvalue()) <= 1000
+        if not isinstance(session.proc, aio.StreamSpawn):
+            # only the rest of the startup line waited for in _start() can be left there
+            assert len(session.proc.buffer) < 100
@@ -0,0 +1,86 @@
+import pytest
+
+from trunner.dut import HostDut
+from trunner.harness import PloInterface, PloJffs2CleanmarkerSpec
+from trunner.harness.plo import PloError
+
+CLEANMARKERS = PloJffs2CleanmarkerSpec(start_block=0x40, number_of_blocks=200, block_size=0x10000, cleanmarker_size=12)
+
+
+def fake_plo(body):
+    # Read the jffs2 command, print the progress the way plo does and end with the prompt
+    dut = HostDut()
+    dut.set_args(f"sh -c 'read cmd; printf \"\\n\"; {body}; printf \"(plo)%% \"'", encoding="utf-8", timeout=5)
+    dut.open()
+    return dut
+
+
+def test_jffs2_consumes_progress_in_bulk():
+    dut = fake_plo(
+        "i=0; while [ $i -lt 200 ]; do printf \"\\rjffs2: block %d/200\" $i; i=$((i+1)); done; "
+        "printf \"\\njffs2: written cleanmarks\\n\""
+    )
+
+    stats = PloInterface(dut).jffs2("2.0", True, CLEANMARKERS, block_timeout=1)
+    assert stats.blocks == 200
+    assert stats.rate > 0
+
+
+def test_jffs2_tolerates_skipped_lines():
+    dut = fake_plo("printf \"\\rjffs2: block 0/200\\rjffs2: block 150/200\\njffs2: written cleanmarks\\n\"")
+
+    assert PloInterface(dut).jffs2("2.0", True, CLEANMARKERS, block_timeout=1).blocks == 200
+
+
+def test_jffs2_ends_with_prompt_when_echo_is_off():
+    # plo prints "written cleanmarks" with log_info, which is silent unless echo is on
+    dut = fake_plo("i=0; while [ $i -lt 200 ]; do printf \"\\rjffs2: block %d/200\" $i; i=$((i+1)); done")
+
+    assert PloInterface(dut).jffs2("2.0", True, CLEANMARKERS, block_timeout=1).blocks == 200
+
+
+def test_jffs2_fails_on_stalled_progress():
+    dut = fake_plo("printf \"\\rjffs2: block 0/200\"; sleep 3")
+
+    with pytest.raises(PloError, match="Wrong jffs2 command output"):
+        PloInterface(dut).jffs2("2.0", True, CLEANMARKERS, block_timeout=0.5)
+
+
+def test_jffs2_fails_on_error():
+    dut = fake_plo("printf \"\\rjffs2: block 0/200\\n\\033[31mError erasing -5\\n\"; sleep 3")
+
+    with pytest.raises(PloError, match="jffs2 command failed"):
+        PloInterface(dut).jffs2("2.0", True, CLEANMARKERS, block_timeout=1)
+
+
+def fake_plo_prompt():
+    # Echo commands the way plo does (when they are read) and fail on commands starting with "bad"
+    dut = HostDut()
+    dut.set_args(
+        "sh -c 'stty -echo; printf \"(plo)%% \"; while read cmd; do printf \"%s\\n\" \"$cmd\"; "
+        "case $cmd in bad*) printf \"\\033[31mError\\n\";; esac; printf \"(plo)%% \"; done'",
+        encoding="utf-8",
+        timeout=5,
+    )
+    dut.open()
+    PloInterface(dut).wait_prompt()
+    return dut
+
+
+def test_cmd_batch_pipelines_commands():
+    dut = fake_plo_prompt()
+    cmds = [PloInterface.alias_cmd(f"app{i}", 0x30000 + i * 0x200, 0x1FF) for i in range(10)]
+
+    PloInterface(dut).cmd_batch(cmds, window=64)
+
+    dut.sendline("done")
+    dut.expect_exact("done")
+
+
+def test_cmd_batch_reports_failed_command():
+    dut = fake_plo_prompt()
+
+    with pytest.raises(PloError) as exc_info:
+        PloInterface(dut).cmd_batch(["alias a 0x0 0x10", "bad command", "alias b 0x10 0x10"])
+
+    assert exc_info.value.cmd == "bad command"
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import pytest
+
+from trunner.harness import base as harness_base
+from trunner.harness import Rebooter, RebooterHarness
+from trunner.reboot_profile import RebootProfile
+from trunner.target import armv7a9
+from trunner.target.armv7a9 import ARMv7A9TargetRebooter
+from trunner.target.armv7m7 import ARMv7M7TargetRebooter
+from trunner.types import TestResult
+
+TestResult.__test__ = False
+
+
+@pytest.fixture
+def profile(tmp_path):
+    return RebootProfile(tmp_path / "board.json")
+
+
+def test_defaults_without_enough_samples(profile):
+    profile.record("plo", 0.2)
+    profile.record("plo", 0.3)
+
+    assert profile.timeout("plo", 3) == 3
+    assert profile.delay("plo", 0.5) == 0.5
+
+
+def test_tuned_values_have_margin_and_floor(profile):
+    for seconds in (0.3, 0.4, 0.35):
+        profile.record("plo", seconds)
+
+    # longest time with margin, but not shorter than floor
+    assert profile.timeout("plo", 3) == 1.0
+    assert profile.timeout("plo", 3, floor=0.5) == pytest.approx(0.8)
+    assert profile.delay("plo", 0.5) == 0.3
+    assert profile.delay("plo", 0.5, floor=0.4) == 0.4
+
+    # never longer than the fixed values
+    assert profile.timeout("plo", 0.5, floor=0.1) == 0.5
+    assert profile.delay("plo", 0.1) == 0.1
+
+
+def test_samples_are_stored(profile):
+    for i in range(RebootProfile.max_samples + 5):
+        profile.record("plo", i)
+
+    samples = RebootProfile(profile.path).samples["plo"]
+    assert len(samples) == RebootProfile.max_samples
+    assert samples[-1] == RebootProfile.max_samples + 4
+
+
+def test_rebooter_measures_only_normal_boot(profile):
+    host = SimpleNamespace(has_gpio=lambda: True, set_reset=lambda _: None, set_power=lambda _: None)
+    dut = SimpleNamespace(clear_buffer=lambda: None)
+    rebooter = Rebooter(host, dut, profile)
+    rebooter.plo_usb = (0xFFFF, 0xFFFF)
+
+    rebooter(flash=True)
+    rebooter.record_boot("plo")
+    assert "plo" not in profile.samples
+
+    rebooter()
+    rebooter.record_boot("plo")
+    rebooter.record_boot("plo")
+    assert len(profile.samples["plo"]) == 1
+
+
+class FakeWatcher:
+    def __init__(self, *_):
+        self.timeouts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    def devices(self):
+        return ["/dev/ttyACM9"]
+
+    def wait_for_removal(self, device, timeout=None):
+        self.timeouts.append(timeout)
+        return True
+
+
+def test_target_soft_reboot_waits_only_for_boot_time(profile, monkeypatch):
+    watcher = FakeWatcher()
+    monkeypatch.setattr(harness_base, "UsbWatcher", lambda *_: watcher)
+    monkeypatch.setattr(harness_base.time, "sleep", lambda _: None)
+
+    host = SimpleNamespace(has_gpio=lambda: True, set_reset=lambda _: None, set_flash_mode=lambda _: None)
+    dut = SimpleNamespace(clear_buffer=lambda: None)
+    rebooter = ARMv7M7TargetRebooter(host, dut, profile)
+
+    rebooter(hard=True)
+    assert watcher.timeouts[-1] <= 0.25
+
+    for seconds in (0.1, 0.12, 0.11):
+        profile.record("plo", seconds)
+
+    rebooter(hard=True)
+    assert watcher.timeouts[-1] <= 0.1
+
+
+def test_target_records_boot_seen_by_next_harness(profile, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(armv7a9.time, "sleep", sleeps.append)
+
+    host = SimpleNamespace(has_gpio=lambda: True, set_power=lambda _: None, set_flash_mode=lambda _: None)
+    dut = SimpleNamespace(clear_buffer=lambda: None)
+    rebooter = ARMv7A9TargetRebooter(host, dut, profile)
+
+    def boot(result):
+        result.telemetry.mark("kernel", rebooter.released_at + 1.5)
+        return result
+
+    harness = RebooterHarness(rebooter)
+    harness.chain(boot)
+    harness(TestResult("test"))
+
+    assert profile.samples["kernel"] == [1.5]
+    assert "plo" not in profile.samples
+    # the power off time is fixed, the delay after power on is tuned
+    assert sleeps == [0.75, 0.05]
@@ -0,0 +1,61 @@
+import json
+from types import SimpleNamespace
+
+from trunner.dut import HostDut
+from trunner.harness import ShellHarness
+from trunner.test_runner import TestRunner
+from trunner.types import Telemetry, TestResult
+
+# Pytest tries to collect some classes as tests, mark them as not testable
+TestResult.__test__ = False
+TestRunner.__test__ = False
+
+
+def test_boot_phases_skip_missing_milestones():
+    telemetry = Telemetry()
+    telemetry.mark("power_on", 10.0)
+    telemetry.mark("kernel", 10.5)
+    telemetry.mark("shell", 11.25)
+    telemetry.mark("shell", 12.0)
+
+    assert telemetry.boot_phases() == {"power_on_to_kernel": 0.5, "kernel_to_shell": 0.75}
+    assert not telemetry.is_booting()
+
+
+def test_shell_harness_marks_kernel_and_prompt():
+    dut = HostDut()
+    dut.set_args(
+        "sh -c 'printf \"Phoenix-RTOS microkernel v. 3.2\\n(psh)%% \"; read cmd; echo $cmd; printf \"(psh)%% \"'",
+        encoding="utf-8",
+        timeout=5,
+    )
+    dut.open()
+
+    result = TestResult("test")
+    result.telemetry.mark("power_on")
+    harness = ShellHarness(dut, "(psh)% ", ["echo", "ok"], suppress_dmesg=False)
+    harness(result)
+
+    phases = result.telemetry.boot_phases()
+    assert list(phases) == ["power_on_to_kernel", "kernel_to_shell"]
+    assert [cmd for cmd, _ in result.telemetry.commands] == ["echo ok"]
+
+
+def test_telemetry_is_exported(tmp_path):
+    result = TestResult("phoenix-rtos-tests/psh/test-ls")
+    result.telemetry.mark("power_on", 1.0)
+    result.telemetry.mark("plo", 1.5)
+    result.telemetry.add_duration("app_load", 2.0)
+
+    ctx = SimpleNamespace(
+        output=str(tmp_path / "report"),
+        target=SimpleNamespace(name="armv7m7-imxrt106x-evk"),
+        host=SimpleNamespace(name="host-generic"),
+    )
+    TestRunner(ctx, test_paths=[])._export_results_telemetry([result])
+
+    data = json.loads((tmp_path / "report.telemetry.json").read_text())
+    assert data["target"] == "armv7m7-imxrt106x-evk"
+    assert data["tests"][0]["boot"] == {"power_on_to_plo": 0.5}
+    assert data["tests"][0]["durations"] == {"app_load": 2.0}
+    assert set(data["tests"][0]["stages"]) == {"REBOOT", "FLASH", "RUN"}
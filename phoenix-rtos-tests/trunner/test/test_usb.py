@@ -0,0 +1,54 @@
+import struct
+
+from trunner.usb import UDEV_MONITOR_MAGIC, UsbWatcher, _matches, parse_uevent
+
+
+def udev_message(props):
+    payload = b"".join(f"{key}={value}".encode() + b"\0" for key, value in props.items())
+    header = b"libudev\0" + struct.pack("!I", UDEV_MONITOR_MAGIC) + struct.pack("=III", 40, 40, len(payload))
+    header += b"\0" * (40 - len(header))
+    return header + payload
+
+
+def test_parse_udev_message():
+    props = parse_uevent(udev_message({
+        "ACTION": "add",
+        "SUBSYSTEM": "tty",
+        "DEVNAME": "/dev/ttyACM0",
+        "ID_VENDOR_ID": "16f9",
+        "ID_MODEL_ID": "0003",
+    }))
+
+    assert props["ACTION"] == "add"
+    assert props["DEVNAME"] == "/dev/ttyACM0"
+    assert _matches(props, 0x16F9, 0x0003)
+    assert not _matches(props, 0x16F9, 0x0004)
+
+
+def test_parse_kernel_message():
+    data = b"remove@/devices/usb1/1-1\0ACTION=remove\0SUBSYSTEM=usb\0PRODUCT=16f9/3/100\0"
+    props = parse_uevent(data)
+
+    assert props["ACTION"] == "remove"
+    assert _matches(props, 0x16F9, 0x0003)
+
+
+def test_parse_malformed_messages():
+    assert parse_uevent(b"libudev\0short") is None
+    assert parse_uevent(udev_message({"ACTION": "add"})[:12] + b"\0" * 12) is None
+    assert parse_uevent(b"add@/devices/x\0SUBSYSTEM=tty\0") is None
+
+
+def test_kernel_tty_event_wakes_up_waiter():
+    assert _matches({"ACTION": "add", "SUBSYSTEM": "tty", "DEVNAME": "ttyACM0"}, 0x16F9, 0x0003)
+    assert not _matches({"ACTION": "add", "SUBSYSTEM": "block"}, 0x16F9, 0x0003)
+
+
+def test_polling_fallback_times_out(monkeypatch):
+    monkeypatch.setattr(UsbWatcher, "_open_netlink", staticmethod(lambda: None))
+    monkeypatch.setattr(UsbWatcher, "devices", lambda self: ["/dev/ttyACM0"])
+
+    with UsbWatcher(0x16F9, 0x0003) as watcher:
+        assert not watcher.uses_events
+        assert watcher.wait_for_device(timeout=0.1) == ["/dev/ttyACM0"]
+        assert not watcher.wait_for_removal("/dev/ttyACM0", timeout=0.05)
@@ -1,16 +1,19 @@
+import json
 import os
 import shutil
 import sys
-import junitparser
 from io import StringIO
 from pathlib import Path
 from collections import Counter
-from typing import List, Sequence, TextIO
+from typing import List, Optional, Sequence, TextIO
 
+from trunner.capture import Capture
 from trunner.config import ConfigParser
 from trunner.ctx import TestContext
 from trunner.dut import Dut
 from trunner.harness import HarnessError, FlashError
+from trunner.journal import ResultJournal
+from trunner.junit import JUnitWriter
 from trunner.text import bold, green, red, yellow, magenta
 from trunner.types import Status, TestOptions, TestResult, TestStage, is_github_actions, get_ci_url
 
@@ -46,18 +49,18 @@ class LogWrapper(StringIO):
         return super().flush()
 
 
-def init_logdir(logdir: str):
-    """Inits log directories if it's needed."""
+def init_logdir(logdir: str, clear: bool = True):
+    """Inits log directories if it's needed. Logs of the previous campaign are kept if clear is False."""
     if not logdir:
         return
 
     # clear the whole log directory before the next campaign
-    if os.path.isdir(logdir):
+    if clear and os.path.isdir(logdir):
         for file in os.listdir(logdir):
             shutil.rmtree(f"{logdir}/{file}")
 
     # test campaign directory will always be needed
-    os.makedirs(f"{logdir}/test_campaign")
+    os.makedirs(f"{logdir}/test_campaign", exist_ok=not clear)
 
 
 def set_logfiles(dut: Dut, ctx: TestContext):
@@ -71,7 +74,8 @@ def set_logfiles(dut: Dut, ctx: TestContext):
         logfile_r = LogWrapper(sys.stdout)
 
     logfile_w, logfile_a = StringIO(""), StringIO("")
-    dut.set_logfiles(logfile_r, logfile_w, logfile_a)
+    capture = Capture() if ctx.timestamps and ctx.logdir else None
+    dut.set_logfiles(logfile_r, logfile_w, logfile_a, capture)
 
 
 def save_logfiles(dut: Dut, dirname: str, logdir: str):
@@ -79,6 +83,15 @@ def save_logfiles(dut: Dut, dirname: str, logdir: str):
 
     # we want to dump logs in the given directory
     if logdir:
+        capture = dut.get_capture()
+        records = capture.getvalue() if capture else b""
+        if records:
+            os.makedirs(f"{logdir}/{dirname}", exist_ok=True)
+            with open(f"{logdir}/{dirname}/capture.bin", "wb") as f:
+                f.write(records)
+            with open(f"{logdir}/test_campaign/capture.bin", "ab") as f:
+                f.write(records)
+
         for logfile_name, log in zip(("out", "in", "inout"), dut.get_logfiles()):
             logs = log.getvalue()
             # empty string -> do not dump logs
@@ -100,6 +113,8 @@ class TestRunner:
         self.target = self.ctx.target
         self.test_configs = []
         self.test_paths = test_paths
+        self.junit: Optional[JUnitWriter] = None
+        self.journal: Optional[ResultJournal] = None
 
     def search_for_tests(self) -> List[Path]:
         """Returns test*.yaml files that are searched in directories given in test_paths attribute."""
@@ -140,16 +155,29 @@ class TestRunner:
 
         return tests
 
-    def flash(self) -> TestResult:
-        """Flashes the device under test."""
+    def needs_flash(self) -> bool:
+        """Returns true if the device should be flashed before the tests."""
+
+        if not self.ctx.should_flash:
+            return False
+
+        if not self.ctx.force_flash and self.target.is_flashed():
+            print("Device already holds the image, skipping flashing (use --force-flash to flash it anyway)")
+            return False
+
+        return True
+
+    def flash(self, name: str = "flash") -> TestResult:
+        """Flashes the device under test. The name is used for the returned result."""
 
         print("Flashing an image to device...")
 
         # report flashing as a test result to include in export (especially useful when failed)
-        result = TestResult("flash")
+        result = TestResult(name)
 
         try:
             result.set_stage(TestStage.RUN)
+            self.target.flash_telemetry = result.telemetry
             self.target.flash_dut()
             result.set_stage(TestStage.DONE)
         except (FlashError, HarnessError) as exc:
@@ -194,41 +222,152 @@ class TestRunner:
 
         print(f"Test results written to: {fname}")
 
+    def _open_results_xml(self):
+        properties = {}
+        if is_github_actions():
+            properties = {"url": get_ci_url(), "SHA": os.environ["GITHUB_SHA"]}
+
+        # we should be able to have testsuites within testsuites but many tools doesn't support that
+        # map every TestResult to TestSuite instead
+        self.junit = JUnitWriter(self.ctx.output + ".xml", self.ctx.host.name, properties)
+        self.junit.open()
+
+    def start_report(self):
+        """Opens the jUnit XML report and the result journal, to which results are written as soon as they are added.
+
+        If the campaign is resumed, results restored from the journal are available through resumed_result().
+        """
+        if not self.ctx.output:
+            return
+
+        self.journal = ResultJournal(self.ctx.output + ".journal.jsonl", self.ctx.target.name)
+        self.journal.open(resume=self.ctx.resume)
+        self._open_results_xml()
+
+    def _write_reports(self, result: TestResult):
+        if self.junit is not None:
+            self.junit.write(result.to_junit_testsuite(self.ctx.target.name))
+
+    def add_result(self, result: TestResult):
+        """Writes the finished result to the journal and the reports that are written during the campaign."""
+        self._write_reports(result)
+        if self.journal is not None:
+            self.journal.append(result)
+
+    def resumed_result(self, name: str) -> Optional[TestResult]:
+        """Returns the result of the test if it finished before the campaign was resumed, None otherwise."""
+        if self.journal is None:
+            return None
+
+        result = self.journal.take(name)
+        if result is not None:
+            self._write_reports(result)
+
+        return result
+
+    def resumed_flash(self, name: str = "flash") -> Optional[TestResult]:
+        """Returns the result of flashing if the device was flashed before the campaign was resumed.
+
+        Failed attempts are dropped, the device has to be flashed again after them.
+        """
+        if self.journal is None:
+            return None
+
+        result = self.journal.take(name)
+        while result is not None and not result.is_ok():
+            result = self.journal.take(name)
+
+        if result is not None:
+            self._write_reports(result)
+
+        return result
+
     def _export_results_xml(self, results: Sequence[TestResult]):
         """write results to fname in jUnit XML format"""
         if not self.ctx.output:
             return
 
-        fname = self.ctx.output + ".xml"
-        # we should be able to have testsuites within testsuites but many tools doesn't support that
-        # map every TestResult to TestSuite instead
+        if self.junit is None:
+            # results weren't written during the campaign
+            self._open_results_xml()
+            for res in results:
+                self._write_reports(res)
 
-        xml = junitparser.JUnitXml()
-        for res in results:
-            suite = res.to_junit_testsuite(self.ctx.target.name)
-            suite.hostname = self.ctx.host.name
-            if is_github_actions():
-                suite.add_property("url", get_ci_url())
-                suite.add_property("SHA", os.environ["GITHUB_SHA"])
+        self.junit.close()
+        self.junit = None
 
-            xml.add_testsuite(suite)
+        print(f"Test results written to: {self.ctx.output}.xml")
+
+    def _export_results_telemetry(self, results: Sequence[TestResult]):
+        """write timing of test stages and boot telemetry to fname in JSON format"""
+        if not self.ctx.output:
+            return
+
+        fname = self.ctx.output + ".telemetry.json"
+
+        telemetry = {
+            "target": self.ctx.target.name,
+            "host": self.ctx.host.name,
+            "tests": [res.to_telemetry() for res in results],
+        }
+
+        with open(fname, "w", encoding="utf-8") as out_json:
+            json.dump(telemetry, out_json, indent=1)
+
+        print(f"Test telemetry written to: {fname}")
+
+    def run_test(self, test: TestOptions, last_test_failed: bool) -> TestResult:
+        """Builds and runs a single test and returns its result.
+
+        Arguments:
+            test: Test options that describe how test looks like.
+            last_test_failed: True if the previous test run on the device failed (forces reboot).
+        """
+
+        test.should_reboot = self.reboots(test, last_test_failed)
+
+        result = TestResult(test.name)
+
+        if test.ignore:
+            result.skip()
+        else:
+            set_logfiles(self.target.dut, self.ctx)
+            harness = self.target.build_test(test)
+
+            if not test.should_reboot:  # WARN: build_test may change TestOptions
+                # if not rebooting - force new prompt to appear
+                self.target.dut.send("\n")
+
+            test_result = None
+            assert harness is not None
 
-        xml.update_statistics()
-        try:
-            xml.write(fname, pretty=True)  # TODO: remove pretty
-        except Exception:
-            # DEBUG: in case of XML error - try dumping to stdout to inspect the XML
             try:
-                from lxml import etree
-            except ImportError:
-                from xml.etree import ElementTree as etree
-            with open(fname, "wb") as out_xml:
-                text = etree.tostring(xml._elem)
-                out_xml.write(text)
+                test_result = harness(result)
+                assert test_result is not None, "harness needs to return TestResult"
+                result.overwrite(test_result)
+            except HarnessError as e:
+                result.fail(str(e))
+
+        self.target.dut.read(timeout=0.1)  # try to read (pass to logs) remaining test output
+        return result
 
-            raise
+    def reboots(self, test: TestOptions, last_test_failed: bool) -> bool:
+        """Returns true if the device will be rebooted before the test."""
 
-        print(f"Test results written to: {fname}")
+        # By default we don't want to reboot the entire device to speed up the test execution)
+        # if not explicitly required by the test.
+        if test.should_reboot or last_test_failed:
+            return True
+
+        if self.ctx.nightly:
+            return True
+
+        # We have to enter the bootloader in order to load applications.
+        return self.loads_apps(test)
+
+    def loads_apps(self, test: TestOptions) -> bool:
+        """Returns true if the test loads applications using the bootloader."""
+        return not self.ctx.target.rootfs and test.bootloader is not None and bool(test.bootloader.apps)
 
     def run_tests(self, tests: Sequence[TestOptions]) -> Sequence[TestResult]:
         """It builds and runs tests based on given test options.
@@ -245,46 +384,19 @@ class TestRunner:
         last_test_failed = True
 
         for test in tests:
-            # By default we don't want to reboot the entire device to speed up the test execution)
-            # if not explicitly required by the test.
-            if last_test_failed:
-                test.should_reboot = True
-
-            if self.ctx.nightly:
-                test.should_reboot = True
-
-            # We have to enter the bootloader in order to load applications.
-            if not self.ctx.target.rootfs and test.bootloader is not None and test.bootloader.apps:
-                test.should_reboot = True
+            result = self.resumed_result(test.name)
+            if result is not None:
+                print(f"{test.name} (resumed): {result.to_str(self.ctx.verbosity)}", end="", flush=True)
+                results.append(result)
+                continue
 
-            result = TestResult(test.name)
             self._print_test_header_begin(test)
-
-            if test.ignore:
-                result.skip()
-            else:
-                set_logfiles(self.target.dut, self.ctx)
-                harness = self.target.build_test(test)
-
-                if not test.should_reboot:  # WARN: build_test may change TestOptions
-                    # if not rebooting - force new prompt to appear
-                    self.target.dut.send("\n")
-
-                test_result = None
-                assert harness is not None
-
-                try:
-                    test_result = harness(result)
-                    assert test_result is not None, "harness needs to return TestResult"
-                    result.overwrite(test_result)
-                except HarnessError as e:
-                    result.fail(str(e))
-
-            self.target.dut.read(timeout=0.1)  # try to read (pass to logs) remaining test output
+            result = self.run_test(test, last_test_failed)
             self._print_test_header_end(test)
             print(result.to_str(self.ctx.verbosity), end="", flush=True)
 
             results.append(result)
+            self.add_result(result)
 
             if result.is_skip():
                 continue
@@ -295,6 +407,28 @@ class TestRunner:
 
         return results
 
+    def report(self, results: Sequence[TestResult]) -> bool:
+        """Prints the summary of results and exports them. Returns true if there are no failed tests."""
+
+        sums = Counter(res.status for res in results)
+
+        print(
+            f"TESTS: {len(results)} "
+            f"{green('PASSED')}: {sums.get(Status.OK, 0)} "
+            f"{red('FAILED')}: {sums.get(Status.FAIL, 0)} "
+            f"{yellow('SKIPPED')}: {sums.get(Status.SKIP, 0)}"
+        )
+
+        self._export_results_csv(results)
+        self._export_results_xml(results)
+        self._export_results_telemetry(results)
+
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+        return sums.get(Status.FAIL, 0) == 0
+
     def run(self) -> bool:
         """Runs the entire test campaign based on yamls given in test_paths attribute.
 
@@ -303,15 +437,20 @@ class TestRunner:
 
         tests = self.parse_tests()
 
-        init_logdir(self.ctx.logdir)
+        init_logdir(self.ctx.logdir, clear=not self.ctx.resume)
+        self.start_report()
         results = []
 
         run_tests = self.ctx.should_test
 
-        if self.ctx.should_flash:
-            set_logfiles(self.target.dut, self.ctx)
-            flash_result = self.flash()
-            save_logfiles(self.target.dut, "flash", self.ctx.logdir)
+        if self.needs_flash():
+            flash_result = self.resumed_flash()
+            if flash_result is None:
+                set_logfiles(self.target.dut, self.ctx)
+                flash_result = self.flash()
+                save_logfiles(self.target.dut, "flash", self.ctx.logdir)
+                self.add_result(flash_result)
+
             results.append(flash_result)
 
             if not flash_result.is_ok():
@@ -321,16 +460,4 @@ class TestRunner:
             _add_tests_module_to_syspath(self.ctx.project_path)
             results.extend(self.run_tests(tests))
 
-        sums = Counter(res.status for res in results)
-
-        print(
-            f"TESTS: {len(results)} "
-            f"{green('PASSED')}: {sums.get(Status.OK, 0)} "
-            f"{red('FAILED')}: {sums.get(Status.FAIL, 0)} "
-            f"{yellow('SKIPPED')}: {sums.get(Status.SKIP, 0)}"
-        )
-
-        self._export_results_csv(results)
-        self._export_results_xml(results)
-
-        return sums.get(Status.FAIL, 0) == 0
+        return self.report(results)
@@ -1,10 +1,11 @@
 from .phoenix import Phoenixd, PhoenixdError, Psu, PsuError, wait_for_vid_pid
-from .gdb import GdbInteractive, OpenocdGdbServer, JLinkGdbServer
+from .gdb import GdbInteractive, OpenocdGdbServer, OpenocdSession, JLinkGdbServer
 
 __all__ = [
     "JLinkGdbServer",
     "GdbInteractive",
     "OpenocdGdbServer",
+    "OpenocdSession",
     "Phoenixd",
     "PhoenixdError",
     "Psu",
@@ -1,13 +1,19 @@
+import atexit
 import io
 import signal
+import socket
+import threading
+from collections import deque
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Union, List
+from typing import Deque, Optional, Sequence, Tuple, Union, List
 
 import pexpect
 
+from trunner import aio
 from trunner.harness import ProcessError
 from trunner.dut import clear_pexpect_buffer
+from trunner.usb import usb_device_ids
 from .common import add_output_to_exception
 
 
@@ -74,7 +80,7 @@ class GdbInteractive:
     @add_output_to_exception(GdbError)
     def run(self):
         try:
-            self.proc = pexpect.spawn(
+            self.proc = aio.spawn(
                 "gdb-multiarch",
                 encoding="ascii",
                 timeout=8,
@@ -116,26 +122,32 @@ class OpenocdGdbServer:
             if not target or not interface:
                 raise OpenocdError("Target or Interface arguments missing")
 
-    @contextmanager
-    @add_output_to_exception(OpenocdError)
-    def run(self):
-        try:
-            # Use pexpect.spawn to run a process as PTY, so it will flush on a new line
-            if self.board:
-                args = ["-f", f"board/{self.board}.cfg"]
-            else:
-                args = ["-f", f"interface/{self.interface}.cfg", "-f", f"target/{self.target}.cfg"]
+    def _start(self):
+        # Use pexpect.spawn to run a process as PTY, so it will flush on a new line
+        if self.board:
+            args = ["-f", f"board/{self.board}.cfg"]
+        else:
+            args = ["-f", f"interface/{self.interface}.cfg", "-f", f"target/{self.target}.cfg"]
+
+        if self.extra_args:
+            args.extend(self.extra_args)
 
-            if self.extra_args:
-                args.extend(self.extra_args)
+        self.proc = aio.spawn("openocd", args, encoding="ascii", logfile=self.logfile)
 
-            self.proc = pexpect.spawn("openocd", args, encoding="ascii", logfile=self.logfile)
+        try:
+            self.proc.expect_exact("Info : Listening on port 3333 for gdb connections")
+        except (pexpect.TIMEOUT, pexpect.EOF) as e:
+            raise OpenocdError("Failed to start gdb server", self.logfile.getvalue()) from e
 
-            try:
-                self.proc.expect_exact("Info : Listening on port 3333 for gdb connections")
-            except (pexpect.TIMEOUT, pexpect.EOF) as e:
-                raise OpenocdError("Failed to start gdb server", self.logfile.getvalue()) from e
+        if isinstance(self.proc, aio.StreamSpawn):
+            # Nothing expects openocd output later, keep it only in logs
+            self.proc.drain()
 
+    @contextmanager
+    @add_output_to_exception(OpenocdError)
+    def run(self):
+        try:
+            self._start()
             yield
         finally:
             self._close()
@@ -151,6 +163,167 @@ class OpenocdGdbServer:
         self.logfile.close()
 
 
+class _TailLog:
+    """Log that keeps only the last max_chars characters written, for processes running for a long time."""
+
+    def __init__(self, max_chars: int = 64 * 1024):
+        self.max_chars = max_chars
+        self._chunks: Deque[str] = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def write(self, s: str):
+        with self._lock:
+            self._chunks.append(s)
+            self._size += len(s)
+            while self._size - len(self._chunks[0]) >= self.max_chars:
+                self._size -= len(self._chunks.popleft())
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        with self._lock:
+            return "".join(self._chunks)[-self.max_chars :]
+
+    def close(self):
+        pass
+
+
+class OpenocdSession(OpenocdGdbServer):
+    """OpenOCD instance kept alive for the whole campaign, one per debug probe.
+
+    Initialization of the probe takes a few seconds, so the session starts openocd once and every run()
+    only hands out the gdb server, which accepts a new gdb connection each time. Commands that a fresh
+    openocd would run at startup (like reset) are sent through the openocd TCL server instead.
+
+    Openocd is restarted when it died, when the probe was re-enumerated (e.g. it's powered by a board
+    that was power cycled) or when a command failed.
+
+    Attributes:
+        probe: vid:pid of the debug probe, used to detect its re-enumeration.
+        reuse_cmds: Commands sent to openocd every time the running session is reused.
+        tcl_port: Port of the openocd TCL server.
+        starts: Number of openocd starts.
+    """
+
+    def __init__(
+        self,
+        interface: Optional[str] = None,
+        target: Optional[str] = None,
+        board: Optional[str] = None,
+        extra_args: Optional[List[str]] = None,
+        probe: Optional[Tuple[int, int]] = None,
+        reuse_cmds: Sequence[str] = (),
+        tcl_port: int = 6666,
+    ):
+        super().__init__(interface=interface, target=target, board=board, extra_args=extra_args)
+        self.probe = probe
+        self.reuse_cmds = reuse_cmds
+        self.tcl_port = tcl_port
+        self.probe_ids = None
+        self.reader_thread = None
+        self.starts = 0
+        atexit.register(self.close)
+
+    def _probe_ids(self):
+        if self.probe is None:
+            return None
+
+        return usb_device_ids(*self.probe)
+
+    def is_running(self) -> bool:
+        """Returns true if openocd is running and its probe was not re-enumerated since start."""
+
+        if not self.proc or not self.proc.isalive():
+            return False
+
+        return self._probe_ids() == self.probe_ids
+
+    def command(self, cmd: str, timeout: float = 10) -> str:
+        """Runs openocd command using the TCL server and returns its output.
+
+        The TCL server replies with the error message the same way as with the output, so the command is
+        run in catch and its status is sent in front of the output.
+        """
+
+        script = f"format {{%d %s}} [catch {{{cmd}}} trunner_out] $trunner_out"
+
+        try:
+            with socket.create_connection(("localhost", self.tcl_port), timeout=timeout) as sock:
+                sock.sendall(script.encode("ascii") + b"\x1a")
+
+                response = b""
+                while not response.endswith(b"\x1a"):
+                    data = sock.recv(4096)
+                    if not data:
+                        raise OpenocdError(f"Connection closed while running '{cmd}'", self.logfile.getvalue())
+
+                    response += data
+        except OSError as e:
+            raise OpenocdError(f"Failed to run '{cmd}': {e}", self.logfile.getvalue()) from e
+
+        status, _, output = response[:-1].decode("ascii", errors="replace").partition(" ")
+        if status != "0":
+            raise OpenocdError(f"Command '{cmd}' failed: {output}", self.logfile.getvalue())
+
+        return output
+
+    def _read_output(self):
+        # Openocd blocks when its output is not read, read it until it's closed. It goes only to the log, which
+        # keeps its end, so the output of the whole campaign is not kept in memory.
+        try:
+            while True:
+                self.proc.read_nonblocking(4096, timeout=None)
+        except (pexpect.EOF, OSError, ValueError):
+            pass
+
+    def _start(self):
+        self.logfile = _TailLog()
+        self.starts += 1
+        self.probe_ids = self._probe_ids()
+        super()._start()
+
+        if not isinstance(self.proc, aio.StreamSpawn):
+            self.reader_thread = threading.Thread(target=self._read_output)
+            self.reader_thread.start()
+
+    @contextmanager
+    @add_output_to_exception(OpenocdError)
+    def run(self):
+        try:
+            if self.is_running():
+                for cmd in self.reuse_cmds:
+                    self.command(cmd)
+            else:
+                self._close()
+                self._start()
+
+            yield
+        except BaseException:
+            # Probe state is unknown, start openocd again next time
+            self._close()
+            raise
+
+    def _close(self):
+        if not self.proc:
+            return
+
+        if self.reader_thread:
+            # Terminating openocd ends the reader thread with EOF
+            self.proc.terminate(force=True)
+            self.reader_thread.join(timeout=10)
+            self.reader_thread = None
+
+        super()._close()
+        self.proc = None
+        self.probe_ids = None
+
+    def close(self):
+        """Stops openocd at the end of the campaign."""
+        self._close()
+
+
 class JLinkGdbServer:
     def __init__(self, device):
         self.device = device
@@ -172,7 +345,7 @@ class JLinkGdbServer:
     @add_output_to_exception()
     def run(self):
         try:
-            self.proc = pexpect.spawn(
+            self.proc = aio.spawn(
                 "JLinkGDBServer", ["-device", self.device], encoding="ascii", logfile=self.logfile
             )
             self.proc.expect_exact("Connected to target")
@@ -3,10 +3,14 @@ import os
 import signal
 import threading
 import time
+from pathlib import Path
+from typing import Union
+
 import pexpect
 
+from trunner import aio
 from trunner.harness import ProcessError
-from serial.tools import list_ports
+from trunner.usb import UsbWatcher
 from contextlib import contextmanager
 from .common import add_output_to_exception
 
@@ -14,25 +18,28 @@ from .common import add_output_to_exception
 def wait_for_vid_pid(vid: int, pid: int, timeout=0):
     """wait for connected usb serial device with required vendor & product id"""
 
-    asleep = 0
-    found_ports = []
+    deadline = time.monotonic() + timeout if timeout else None
 
-    while not found_ports:
-        time.sleep(0.01)
-        asleep += 0.01
+    # Device list is checked only when udev/kernel reports a change (or periodically, if events aren't available)
+    with UsbWatcher(vid, pid) as watcher:
+        while True:
+            found_ports = watcher.devices()
+            if len(found_ports) == 1:
+                return found_ports[0]
 
-        found_ports = [port for port in list_ports.comports() if port.pid == pid and port.vid == vid]
+            expired = deadline is not None and time.monotonic() >= deadline
 
-        if len(found_ports) > 1:
-            raise Exception(
-                "More than one plo port was found! Maybe more than one device is connected? Hint used to find port:"
-                f"{vid:04x}:{pid:04x}"
-            )
+            if len(found_ports) > 1:
+                # In farm mode another board may pass through plo while rebooting, wait for it to boot further
+                if deadline is None or expired:
+                    raise Exception(
+                        "More than one plo port was found! Maybe more than one device is connected? "
+                        f"Hint used to find port:{vid:04x}:{pid:04x}"
+                    )
+            elif expired:
+                raise TimeoutError(f"Couldn't find plo USB device with vid/pid: '{vid:04x}:{pid:04x}'")
 
-        if timeout and asleep >= timeout:
-            raise TimeoutError(f"Couldn't find plo USB device with vid/pid: '{vid:04x}:{pid:04x}'")
-
-    return found_ports[0].device
+            watcher.wait_event(None if deadline is None else deadline - time.monotonic())
 
 
 class PsuError(ProcessError):
@@ -56,7 +63,7 @@ class Psu:
 
     def run(self):
         # TODO handle lack of psu program?
-        self.proc = pexpect.spawn(
+        self.proc = aio.spawn(
             "psu",
             [self.script],
             cwd=self.cwd,
@@ -94,6 +101,10 @@ class Phoenixd:
         self.logfile = io.StringIO()
         self.output = ""
 
+    def set_directory(self, directory: Union[Path, str]):
+        """Sets the directory phoenixd serves files from, it's used on the next run."""
+        self.dir = directory
+
     def _reader(self):
         """This method is intended to be run as a separate thread.
         It searches for a line stating that message dispatcher has started
@@ -120,7 +131,7 @@ class Phoenixd:
             raise PhoenixdError(str(exc)) from exc
 
         # Use pexpect.spawn to run a process as PTY, so it will flush on a new line
-        self.proc = pexpect.spawn(
+        self.proc = aio.spawn(
             "phoenixd",
             ["-p", self.port, "-s", str(self.dir)],
             cwd=self.cwd,
@@ -128,6 +139,16 @@ class Phoenixd:
             logfile=self.logfile,
         )
 
+        if isinstance(self.proc, aio.StreamSpawn):
+            # The event loop reads phoenixd output constantly, no reader thread is needed
+            try:
+                self.proc.expect_exact(f"Starting message dispatcher on [{self.port}]", timeout=5)
+            except (pexpect.EOF, pexpect.TIMEOUT) as e:
+                raise PhoenixdError("Message dispatcher did not start!", self.proc.before) from e
+
+            self.proc.drain()
+            return self.proc
+
         self.dispatcher_event = threading.Event()
         self.reader_thread = threading.Thread(target=self._reader)
         self.reader_thread.start()
@@ -148,15 +169,28 @@ class Phoenixd:
         finally:
             self._close()
 
+    def _wait_eof(self, timeout):
+        deadline = time.time() + timeout
+        while not self.proc.flag_eof and time.time() < deadline:
+            try:
+                self.proc.read_nonblocking(size=512, timeout=deadline - time.time())
+            except (pexpect.EOF, pexpect.TIMEOUT):
+                break
+
     def _close(self):
         if not self.proc:
             return
 
         if self.proc.isalive():
             os.killpg(os.getpgid(self.proc.pid), signal.SIGTERM)
-        self.reader_thread.join(timeout=10)
+        if self.reader_thread:
+            self.reader_thread.join(timeout=10)
+        elif isinstance(self.proc, aio.StreamSpawn):
+            self._wait_eof(timeout=10)
         if self.proc.isalive():
             os.killpg(os.getpgid(self.proc.pid), signal.SIGKILL)
+        if isinstance(self.proc, aio.StreamSpawn):
+            self.proc.close(force=True)
 
         self.output = self.logfile.getvalue()
         self.logfile.close()
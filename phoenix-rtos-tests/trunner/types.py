@@ -7,11 +7,11 @@ import re
 import sys
 import time
 import traceback
-import junitparser
 from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
+from trunner.junit import JUnitTestCase, JUnitTestSuite
 from trunner.text import bold, green, red, remove_ansi_sequences, yellow
 
 
@@ -55,12 +55,13 @@ class Status(Enum):
         color = self.color()
         return color(self.name)
 
-    def to_junit(self, msg: str):
+    def to_junit(self) -> str:
+        """Returns tag of the JUnit result element."""
         assert self != Status.OK
         if self == Status.SKIP:
-            return junitparser.Skipped(msg)
+            return "skipped"
 
-        return junitparser.Failure(msg)
+        return "failure"
 
     def should_print(self, verbosity: int):
         status_for_verbosity = (Status.FAIL, Status.SKIP, Status.OK)
@@ -87,6 +88,61 @@ class TestStage(Enum):
         return NotImplemented
 
 
+class Telemetry:
+    """Fine-grained timing of the test, measured when harnesses receive the output of DUT.
+
+    Attributes:
+        marks: Monotonic time of the boot milestones, in the order of BOOT_MILESTONES.
+        durations: Durations of named operations (e.g. loading the applications).
+        commands: Latencies of the commands sent to DUT, from sending to receiving the echo.
+    """
+
+    BOOT_MILESTONES = ("power_on", "plo", "kernel", "shell")
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {}
+        self.durations: Dict[str, float] = {}
+        self.commands: List[Tuple[str, float]] = []
+
+    def mark(self, milestone: str, at: Optional[float] = None):
+        """Records the time of the boot milestone, only the first occurrence is kept."""
+        self.marks.setdefault(milestone, time.monotonic() if at is None else at)
+
+    def is_booting(self) -> bool:
+        """Returns true if the reboot was marked, but the shell was not reached yet."""
+        return "power_on" in self.marks and "shell" not in self.marks
+
+    def add_duration(self, name: str, seconds: float):
+        self.durations[name] = seconds
+
+    def add_command(self, cmd: str, latency: float):
+        self.commands.append((cmd, latency))
+
+    def boot_phases(self) -> Dict[str, float]:
+        """Returns durations between the consecutive boot milestones that were reached."""
+
+        reached = [m for m in self.BOOT_MILESTONES if m in self.marks]
+        return {f"{a}_to_{b}": self.marks[b] - self.marks[a] for a, b in zip(reached, reached[1:])}
+
+    def to_dict(self) -> Dict:
+        return {
+            "boot": {name: round(seconds, 4) for name, seconds in self.boot_phases().items()},
+            "durations": {name: round(seconds, 4) for name, seconds in self.durations.items()},
+            "commands": [{"cmd": cmd, "latency": round(latency, 4)} for cmd, latency in self.commands],
+        }
+
+    def to_journal(self) -> Dict:
+        return {"marks": self.marks, "durations": self.durations, "commands": self.commands}
+
+    @classmethod
+    def from_journal(cls, data: Dict) -> Telemetry:
+        telemetry = cls()
+        telemetry.marks = dict(data.get("marks", {}))
+        telemetry.durations = dict(data.get("durations", {}))
+        telemetry.commands = [(cmd, latency) for cmd, latency in data.get("commands", [])]
+        return telemetry
+
+
 class TestResult:
     def __init__(self, name=None, msg: str = "", status: Optional[Status] = None):
         self.msg = msg
@@ -100,6 +156,7 @@ class TestResult:
         self._timing_stage_start: float = 0
         self._timing_data: Dict[TestStage, float] = {}
         self._start_time = None
+        self.telemetry = Telemetry()
         self.set_stage(TestStage.INIT)
 
         # subresults
@@ -139,9 +196,8 @@ class TestResult:
         out.append("")
         return "\n".join(out)
 
-    def to_junit_testcase(self, target: str):
-        out = junitparser.TestCase(f"{target}:{self.full_name}")
-        out.classname = self.name
+    def to_junit_testcase(self, target: str) -> JUnitTestCase:
+        out = JUnitTestCase(f"{target}:{self.full_name}", classname=self.name)
         out.time = round(self._timing_data.get(TestStage.RUN, 0), 3)
         if self.status != Status.OK:
             # remove ANSI codes (not valid within XML)
@@ -150,23 +206,24 @@ class TestResult:
             if not summary:
                 # put first line as a failure reason
                 summary = msg.splitlines()[0] if msg else ""
-            out.result = [self.status.to_junit(summary)]
+            out.result = self.status.to_junit()
+            out.message = summary
             if msg and msg != summary:
                 # put detailed multi-line message as a system-out only if it brings new information
                 out.system_out = msg
 
         return out
 
-    def to_junit_testsuite(self, target: str):
+    def to_junit_testsuite(self, target: str) -> JUnitTestSuite:
         """return test result in junit format"""
-        out = junitparser.TestSuite(f"{target}:{self.name}")
+        out = JUnitTestSuite(f"{target}:{self.name}")
         if self._start_time:
             out.timestamp = self._start_time.isoformat()
         if not self.subresults:
-            out.add_testcase(self.to_junit_testcase(target))
+            out.testcases.append(self.to_junit_testcase(target))
         else:
             for res in self.subresults:
-                out.add_testcase(res.to_junit_testcase(target))
+                out.testcases.append(res.to_junit_testcase(target))
 
         return out
 
@@ -315,6 +372,46 @@ class TestResult:
 
         return ",".join(data)
 
+    def to_telemetry(self) -> Dict:
+        """Returns timing of the test stages and its telemetry as a dictionary, ready to be serialized."""
+
+        return {
+            "name": self.name,
+            "status": self.status.name,
+            "stages": {stage.name: round(self._timing_data.get(stage, 0), 4) for stage in TestStage.important()},
+            **self.telemetry.to_dict(),
+        }
+
+    def to_journal(self) -> Dict:
+        """Returns the whole result as a dictionary, from which from_journal() restores it."""
+
+        return {
+            "name": self._name,
+            "subname": self.subname,
+            "status": self.status.name,
+            "msg": self.msg,
+            "summary": self.summary,
+            "timing": {stage.name: seconds for stage, seconds in self._timing_data.items()},
+            "start_time": self._start_time.isoformat() if self._start_time else None,
+            "telemetry": self.telemetry.to_journal(),
+            "subresults": [res.to_journal() for res in self.subresults],
+        }
+
+    @classmethod
+    def from_journal(cls, data: Dict) -> TestResult:
+        result = cls(data["name"])
+        result.subname = data["subname"]
+        result.status = Status[data["status"]]
+        result.msg = data["msg"]
+        result.summary = data["summary"]
+        result._timing_data = {TestStage[stage]: seconds for stage, seconds in data["timing"].items()}
+        result._timing_stage = TestStage.DONE
+        result._start_time = datetime.fromisoformat(data["start_time"]) if data["start_time"] else None
+        result.telemetry = Telemetry.from_journal(data["telemetry"])
+        result.subresults = [TestSubResult.from_journal(sub) for sub in data["subresults"]]
+
+        return result
+
     def to_csv(self) -> str:
         data = [self.name, self.subname, self.status.name]
         data.extend([f"{self._timing_data.get(stage, 0):.3f}" for stage in TestStage.important()])
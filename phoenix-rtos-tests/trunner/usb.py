@@ -0,0 +1,236 @@
+"""Detection of USB serial devices appearing and disappearing.
+
+On Linux UsbWatcher listens to uevents on a NETLINK_KOBJECT_UEVENT socket, so waiting for a device takes
+exactly as long as the device needs to (dis)appear. Events sent by udev are used if udev is running, as
+they are sent after the device node is set up (permissions, symlinks). Without udev the kernel events are
+used. If netlink is not available, the watcher falls back to polling sysfs.
+"""
+
+import os
+import select
+import socket
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from serial.tools import list_ports
+
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1
+UDEV_GROUP = 2
+UDEV_MONITOR_MAGIC = 0xFEEDCAFE
+
+
+def parse_uevent(data: bytes) -> Optional[Dict[str, str]]:
+    """Returns properties of the uevent message sent by kernel or udev, None if the message is malformed."""
+
+    if data.startswith(b"libudev\0"):
+        if len(data) < 24:
+            return None
+
+        magic, _, props_off, props_len = struct.unpack_from("!I", data, 8) + struct.unpack_from("=III", data, 12)
+        if magic != UDEV_MONITOR_MAGIC:
+            return None
+
+        fields = data[props_off:props_off + props_len].split(b"\0")
+    else:
+        # Kernel messages start with ACTION@DEVPATH header, which is repeated in properties
+        fields = data.split(b"\0")[1:]
+
+    props = {}
+    for field in fields:
+        key, sep, value = field.partition(b"=")
+        if sep:
+            props[key.decode(errors="replace")] = value.decode(errors="replace")
+
+    return props if "ACTION" in props else None
+
+
+def _matches(props: Dict[str, str], vid: int, pid: int) -> bool:
+    if props.get("SUBSYSTEM") not in ("tty", "usb"):
+        return False
+
+    # udev adds ID_* properties to tty devices, kernel has PRODUCT=vid/pid/bcd for usb devices
+    if "ID_VENDOR_ID" in props and "ID_MODEL_ID" in props:
+        try:
+            return (int(props["ID_VENDOR_ID"], 16), int(props["ID_MODEL_ID"], 16)) == (vid, pid)
+        except ValueError:
+            return False
+
+    if "PRODUCT" in props:
+        try:
+            product_vid, product_pid = props["PRODUCT"].split("/")[:2]
+            return (int(product_vid, 16), int(product_pid, 16)) == (vid, pid)
+        except ValueError:
+            return False
+
+    # Nothing to match on (e.g. kernel tty event), wake up the waiter to check connected devices
+    return props.get("SUBSYSTEM") == "tty"
+
+
+def usb_device_ids(vid: int, pid: int, sysfs: str = "/sys/bus/usb/devices") -> List[Tuple[int, int]]:
+    """Returns sorted (bus number, device number) of the connected USB devices with vid:pid.
+
+    It works also for devices that aren't serial ports (e.g. debug probes). A device gets a new device
+    number every time it's enumerated, so the result changes when the device was reconnected.
+    """
+
+    ids = []
+    for path in Path(sysfs).glob("*"):
+        try:
+            dev_vid = int((path / "idVendor").read_text(), 16)
+            dev_pid = int((path / "idProduct").read_text(), 16)
+            if (dev_vid, dev_pid) != (vid, pid):
+                continue
+
+            ids.append((int((path / "busnum").read_text()), int((path / "devnum").read_text())))
+        except (OSError, ValueError):
+            # Interfaces and hubs don't have all attributes
+            continue
+
+    return sorted(ids)
+
+
+class UsbWatcher:
+    """Watches USB serial devices with the given vendor & product id.
+
+    The watcher has to be opened before the action that makes the device (dis)appear, so no event is lost.
+    It's a context manager:
+
+        with UsbWatcher(0x16F9, 0x0003) as watcher:
+            reset_board()
+            port = watcher.wait_for_device(timeout=10)
+
+    Attributes:
+        vid: USB vendor id.
+        pid: USB product id.
+        poll_interval: Interval of checking connected devices when netlink is not available.
+    """
+
+    def __init__(self, vid: int, pid: int, poll_interval: float = 0.01):
+        self.vid = vid
+        self.pid = pid
+        self.poll_interval = poll_interval
+        self.sock: Optional[socket.socket] = None
+
+    def open(self):
+        self.sock = self._open_netlink()
+        return self
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *_):
+        self.close()
+
+    @staticmethod
+    def _open_netlink() -> Optional[socket.socket]:
+        if not hasattr(socket, "AF_NETLINK"):
+            return None
+
+        # Events from udev are sent when the device node is ready to use
+        group = UDEV_GROUP if os.path.exists("/run/udev/control") else KERNEL_GROUP
+
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC, NETLINK_KOBJECT_UEVENT)
+        except OSError:
+            return None
+
+        try:
+            sock.bind((0, group))
+        except OSError:
+            sock.close()
+            return None
+
+        sock.setblocking(False)
+        return sock
+
+    @property
+    def uses_events(self) -> bool:
+        """True if the watcher gets events from netlink, false if it polls."""
+        return self.sock is not None
+
+    def devices(self) -> List[str]:
+        """Returns the sorted paths of the connected devices."""
+        return sorted(p.device for p in list_ports.comports() if p.vid == self.vid and p.pid == self.pid)
+
+    def wait_event(self, timeout: Optional[float]) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Waits for an event of the watched device, returns (action, properties) or None on timeout.
+
+        When polling, it returns None after poll_interval, the caller should check devices() then.
+        """
+
+        if not self.sock:
+            time.sleep(self.poll_interval if timeout is None else max(0, min(timeout, self.poll_interval)))
+            return None
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.sock], [], [], remaining)
+            if not readable:
+                return None
+
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                # ENOBUFS, some events were lost - let the caller check devices
+                return "change", {}
+
+            props = parse_uevent(data)
+            if props is not None and _matches(props, self.vid, self.pid):
+                return props["ACTION"], props
+
+    def _wait_until(self, condition, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            result = condition()
+            if result:
+                return result
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return result
+
+            self.wait_event(remaining)
+
+    def wait_for_device(self, timeout: Optional[float] = None) -> List[str]:
+        """Waits until at least one device is connected, returns the list of devices (empty on timeout)."""
+        return self._wait_until(self.devices, timeout)
+
+    def wait_for_removal(self, device: str, timeout: Optional[float] = None) -> bool:
+        """Waits until device disappears, returns false on timeout.
+
+        With events, the remove event is enough, as the device may be enumerated again under the same path
+        before the list of devices is checked.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            if device not in self.devices():
+                return True
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+
+            event = self.wait_event(remaining)
+            if event is not None and event[0] == "remove":
+                action_props = event[1]
+                if action_props.get("SUBSYSTEM") == "usb":
+                    return True
+
+                if os.path.basename(action_props.get("DEVNAME", "")) == os.path.basename(device):
+                    return True
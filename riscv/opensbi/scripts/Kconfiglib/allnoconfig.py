@@ -20,7 +20,7 @@ import kconfiglib
 
 
 def main():
-    kconf = kconfiglib.standard_kconfig(__doc__)
+    kconf = kconfiglib.standard_kconfig(__doc__, lazy_help=True)
 
     # Avoid warnings that would otherwise get printed by Kconfiglib for the
     # following:
@@ -17,7 +17,7 @@ import kconfiglib
 
 
 def main():
-    kconf = kconfiglib.standard_kconfig(__doc__)
+    kconf = kconfiglib.standard_kconfig(__doc__, lazy_help=True)
 
     # See allnoconfig.py
     kconf.warn = False
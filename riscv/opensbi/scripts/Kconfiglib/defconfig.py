@@ -27,6 +27,12 @@ def main():
         default="Kconfig",
         help="Top-level Kconfig file (default: Kconfig)")
 
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Always run the sanity checks on the Kconfig files, ignoring "
+             "KCONFIG_CHECK_CACHE")
+
     parser.add_argument(
         "config",
         metavar="CONFIGURATION",
@@ -34,7 +40,8 @@ def main():
 
     args = parser.parse_args()
 
-    kconf = kconfiglib.Kconfig(args.kconfig, suppress_traceback=True)
+    kconf = kconfiglib.Kconfig(args.kconfig, suppress_traceback=True,
+                               lazy_help=True, force_checks=args.strict)
     print(kconf.load_config(args.config))
     print(kconf.write_config())
 
@@ -31,8 +31,14 @@ add '/* */', '#', and newlines as appropriate.
 See https://www.gnu.org/software/make/manual/make.html#Multi_002dLine for a
 handy way to define multi-line variables in makefiles, for use with custom
 headers. Remember to export the variable to the environment.
+
+With --variants, a header file and a .config file are generated for each of
+several configurations (e.g. defconfig files), with the Kconfig files only
+being parsed once. The variants are processed in parallel by worker processes
+that share the parsed Kconfig tree (where fork() is available).
 """
 import argparse
+import multiprocessing
 import os
 import sys
 
@@ -40,6 +46,10 @@ import kconfiglib
 
 
 DEFAULT_SYNC_DEPS_PATH = "deps/"
+DEFAULT_VARIANTS_OUT_PATH = "variants/"
+
+# The parsed Kconfig tree, inherited by forked --variants worker processes
+_kconf = None
 
 
 def main():
@@ -99,6 +109,45 @@ included, and not variables referenced with the older $VAR syntax (which is
 only supported for backwards compatibility).
 """)
 
+    parser.add_argument(
+        "--variants",
+        metavar="CONFIG",
+        nargs="+",
+        help="""
+Generate output for each of the given configurations instead of for .config.
+Each CONFIG is a configuration file, optionally followed by ','-separated
+fragments that are merged on top of it (e.g. defconfig,debug.config). The
+output for each variant goes to a separate subdirectory of the directory given
+by --variants-out, named after the configuration file(s). If several variants
+would get the same name (configuration files with the same name in different
+directories), their subdirectories are named after the relative paths of the
+files instead, with '%%' and path separators escaped as '%%25' and '%%2F'.
+Listing the same variant twice is an error. --header-path and --config-out give
+the filenames to use within that directory (default: config.h and .config).
+Cannot be combined with --sync-deps.
+""")
+
+    parser.add_argument(
+        "--variants-out",
+        metavar="OUTPUT_DIR",
+        default=DEFAULT_VARIANTS_OUT_PATH,
+        help="""
+Directory to write --variants output to (default: {}).
+""".format(DEFAULT_VARIANTS_OUT_PATH))
+
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        help="""
+Number of worker processes to use for --variants (default: number of CPUs).
+""")
+
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Always run the sanity checks on the Kconfig files, ignoring "
+             "KCONFIG_CHECK_CACHE")
+
     parser.add_argument(
         "kconfig",
         metavar="KCONFIG",
@@ -108,8 +157,21 @@ only supported for backwards compatibility).
 
     args = parser.parse_args()
 
+    if args.variants and args.sync_deps is not None:
+        parser.error("--variants can't be combined with --sync-deps")
+
+    # Each variant recalculates all symbol values, so compiling the
+    # expressions pays off there
+    kconf = kconfiglib.Kconfig(args.kconfig, suppress_traceback=True,
+                               lazy_help=True,
+                               compile_exprs=bool(args.variants),
+                               force_checks=args.strict)
+
+    if args.variants:
+        _gen_variants(kconf, args)
+        _write_lists(kconf, args)
+        return
 
-    kconf = kconfiglib.Kconfig(args.kconfig, suppress_traceback=True)
     kconf.load_config()
 
     if args.header_path is None:
@@ -130,6 +192,12 @@ only supported for backwards compatibility).
     if args.sync_deps is not None:
         kconf.sync_deps(args.sync_deps)
 
+    _write_lists(kconf, args)
+
+
+def _write_lists(kconf, args):
+    # Writes the --file-list and --env-list output, if requested
+
     if args.file_list is not None:
         with _open_write(args.file_list) as f:
             for path in kconf.kconfig_filenames:
@@ -141,6 +209,142 @@ only supported for backwards compatibility).
                 f.write("{}={}\n".format(env_var, os.environ[env_var]))
 
 
+def _gen_variants(kconf, args):
+    # Generates output for each configuration in args.variants, in parallel
+    # if possible
+
+    global _kconf
+
+    header_name = os.path.basename(args.header_path or "config.h")
+    config_name = os.path.basename(args.config_out or ".config")
+
+    jobs = []
+    for variant, dir_name in zip(args.variants,
+                                 _variant_dir_names(args.variants)):
+        out_dir = os.path.join(args.variants_out, dir_name)
+        jobs.append((variant.split(","), os.path.join(out_dir, header_name),
+                     os.path.join(out_dir, config_name)))
+
+    _kconf = kconf
+
+    n_workers = min(args.jobs or multiprocessing.cpu_count(), len(jobs))
+    if n_workers <= 1 or not hasattr(os, "fork"):
+        # Not worth it, or no way to share the parsed tree with the workers
+        for job in jobs:
+            _print_variant_result(_gen_variant(job))
+        return
+
+    # Make sure the workers are forked (and inherit _kconf) even where another
+    # start method is the default. get_context() is missing on Python 2, which
+    # always forks.
+    if hasattr(multiprocessing, "get_context"):
+        pool = multiprocessing.get_context("fork").Pool(n_workers)
+    else:
+        pool = multiprocessing.Pool(n_workers)
+
+    try:
+        for result in pool.imap(_gen_variant, jobs):
+            _print_variant_result(result)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _variant_dir_names(variants):
+    # Returns the names of the output subdirectories for 'variants'. Variants
+    # are named after the basenames of their files, unless that name is shared
+    # with another variant, in which case the (escaped) relative paths are used
+    # so that no two variants write to the same directory
+
+    def basename_name(variant):
+        return "+".join(os.path.basename(filename)
+                        for filename in variant.split(","))
+
+    def path_name(variant):
+        return "+".join(_escape_path(os.path.relpath(filename))
+                        for filename in variant.split(","))
+
+    counts = {}
+    for variant in variants:
+        name = basename_name(variant)
+        counts[name] = counts.get(name, 0) + 1
+
+    names = []
+    seen = {}
+    for variant in variants:
+        name = basename_name(variant)
+        if counts[name] > 1:
+            name = path_name(variant)
+
+        if name in seen:
+            sys.exit("{}: variants '{}' and '{}' would both be written to "
+                     "'{}'".format(sys.argv[0], seen[name], variant, name))
+
+        seen[name] = variant
+        names.append(name)
+
+    return names
+
+
+def _escape_path(path):
+    # Turns 'path' into a single path component, keeping distinct paths
+    # distinct
+
+    path = path.replace("%", "%25")
+    for sep in (os.sep, os.altsep):
+        if sep:
+            path = path.replace(sep, "%2F")
+    return path
+
+
+def _gen_variant(job):
+    # Writes the header and configuration file for a single variant, using the
+    # process's copy of the parsed Kconfig tree. Returns an (error, message)
+    # tuple for _print_variant_result().
+    #
+    # Errors are returned as strings rather than raised, as exceptions from
+    # Kconfiglib can't always be pickled back to the parent process.
+
+    filenames, header_path, config_path = job
+
+    try:
+        out_dir = os.path.dirname(header_path)
+        if out_dir and not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+
+        # The first file replaces any configuration loaded by an earlier
+        # variant handled by the same process. Fragments are merged on top,
+        # and are expected to override symbols, like for load_allconfig().
+        _kconf.load_config(filenames[0])
+
+        old_warn_override = _kconf.warn_assign_override
+        old_warn_redun = _kconf.warn_assign_redun
+        _kconf.warn_assign_override = _kconf.warn_assign_redun = False
+        try:
+            for filename in filenames[1:]:
+                _kconf.load_config(filename, replace=False)
+        finally:
+            _kconf.warn_assign_override = old_warn_override
+            _kconf.warn_assign_redun = old_warn_redun
+
+        _kconf.write_autoconf(header_path)
+        _kconf.write_config(config_path, save_old=False)
+    except (EnvironmentError, kconfiglib.KconfigError) as e:
+        return True, str(e)
+
+    return False, "Generated {} and {} from {}".format(
+        header_path, config_path, ", ".join(filenames))
+
+
+def _print_variant_result(result):
+    # Prints the result of a _gen_variant() call, exiting on errors
+
+    error, msg = result
+    if error:
+        sys.exit("{}: {}".format(sys.argv[0], msg))
+    print(msg)
+
+
 def _open_write(path):
     # Python 2/3 compatibility. io.open() is available on both, but makes
     # write() expect 'unicode' strings on Python 2.
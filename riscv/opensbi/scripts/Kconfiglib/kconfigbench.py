@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+# SPDX-License-Identifier: ISC
+
+"""
+Parse-time and memory benchmark for Kconfiglib, run on a synthetic Kconfig
+tree.
+
+The tree is generated into a temporary directory and spread out over several
+sourced files. It has bool/tristate/int/hex/string symbols with dependencies,
+defaults, ranges, selects, and help texts, plus menus, choices, and 'if'
+blocks. The same --symbols and --seed values always give the same tree.
+
+Reports the best parse time over --runs runs, and the memory allocated by the
+parsed Kconfig instance (as measured by tracemalloc, in a separate run).
+
+--max-parse-time and --max-memory make the exit status 1 if a limit is
+exceeded, which can be used to catch regressions, e.g.:
+
+  $ kconfigbench.py --symbols 20000 --max-memory 60
+
+Memory usage is deterministic for a given Python version, while parse times
+depend on the machine, so leave some headroom for the latter.
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import kconfiglib
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=__doc__)
+
+    parser.add_argument(
+        "--symbols",
+        type=int,
+        default=20000,
+        help="Number of symbols in the generated tree (default: 20000)")
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=1,
+        help="Random seed for the generated tree (default: 1)")
+
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=3,
+        help="Number of timed parses. The best time is reported (default: 3)")
+
+    parser.add_argument(
+        "--lazy-help",
+        action="store_true",
+        help="Parse with lazy_help=True")
+
+    parser.add_argument(
+        "--max-parse-time",
+        type=float,
+        metavar="SECONDS",
+        help="Fail if the best parse time exceeds SECONDS")
+
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        metavar="MB",
+        help="Fail if the parsed tree uses more than MB megabytes")
+
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="kconfigbench-")
+    try:
+        kconfig_filename = gen_tree(tmpdir, args.symbols, args.seed)
+        parse_time, memory = benchmark(kconfig_filename, args.runs,
+                                       args.lazy_help)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("symbols: {}, parse time: {:.3f} s, memory: {:.1f} MB"
+          .format(args.symbols, parse_time, memory/1e6))
+
+    failed = False
+
+    if args.max_parse_time is not None and parse_time > args.max_parse_time:
+        print("error: parse time exceeds {:.3f} s".format(args.max_parse_time),
+              file=sys.stderr)
+        failed = True
+
+    if args.max_memory is not None and memory/1e6 > args.max_memory:
+        print("error: memory usage exceeds {:.1f} MB".format(args.max_memory),
+              file=sys.stderr)
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+def benchmark(kconfig_filename, runs, lazy_help):
+    # Returns a (best parse time, memory) tuple for 'kconfig_filename'. The
+    # memory is in bytes.
+
+    def parse():
+        return kconfiglib.Kconfig(kconfig_filename, warn=False,
+                                  lazy_help=lazy_help)
+
+    best = None
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # tracemalloc slows down parsing, so measure memory separately. Temporary
+    # allocations are freed by the time Kconfig.__init__() returns, so this is
+    # what the parsed tree retains.
+    gc.collect()
+    tracemalloc.start()
+    kconf = parse()
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kconf
+
+    return best, memory
+
+
+def gen_tree(dirname, n_syms, seed):
+    # Generates a synthetic Kconfig tree with 'n_syms' symbols in 'dirname'.
+    # Returns the path of the top-level Kconfig file.
+
+    rand = random.Random(seed)
+
+    # Symbols that get selected by many other symbols, giving some large
+    # reverse dependencies
+    n_select_targets = 20
+
+    top = ['mainmenu "Synthetic Kconfig tree"',
+           "",
+           "config MODULES",
+           '\tbool "Enable loadable module support"',
+           "\toption modules",
+           "\tdefault y",
+           ""]
+
+    for i in range(n_select_targets):
+        top += ["config SELECTED_{}".format(i),
+                "\ttristate",
+                ""]
+
+    # Bool/tristate symbols defined so far, for dependencies
+    bools = []
+    in_if = False
+
+    syms_per_file = 500
+
+    for file_i in range(0, n_syms, syms_per_file):
+        sub_filename = "Kconfig.{}".format(file_i//syms_per_file)
+        top.append('source "{}"'.format(os.path.join(dirname, sub_filename)))
+
+        lines = []
+        for i in range(file_i, min(file_i + syms_per_file, n_syms)):
+            name = "SYM_{}".format(i)
+            type_ = rand.choice(("bool", "bool", "tristate", "tristate",
+                                 "int", "hex", "string"))
+
+            if i % 100 == 0:
+                lines += ['menu "Menu {}"'.format(i), ""]
+            if i % 100 == 50 and bools:
+                lines += ["if {}".format(rand.choice(bools[-300:])), ""]
+                in_if = True
+
+            lines.append("config " + name)
+            if rand.random() < 0.9:
+                lines.append('\t{} "Prompt for symbol {}"'.format(type_, i))
+            else:
+                lines.append("\t" + type_)
+
+            if bools and rand.random() < 0.6:
+                a, b, c = (rand.choice(bools[-300:]) for _ in range(3))
+                lines.append("\tdepends on " + rand.choice((
+                    a,
+                    "{} && {}".format(a, b),
+                    "{} && ({} || !{})".format(a, b, c))))
+
+            if type_ in ("bool", "tristate"):
+                lines.append("\tdefault " + rand.choice("nmy"))
+                if rand.random() < 0.2:
+                    lines.append("\tselect SELECTED_{}"
+                                 .format(rand.randrange(n_select_targets)))
+            elif type_ == "int":
+                lines += ["\tdefault {}".format(rand.randrange(100)),
+                          "\trange 0 100"]
+            elif type_ == "hex":
+                lines.append("\tdefault 0x{:x}".format(rand.randrange(256)))
+            else:
+                lines.append('\tdefault "value {}"'.format(i))
+
+            lines.append("\thelp")
+            for help_i in range(rand.randrange(1, 8)):
+                lines.append("\t  Line {} of the help text for {}, which "
+                             "describes the option.".format(help_i, name))
+            lines.append("")
+
+            if type_ in ("bool", "tristate"):
+                bools.append(name)
+
+            if in_if and (i % 100 == 75 or i == n_syms - 1):
+                lines += ["endif", ""]
+                in_if = False
+            if i % 100 == 99 or i == n_syms - 1:
+                lines += ["endmenu", ""]
+
+            if i % 50 == 25:
+                lines += ['choice',
+                          '\tprompt "Choice {}"'.format(i),
+                          '\ttristate']
+                for choice_sym_i in range(3):
+                    lines += ["config CHOICE_{}_{}".format(i, choice_sym_i),
+                              '\ttristate "Choice symbol {}"'
+                              .format(choice_sym_i)]
+                lines += ["endchoice", ""]
+
+        with open(os.path.join(dirname, sub_filename), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    kconfig_filename = os.path.join(dirname, "Kconfig")
+    with open(kconfig_filename, "w") as f:
+        f.write("\n".join(top) + "\n")
+
+    return kconfig_filename
+
+
+if __name__ == "__main__":
+    main()
@@ -455,6 +455,45 @@ Some optional warnings can be controlled via environment variables:
     variable.
 
 
+Caching of $(shell,...) output
+------------------------------
+
+The output of each $(shell,...) command is cached within a Kconfig instance,
+so expanding the same command more than once (e.g. a compiler probe in a
+recursively expanded variable) only runs it once.
+
+If the KCONFIG_SHELL_CACHE environment variable is set, it gives the path to a
+file where command output is cached between runs as well. Entries are keyed on
+the command together with the current directory, $PATH, the locale variables,
+and the environment variables referenced from the Kconfig files, so changing
+e.g. $PATH or $CC invalidates them. Other environment variables (e.g. $TERM or
+$SHLVL) are not part of the key, so changing them doesn't. Only the entries
+used by the latest run are kept, so the file doesn't grow with stale entries.
+Anything else the commands depend on (e.g. an upgraded compiler at the same
+path, or an exported variable that is read by the command but never referenced
+from the Kconfig files) is not tracked, so remove the file when that changes.
+Errors reading or writing the file are ignored.
+
+
+Caching of sanity checks
+------------------------
+
+After parsing, Kconfiglib checks the Kconfig files for dependency loops and
+various other problems (e.g. selects of non-bool/tristate symbols), which
+requires a pass over the whole tree.
+
+If the KCONFIG_CHECK_CACHE environment variable is set, it gives the path to a
+file where the result of these checks is cached. If the fingerprint of the
+parsed tree matches the one in the file, the checks are skipped, and any
+warnings they generated are repeated from the file. Errors are never cached.
+The fingerprint covers the contents of all Kconfig files, the values of the
+environment variables referenced in them, and the output of $(shell,...)
+commands, but not Python preprocessor functions (see below).
+
+Pass force_checks=True to Kconfig.__init__() (--strict in the tools) to
+always run the checks. Errors reading or writing the file are ignored.
+
+
 Preprocessor user functions defined in Python
 ---------------------------------------------
 
@@ -547,9 +586,11 @@ import errno
 import importlib
 import os
 import re
+import stat
 import sys
 
 # Get rid of some attribute lookups. These are obvious in context.
+from functools import partial
 from glob import iglob
 from os.path import dirname, exists, expandvars, islink, join, realpath
 
@@ -811,9 +852,19 @@ class Kconfig(object):
       See the module docstring.
     """
     __slots__ = (
+        "_deferred_invalidations",
         "_encoding",
+        "_eval_expr",
         "_functions",
+        "_help_file_cache",
+        "_lazy_help",
+        "_modules_dependents",
+        "_output_snapshots",
         "_set_match",
+        "_shell_cache",
+        "_shell_disk_cache",
+        "_shell_disk_cache_dirty",
+        "_shell_disk_used",
         "_srctree_prefix",
         "_unset_match",
         "_warn_assign_no_prompt",
@@ -865,7 +916,8 @@ class Kconfig(object):
     #
 
     def __init__(self, filename="Kconfig", warn=True, warn_to_stderr=True,
-                 encoding="utf-8", suppress_traceback=False):
+                 encoding="utf-8", suppress_traceback=False, lazy_help=False,
+                 compile_exprs=False, force_checks=False):
         """
         Creates a new Kconfig object by parsing Kconfig files.
         Note that Kconfig files are not the same as .config files (which store
@@ -942,9 +994,44 @@ class Kconfig(object):
 
           Other exceptions besides EnvironmentError and KconfigError are still
           propagated when suppress_traceback is True.
+
+        lazy_help (default: False):
+          If True, help texts are not stored during parsing. Only their
+          location is remembered, and they are read from the Kconfig files on
+          the first access to MenuNode.help. This speeds up parsing and saves
+          memory for tools that rarely or never look at help texts.
+
+          The Kconfig files must not be modified or moved (and the current
+          directory must not change, for relative paths) while the Kconfig
+          instance is in use, or the wrong help texts might be loaded.
+
+        compile_exprs (default: False):
+          If True, the dependency, default, range, select/imply, and prompt
+          condition expressions of all symbols and choices are compiled into
+          Python closures after parsing, instead of being evaluated by walking
+          the expression tuples with expr_value() each time a value is
+          calculated.
+
+          Compiling takes time, so this only pays off if symbol values are
+          calculated many times for the same Kconfig instance, e.g. when
+          generating many configurations (see 'genconfig.py --variants').
+          Values calculated in the two modes are always the same.
+
+          The expressions are compiled once, after parsing, so the tree is
+          frozen from then on: replacing the 'defaults', 'ranges', 'rev_dep',
+          'weak_rev_dep', and 'direct_dep' attributes or MenuNode.prompt
+          afterwards has no effect on the calculated values. Without
+          compile_exprs, those attributes are evaluated directly, and changes
+          to them are honored.
+
+        force_checks (default: False):
+          If True, the sanity checks and dependency loop detection done after
+          parsing are always run, even if KCONFIG_CHECK_CACHE has a cached
+          result for the Kconfig tree. See the module docstring.
         """
         try:
-            self._init(filename, warn, warn_to_stderr, encoding)
+            self._init(filename, warn, warn_to_stderr, encoding, lazy_help,
+                       compile_exprs, force_checks)
         except (EnvironmentError, KconfigError) as e:
             if suppress_traceback:
                 cmd = sys.argv[0]  # Empty string if missing
@@ -956,11 +1043,16 @@ class Kconfig(object):
                 sys.exit(cmd + str(e).strip())
             raise
 
-    def _init(self, filename, warn, warn_to_stderr, encoding):
+    def _init(self, filename, warn, warn_to_stderr, encoding, lazy_help,
+              compile_exprs, force_checks):
         # See __init__()
 
         self._encoding = encoding
 
+        # See _parse_help() and _load_help()
+        self._lazy_help = lazy_help
+        self._help_file_cache = None
+
         self.srctree = os.getenv("srctree", "")
         # A prefix we can reliably strip from glob() results to get a filename
         # relative to $srctree. relpath() can cause issues for symlinks,
@@ -976,6 +1068,12 @@ class Kconfig(object):
 
         self.warnings = []
 
+        # See _defer_invalidation()
+        self._deferred_invalidations = None
+
+        # See _output_unchanged()
+        self._output_snapshots = {}
+
         self.config_prefix = os.getenv("CONFIG_", "CONFIG_")
         # Regular expressions for parsing .config files
         self._set_match = _re_match(self.config_prefix + r"([^=]+)=(.*)")
@@ -1026,6 +1124,14 @@ class Kconfig(object):
             "warning-if": (_warning_if_fn, 2, 2),
         }
 
+        # Output from $(shell,...) commands. See _shell_fn().
+        self._shell_cache = {}
+        # Persistent cache, loaded on first use. See _shell_disk_lookup().
+        self._shell_disk_cache = None
+        self._shell_disk_cache_dirty = False
+        # Keys of the persistent cache entries used by this instance
+        self._shell_disk_used = set()
+
         # Add any user-defined preprocessor functions
         try:
             self._functions.update(
@@ -1094,35 +1200,34 @@ class Kconfig(object):
 
         self._parsing_kconfigs = False
 
+        if self._shell_disk_cache_dirty or \
+           (self._shell_disk_cache is not None and
+            len(self._shell_disk_cache) > len(self._shell_disk_used)):
+            _save_shell_disk_cache(self)
+
         # Do various menu tree post-processing
         self._finalize_node(self.top_node, self.y)
 
         self.unique_defined_syms = _ordered_unique(self.defined_syms)
         self.unique_choices = _ordered_unique(self.choices)
 
-        # Do sanity checks. Some of these depend on everything being finalized.
-        self._check_sym_sanity()
-        self._check_choice_sanity()
-
-        # KCONFIG_STRICT is an older alias for KCONFIG_WARN_UNDEF, supported
-        # for backwards compatibility
-        if os.getenv("KCONFIG_WARN_UNDEF") == "y" or \
-           os.getenv("KCONFIG_STRICT") == "y":
-
-            self._check_undef_syms()
+        # Look up (and possibly compile) the expressions used when calculating
+        # symbol and choice values. Done before anything gets evaluated.
+        self._build_evaluators(compile_exprs)
 
         # Build Symbol._dependents for all symbols and choices
         self._build_dep()
 
-        # Check for dependency loops
-        check_dep_loop_sym = _check_dep_loop_sym  # Micro-optimization
-        for sym in self.unique_defined_syms:
-            check_dep_loop_sym(sym, False)
+        # Do sanity checks and check for dependency loops, unless the result
+        # for an identical tree is cached
+        self._check_tree(force_checks)
 
         # Add extra dependencies from choices to choice symbols that get
         # awkward during dependency loop detection
         self._add_choice_deps()
 
+        self._compact_dependents()
+
     @property
     def mainmenu_text(self):
         """
@@ -1233,14 +1338,19 @@ class Kconfig(object):
         # is normal and expected within a .config file.
         self._warn_assign_no_prompt = False
 
+        # Nothing looks at symbol values while the file is loaded, so
+        # invalidation of cached values can be done once at the end
+        self._defer_invalidation()
+
         # This stub only exists to make sure _warn_assign_no_prompt gets
-        # reenabled
+        # reenabled and that cached values get invalidated
         try:
             self._load_config(filename, replace)
         except UnicodeDecodeError as e:
             _decoding_error(e, filename)
         finally:
             self._warn_assign_no_prompt = True
+            self._flush_invalidation()
 
         return ("Loaded" if replace else "Merged") + msg
 
@@ -1392,6 +1502,89 @@ class Kconfig(object):
         elif self.warn_assign_override:
             self._warn(msg, filename, linenr)
 
+    def set_values(self, values, replace=False):
+        """
+        Sets the user values of many symbols at once. Equivalent in effect to
+        calling Symbol.set_value() for each of the values, but cached values
+        are only invalidated once, after all assignments have been made, which
+        is much faster when assigning lots of symbols (e.g. when generating
+        many configuration variants from the same Kconfig tree).
+
+        Like for load_config(), no warnings are generated for assignments to
+        symbols without prompts. Instead, all assignments that didn't "take"
+        are reported together in the return value.
+
+        values:
+          A mapping (e.g. a dict) from symbol names (without the 'CONFIG_'
+          prefix) to values. The values use the same format as for
+          Symbol.set_value().
+
+        replace (default: False):
+          If True, all existing user values that aren't assigned in 'values'
+          are removed, as for load_config() with replace=True.
+
+        Returns a list with (name, value, msg) tuples for all assignments that
+        are to undefined symbols, have values that are invalid for the type of
+        the symbol, or where the symbol ended up with a different value (e.g.
+        due to unsatisfied dependencies or a missing prompt). 'msg' is a string
+        describing the problem. Undefined symbols and invalid values are
+        listed first, followed by assignments that didn't take.
+        """
+        conflicts = []
+        # (sym, name, value) tuples for valid assignments to defined symbols
+        assigned = []
+
+        self._warn_assign_no_prompt = False
+        self._defer_invalidation()
+        try:
+            if replace:
+                for sym in self.unique_defined_syms:
+                    sym._was_set = False
+
+                for choice in self.unique_choices:
+                    choice._was_set = False
+
+            for name, value in values.items():
+                sym = self.syms.get(name)
+                if not sym or not sym.nodes:
+                    conflicts.append((name, value, "undefined symbol"))
+                    continue
+
+                if not sym.set_value(value):
+                    conflicts.append((
+                        name, value,
+                        "invalid value for the {} symbol"
+                        .format(TYPE_TO_STR[sym.orig_type])))
+                    continue
+
+                assigned.append((sym, name, value))
+
+            if replace:
+                for sym in self.unique_defined_syms:
+                    if not sym._was_set:
+                        sym.unset_value()
+
+                for choice in self.unique_choices:
+                    if not choice._was_set:
+                        choice.unset_value()
+        finally:
+            self._warn_assign_no_prompt = True
+            self._flush_invalidation()
+
+        # Values are calculated on demand and cached, so each symbol only gets
+        # evaluated once here, after its dependencies
+        for sym, name, value in assigned:
+            if sym.orig_type in _BOOL_TRISTATE:
+                if STR_TO_TRI.get(value, value) == sym.tri_value:
+                    continue
+            elif value == sym.str_value:
+                continue
+
+            conflicts.append((name, value, "got the value '{}'"
+                                           .format(sym.str_value)))
+
+        return conflicts
+
     def load_allconfig(self, filename):
         """
         Helper for all*config. Loads (merges) the configuration file specified
@@ -1453,16 +1646,17 @@ class Kconfig(object):
             filename = os.getenv("KCONFIG_AUTOHEADER",
                                  "include/generated/autoconf.h")
 
-        if self._write_if_changed(filename, self._autoconf_contents(header)):
+        if header is None:
+            header = self.header_header
+
+        if self._write_output_if_changed(
+                filename, self._autoconf_contents, header):
             return "Kconfig header saved to '{}'".format(filename)
         return "No change to Kconfig header in '{}'".format(filename)
 
     def _autoconf_contents(self, header):
         # write_autoconf() helper. Returns the contents to write as a string,
-        # with 'header' or KCONFIG_AUTOHEADER_HEADER at the beginning.
-
-        if header is None:
-            header = self.header_header
+        # with 'header' at the beginning.
 
         chunks = [header]  # "".join()ed later
         add = chunks.append
@@ -1568,21 +1762,17 @@ class Kconfig(object):
         if filename is None:
             filename = standard_config_filename()
 
-        contents = self._config_contents(header)
-        if self._contents_eq(filename, contents):
-            return "No change to configuration in '{}'".format(filename)
-
-        if save_old:
-            _save_old(filename)
-
-        with self._open(filename, "w") as f:
-            f.write(contents)
+        if header is None:
+            header = self.config_header
 
-        return "Configuration saved to '{}'".format(filename)
+        if self._write_output_if_changed(
+                filename, self._config_contents, header, save_old):
+            return "Configuration saved to '{}'".format(filename)
+        return "No change to configuration in '{}'".format(filename)
 
     def _config_contents(self, header):
         # write_config() helper. Returns the contents to write as a string,
-        # with 'header' or KCONFIG_CONFIG_HEADER at the beginning.
+        # with 'header' at the beginning.
         #
         # More memory friendly would be to 'yield' the strings and
         # "".join(_config_contents()), but it was a bit slower on my system.
@@ -1594,9 +1784,6 @@ class Kconfig(object):
         for sym in self.unique_defined_syms:
             sym._visited = False
 
-        if header is None:
-            header = self.config_header
-
         chunks = [header]  # "".join()ed later
         add = chunks.append
 
@@ -1688,16 +1875,17 @@ class Kconfig(object):
         boilerplate in tools, which can do e.g.
         print(kconf.write_min_config()).
         """
-        if self._write_if_changed(filename, self._min_config_contents(header)):
+        if header is None:
+            header = self.config_header
+
+        if self._write_output_if_changed(
+                filename, self._min_config_contents, header):
             return "Minimal configuration saved to '{}'".format(filename)
         return "No change to minimal configuration in '{}'".format(filename)
 
     def _min_config_contents(self, header):
         # write_min_config() helper. Returns the contents to write as a string,
-        # with 'header' or KCONFIG_CONFIG_HEADER at the beginning.
-
-        if header is None:
-            header = self.config_header
+        # with 'header' at the beginning.
 
         chunks = [header]  # "".join()ed later
         add = chunks.append
@@ -1776,6 +1964,12 @@ class Kconfig(object):
              metadata like the modification time and possibly triggering
              redundant work in build tools.
 
+             A binary snapshot of the values in auto.conf is kept in
+             <path>/auto.conf.snapshot. If auto.conf hasn't been modified since
+             the snapshot was written, old values are loaded from the snapshot
+             instead of parsing auto.conf, and auto.conf isn't regenerated at
+             all if no symbol changed value.
+
 
         The last piece of the puzzle is knowing what symbols each source file
         depends on. Knowing that, dependencies can be added from source files
@@ -1795,41 +1989,30 @@ class Kconfig(object):
             os.mkdir(path, 0o755)
 
         # Load old values from auto.conf, if any
-        self._load_old_vals(path)
+        old_vals, from_snapshot = self._load_old_vals(path)
+        new_vals = self._auto_conf_vals()
 
-        for sym in self.unique_defined_syms:
-            # _write_to_conf is determined when the value is calculated. This
-            # is a hidden function call due to property magic.
-            #
-            # Note: In client code, you can check if sym.config_string is empty
-            # instead, to avoid accessing the internal _write_to_conf variable
-            # (though it's likely to keep working).
-            val = sym.str_value
+        changed = False
 
+        for sym in self.unique_defined_syms:
             # n tristate values do not get written to auto.conf and autoconf.h,
-            # making a missing symbol logically equivalent to n
-
-            if sym._write_to_conf:
-                if sym._old_val is None and \
-                   sym.orig_type in _BOOL_TRISTATE and \
-                   val == "n":
-                    # No old value (the symbol was missing or n), new value n.
-                    # No change.
-                    continue
-
-                if val == sym._old_val:
-                    # New value matches old. No change.
-                    continue
-
-            elif sym._old_val is None:
-                # The symbol wouldn't appear in autoconf.h (because
-                # _write_to_conf is false), and it wouldn't have appeared in
-                # autoconf.h previously either (because it didn't appear in
-                # auto.conf). No change.
-                continue
-
-            # 'sym' has a new value. Flag it.
-            _touch_dep_file(path, sym.name)
+            # making a missing symbol logically equivalent to n. Symbols that
+            # don't get written out are missing from both dictionaries.
+            if old_vals.get(sym.name) != new_vals.get(sym.name):
+                # 'sym' has a new value. Flag it.
+                _touch_dep_file(path, sym.name)
+                changed = True
+
+        for name in old_vals:
+            if name not in self.syms:
+                # Flag that the symbol no longer exists, in case something
+                # still depends on it
+                _touch_dep_file(path, name)
+                changed = True
+
+        if from_snapshot and not changed:
+            # auto.conf and the snapshot are already up-to-date
+            return
 
         # Remember the current values as the "new old" values.
         #
@@ -1837,24 +2020,48 @@ class Kconfig(object):
         # putting it last means _sync_deps() can be safely rerun if it fails
         # before this point.
         self._write_old_vals(path)
+        self._write_old_vals_snapshot(path, new_vals)
+
+    def _auto_conf_vals(self):
+        # Returns a dictionary that maps the names of all symbols that get
+        # written to auto.conf to their values, in the format loaded by
+        # _load_old_vals()
+
+        vals = {}
+
+        for sym in self.unique_defined_syms:
+            # _write_to_conf is determined when the value is calculated. This
+            # is a hidden function call due to property magic.
+            val = sym.str_value
+            if sym._write_to_conf and \
+               not (sym.orig_type in _BOOL_TRISTATE and val == "n"):
+                vals[sym.name] = val
+
+        return vals
 
     def _load_old_vals(self, path):
-        # Loads old symbol values from auto.conf into a dedicated
-        # Symbol._old_val field. Mirrors load_config().
+        # Loads old symbol values, either from the snapshot written by
+        # _write_old_vals_snapshot(), or by parsing auto.conf. Mirrors
+        # load_config() in the latter case.
         #
-        # The extra field could be avoided with some trickery involving dumping
-        # symbol values and restoring them later, but this is simpler and
-        # faster. The C tools also use a dedicated field for this purpose.
+        # Returns a (vals, from_snapshot) tuple, where 'vals' is a dictionary
+        # that maps symbol names to values. 'from_snapshot' is True if the
+        # values came from a snapshot that is in sync with auto.conf.
 
-        for sym in self.unique_defined_syms:
-            sym._old_val = None
+        auto_conf_path = join(path, "auto.conf")
+
+        vals = self._load_old_vals_snapshot(path, auto_conf_path)
+        if vals is not None:
+            return vals, True
+
+        vals = {}
 
         try:
-            auto_conf = self._open(join(path, "auto.conf"), "r")
+            auto_conf = self._open(auto_conf_path, "r")
         except EnvironmentError as e:
             if e.errno == errno.ENOENT:
                 # No old values
-                return
+                return vals, False
             raise
 
         with auto_conf as f:
@@ -1866,8 +2073,11 @@ class Kconfig(object):
                     continue
 
                 name, val = match.groups()
-                if name in self.syms:
-                    sym = self.syms[name]
+                sym = self.syms.get(name)
+                if sym:
+                    if not sym.nodes:
+                        # Undefined symbols never change value
+                        continue
 
                     if sym.orig_type is STRING:
                         match = _conf_string_match(val)
@@ -1875,11 +2085,43 @@ class Kconfig(object):
                             continue
                         val = unescape(match.group(1))
 
-                    self.syms[name]._old_val = val
-                else:
-                    # Flag that the symbol no longer exists, in
-                    # case something still depends on it
-                    _touch_dep_file(path, name)
+                vals[name] = val
+
+        return vals, False
+
+    def _load_old_vals_snapshot(self, path, auto_conf_path):
+        # _load_old_vals() helper. Returns the old values from
+        # <path>/auto.conf.snapshot, or None if there is no snapshot or if
+        # auto.conf has changed since it was written.
+
+        # Import as needed, to save some startup time
+        import pickle
+
+        try:
+            with open(join(path, "auto.conf.snapshot"), "rb") as f:
+                version, auto_conf_stat, vals = pickle.load(f)
+        except Exception:
+            # Missing, unreadable, or from an incompatible version. Fall back
+            # on parsing auto.conf.
+            return None
+
+        if version != _SNAPSHOT_VERSION or \
+           auto_conf_stat != _file_stat(auto_conf_path):
+            return None
+
+        return vals
+
+    def _write_old_vals_snapshot(self, path, vals):
+        # Writes the auto.conf values in 'vals' to <path>/auto.conf.snapshot,
+        # along with the current modification time and size of auto.conf
+
+        import pickle
+
+        with open(join(path, "auto.conf.snapshot"), "wb") as f:
+            pickle.dump((_SNAPSHOT_VERSION,
+                         _file_stat(join(path, "auto.conf")),
+                         vals),
+                        f, 2)
 
     def _write_old_vals(self, path):
         # Helper for writing auto.conf. Basically just a simplified
@@ -1993,6 +2235,7 @@ class Kconfig(object):
         or Symbol.set_value() had never been called.
         """
         self._warn_assign_no_prompt = False
+        self._defer_invalidation()
         try:
             # set_value() already rejects undefined symbols, and they don't
             # need to be invalidated (because their value never changes), so we
@@ -2004,6 +2247,7 @@ class Kconfig(object):
                 choice.unset_value()
         finally:
             self._warn_assign_no_prompt = True
+            self._flush_invalidation()
 
     def enable_warnings(self):
         """
@@ -2152,6 +2396,10 @@ class Kconfig(object):
             # Absolute path
             rel_filename = filename
 
+        # Interned, so that files sourced more than once share a filename
+        # string in MenuNode.filename and kconfig_filenames
+        rel_filename = _intern(rel_filename)
+
         self.kconfig_filenames.append(rel_filename)
 
         # The parent Kconfig files are represented as a list of
@@ -2257,6 +2505,61 @@ class Kconfig(object):
         self._tokens = self._tokenize(line)
         self._reuse_tokens = True
 
+    def _write_output_if_changed(self, filename, contents_fn, header,
+                                 save_old=False):
+        # Writes the output from 'contents_fn(header)' into 'filename', but
+        # only if it differs from the current contents of the file. Used by
+        # write_config(), write_autoconf(), and write_min_config(), which
+        # resolve the default header first, so that 'header' is part of the
+        # snapshot key.
+        #
+        # If the file was written by this Kconfig instance with the same
+        # symbol values and hasn't been modified since, the contents aren't
+        # regenerated at all. See _output_unchanged().
+        #
+        # Returns True if the file has changed and is updated, and False
+        # otherwise.
+
+        key = (contents_fn.__name__, header, filename)
+        vals = self._output_vals()
+
+        if self._output_unchanged(key, filename, vals):
+            return False
+
+        contents = contents_fn(header)
+        if self._contents_eq(filename, contents):
+            self._output_snapshots[key] = (vals, _file_stat(filename))
+            return False
+
+        if save_old:
+            _save_old(filename)
+
+        with self._open(filename, "w") as f:
+            f.write(contents)
+
+        self._output_snapshots[key] = (vals, _file_stat(filename))
+        return True
+
+    def _output_vals(self):
+        # Returns a tuple with the value of each defined symbol and whether it
+        # gets written out. Configuration output is fully determined by these
+        # for a given Kconfig tree, which makes this a cheap way to detect
+        # that the output wouldn't change.
+
+        return tuple([(sym.str_value, sym._write_to_conf)
+                      for sym in self.unique_defined_syms])
+
+    def _output_unchanged(self, key, filename, vals):
+        # Returns True if the output identified by 'key' was last written to
+        # 'filename' with the symbol values 'vals', and the file hasn't been
+        # modified since (its modification time and size match). Only regular
+        # files are tracked, so e.g. writes to /dev/null always go through.
+
+        snapshot = self._output_snapshots.get(key)
+        return snapshot is not None and \
+               snapshot[1] is not None and \
+               snapshot == (vals, _file_stat(filename))
+
     def _write_if_changed(self, filename, contents):
         # Writes 'contents' into 'filename', but only if it differs from the
         # current contents of the file.
@@ -2302,6 +2605,10 @@ class Kconfig(object):
         if name in self.syms:
             return self.syms[name]
 
+        # Interned to speed up later dictionary lookups of the name (e.g. in
+        # load_config())
+        name = _intern(name)
+
         sym = Symbol()
         sym.kconfig = self
         sym.name = name
@@ -2930,7 +3237,7 @@ class Kconfig(object):
                 node.kconfig = self
                 node.item = sym
                 node.is_menuconfig = (t0 is _T_MENUCONFIG)
-                node.prompt = node.help = node.list = None
+                node.prompt = node._help = node.list = None
                 node.parent = parent
                 node.filename = self.filename
                 node.linenr = self.linenr
@@ -3068,7 +3375,7 @@ class Kconfig(object):
                 node.kconfig = choice.kconfig = self
                 node.item = choice
                 node.is_menuconfig = True
-                node.prompt = node.help = None
+                node.prompt = node._help = None
                 node.parent = parent
                 node.filename = self.filename
                 node.linenr = self.linenr
@@ -3310,7 +3617,7 @@ class Kconfig(object):
         node.prompt = (prompt, self._parse_cond())
 
     def _parse_help(self, node):
-        if node.help is not None:
+        if node._help is not None:
             self._warn(node.item.name_and_loc + " defined with more than "
                        "one help text -- only the last one will be used")
 
@@ -3343,29 +3650,73 @@ class Kconfig(object):
         # The help text goes on till the first non-blank line with less indent
         # than the first line
 
-        # Add the first line
-        lines = [expline[indent:]]
-        add_line = lines.append  # Micro-optimization
+        if self._lazy_help:
+            # Just skip over the help text, remembering the line it starts on.
+            # It's read in by _load_help() on first access to MenuNode.help.
+            # The help text is always in the same file as the node.
+            node._help = self.linenr
 
-        while 1:
-            line = readline()
-            if line.isspace():
-                # No need to preserve the exact whitespace in these
-                add_line("\n")
-            elif not line:
-                # End of file
-                break
-            else:
-                expline = line.expandtabs()
-                if len_(expline) - len_(expline.lstrip()) < indent:
+            # Lines that start with the same whitespace as the first line are
+            # indented enough, which avoids expanding tabs in the common case
+            prefix = line[:len_(line) - len_(line.lstrip())]
+
+            n_lines = 1
+            while 1:
+                line = readline()
+                if line.startswith(prefix) or line.isspace():
+                    n_lines += 1
+                elif not line:
+                    # End of file
                     break
-                add_line(expline[indent:])
+                else:
+                    expline = line.expandtabs()
+                    if len_(expline) - len_(expline.lstrip()) < indent:
+                        break
+                    n_lines += 1
+
+            self.linenr += n_lines
+
+        else:
+            node._help, n_lines, line = _read_help(readline, expline, indent)
+            self.linenr += n_lines
 
-        self.linenr += len_(lines)
-        node.help = "".join(lines).rstrip()
         if line:
             self._line_after_help(line)
 
+    def _load_help(self, filename, linenr):
+        # Reads the help text starting at line 'linenr' in the Kconfig file
+        # 'filename'. Used to load help texts on first access when
+        # lazy_help=True.
+        #
+        # The lines of the most recently used file are kept around, as help
+        # texts tend to be accessed for nodes that are close together (e.g.
+        # within the same menu).
+
+        if not self._help_file_cache or self._help_file_cache[0] != filename:
+            # Kconfig filenames are relative to $srctree, except for absolute
+            # paths, which join() leaves as-is
+            with self._open(join(self.srctree, filename), "r") as f:
+                self._help_file_cache = (filename, f.readlines())
+
+        lines = self._help_file_cache[1]
+
+        # The first line of the help text was checked to be non-blank and
+        # indented during parsing
+        expline = lines[linenr - 1].expandtabs()
+        indent = len(expline) - len(expline.lstrip())
+
+        # Acts like readline() on the remaining lines, returning "" at the end
+        next_i = [linenr]
+
+        def readline():
+            i = next_i[0]
+            if i == len(lines):
+                return ""
+            next_i[0] = i + 1
+            return lines[i]
+
+        return _read_help(readline, expline, indent)[0]
+
     def _empty_help(self, node, line):
         self._warn(node.item.name_and_loc +
                    " has 'help' but empty help text")
@@ -3524,6 +3875,72 @@ class Kconfig(object):
             for _, cond in choice.defaults:
                 depend_on(choice, cond)
 
+        # The MODULES symbol implicitly affects the type (and hence the value)
+        # of every tristate symbol and choice, without appearing in their
+        # expressions. Rather than invalidating everything when MODULES
+        # changes, keep an explicit list of the items it affects.
+        #
+        # This is kept separate from MODULES._dependents so that it doesn't
+        # create spurious dependency loops, e.g. if MODULES itself depends on
+        # a tristate symbol.
+        self._modules_dependents = \
+            [sym for sym in self.unique_defined_syms
+             if sym.orig_type is TRISTATE] + \
+            [choice for choice in self.unique_choices
+             if choice.orig_type is TRISTATE]
+
+    def _build_evaluators(self, compile_exprs):
+        # Sets Kconfig._eval_expr and the Symbol/Choice._eval_* attributes.
+        # The value calculation code evaluates the expressions that go into
+        # the value of an item as _eval_expr(<expression from _eval_*>).
+        #
+        # By default, the _eval_* attributes are left as None and _eval_expr
+        # is expr_value(). The value calculation code then evaluates the
+        # public attributes (defaults, rev_dep, etc.) and _visibility() looks
+        # at the menu nodes, so changes to them after parsing are honored.
+        #
+        # With compile_exprs=True, the expressions are replaced by functions
+        # that take no arguments (see _expr_evaluator()), and _eval_expr just
+        # calls them. Expression objects that appear in several places (e.g.
+        # the constant 'y' symbol, used as the condition for unconditional
+        # defaults) share a function. The functions are bound to the
+        # expressions the tree has now, so it's frozen from here on.
+
+        if not compile_exprs:
+            self._eval_expr = expr_value
+            return
+
+        self._eval_expr = _call_evaluator
+
+        evaluator = partial(_expr_evaluator, cache={})
+
+        for sym in self.unique_defined_syms:
+            if sym.orig_type in _BOOL_TRISTATE:
+                # Symbol.tri_value evaluates both the default and the
+                # condition
+                sym._eval_defaults = [(evaluator(default), evaluator(cond))
+                                      for default, cond in sym.defaults]
+            else:
+                # Symbol.str_value looks at the str_value of the default
+                # symbol
+                sym._eval_defaults = [(default, evaluator(cond))
+                                      for default, cond in sym.defaults]
+
+            sym._eval_ranges = [(low, high, evaluator(cond))
+                                for low, high, cond in sym.ranges]
+            sym._eval_rev_dep = evaluator(sym.rev_dep)
+            sym._eval_weak_rev_dep = evaluator(sym.weak_rev_dep)
+            sym._eval_direct_dep = evaluator(sym.direct_dep)
+            sym._eval_prompt_conds = [evaluator(node.prompt[1])
+                                      for node in sym.nodes if node.prompt]
+
+        for choice in self.unique_choices:
+            choice._eval_defaults = [(sym, evaluator(cond))
+                                     for sym, cond in choice.defaults]
+            choice._eval_prompt_conds = [evaluator(node.prompt[1])
+                                         for node in choice.nodes
+                                         if node.prompt]
+
     def _add_choice_deps(self):
         # Choices also depend on the choice symbols themselves, because the
         # y-mode selection of the choice might change if a choice symbol's
@@ -3538,15 +3955,42 @@ class Kconfig(object):
             for sym in choice.syms:
                 sym._dependents.add(choice)
 
-    def _invalidate_all(self):
-        # Undefined symbols never change value and don't need to be
-        # invalidated, so we can just iterate over defined symbols.
-        # Invalidating constant symbols would break things horribly.
-        for sym in self.unique_defined_syms:
-            sym._invalidate()
+    def _compact_dependents(self):
+        # Turns the Symbol/Choice._dependents sets into tuples once they're
+        # complete. They're only iterated over after this (in
+        # _rec_invalidate()), and tuples are a lot smaller than sets, which
+        # matters for large trees: an empty set is over 200 bytes, while all
+        # empty tuples share a single object.
+
+        for sym in self.syms.values():
+            sym._dependents = tuple(sym._dependents)
+
+        for sym in self.const_syms.values():
+            sym._dependents = tuple(sym._dependents)
 
         for choice in self.unique_choices:
-            choice._invalidate()
+            choice._dependents = tuple(choice._dependents)
+
+    def _defer_invalidation(self):
+        # Makes Symbol/Choice._rec_invalidate() just record the item instead
+        # of invalidating it, until _flush_invalidation() is called. Used when
+        # assigning many values at once, where nothing looks at the values
+        # until all assignments have been made.
+        #
+        # Invalidating each item once at the end is cheaper, as
+        # _rec_invalidate() stops at items that were already invalidated.
+
+        self._deferred_invalidations = set()
+
+    def _flush_invalidation(self):
+        # Invalidates all items recorded since _defer_invalidation() and turns
+        # off deferred invalidation
+
+        items = self._deferred_invalidations
+        self._deferred_invalidations = None
+
+        for item in items:
+            item._rec_invalidate()
 
     #
     # Post-parsing menu tree processing, including dependency propagation and
@@ -3723,6 +4167,72 @@ class Kconfig(object):
     # Misc.
     #
 
+    def _check_tree(self, force_checks):
+        # Runs _run_tree_checks(), or replays its warnings from the
+        # KCONFIG_CHECK_CACHE file if the file has the result for a Kconfig
+        # tree with the same fingerprint (see _tree_fingerprint())
+
+        path = os.getenv("KCONFIG_CHECK_CACHE")
+        if not path or force_checks:
+            self._run_tree_checks()
+            return
+
+        fingerprint = _tree_fingerprint(self)
+        if fingerprint is None:
+            # Couldn't read some Kconfig file. Don't cache anything.
+            self._run_tree_checks()
+            return
+
+        warnings = _load_check_cache(path, fingerprint)
+        if warnings is not None:
+            self._add_warnings(warnings)
+            return
+
+        # Run the checks with warnings enabled and collect them, so that the
+        # cached result doesn't depend on the warning settings
+        n_warnings = len(self.warnings)
+        warn, warn_to_stderr = self.warn, self.warn_to_stderr
+        self.warn = True
+        self.warn_to_stderr = False
+        try:
+            self._run_tree_checks()
+        finally:
+            warnings = self.warnings[n_warnings:]
+            del self.warnings[n_warnings:]
+            self.warn, self.warn_to_stderr = warn, warn_to_stderr
+            self._add_warnings(warnings)
+
+        # Only reached if the checks passed. Errors aren't cached.
+        _save_check_cache(path, fingerprint, warnings)
+
+    def _run_tree_checks(self):
+        # Does sanity checks (which only generate errors and warnings) and
+        # checks for dependency loops. Some of these depend on everything being
+        # finalized.
+
+        self._check_sym_sanity()
+        self._check_choice_sanity()
+
+        if _warn_undef_enabled():
+            self._check_undef_syms()
+
+        # Check for dependency loops
+        check_dep_loop_sym = _check_dep_loop_sym  # Micro-optimization
+        for sym in self.unique_defined_syms:
+            check_dep_loop_sym(sym, False)
+
+    def _add_warnings(self, warnings):
+        # Adds already formatted warning messages from the KCONFIG_CHECK_CACHE
+        # file (or collected while writing it), like _warn() would
+
+        if not self.warn:
+            return
+
+        self.warnings += warnings
+        if self.warn_to_stderr:
+            for msg in warnings:
+                sys.stderr.write(msg + "\n")
+
     def _check_sym_sanity(self):
         # Checks various symbol properties that are handiest to check after
         # parsing. Only generates errors and warnings.
@@ -4244,7 +4754,12 @@ class Symbol(object):
         "_cached_tri_val",
         "_cached_vis",
         "_dependents",
-        "_old_val",
+        "_eval_defaults",
+        "_eval_direct_dep",
+        "_eval_prompt_conds",
+        "_eval_ranges",
+        "_eval_rev_dep",
+        "_eval_weak_rev_dep",
         "_visited",
         "_was_set",
         "_write_to_conf",
@@ -4310,6 +4825,15 @@ class Symbol(object):
 
         self._write_to_conf = (vis != 0)
 
+        # See Kconfig._build_evaluators()
+        eval_expr = self.kconfig._eval_expr
+        if self._eval_defaults is None:
+            defaults = self.defaults
+            ranges = self.ranges
+        else:
+            defaults = self._eval_defaults
+            ranges = self._eval_ranges
+
         if self.orig_type in _INT_HEX:
             # The C implementation checks the user value against the range in a
             # separate code path (post-processing after loading a .config).
@@ -4319,8 +4843,8 @@ class Symbol(object):
             base = _TYPE_TO_BASE[self.orig_type]
 
             # Check if a range is in effect
-            for low_expr, high_expr, cond in self.ranges:
-                if expr_value(cond):
+            for low_expr, high_expr, cond in ranges:
+                if eval_expr(cond):
                     has_active_range = True
 
                     # The zeros are from the C implementation running strtoll()
@@ -4362,8 +4886,8 @@ class Symbol(object):
                 # Used to implement the warning below
                 has_default = False
 
-                for sym, cond in self.defaults:
-                    if expr_value(cond):
+                for sym, cond in defaults:
+                    if eval_expr(cond):
                         has_default = self._write_to_conf = True
 
                         val = sym.str_value
@@ -4407,8 +4931,8 @@ class Symbol(object):
                 val = self.user_value
             else:
                 # Otherwise, look at defaults
-                for sym, cond in self.defaults:
-                    if expr_value(cond):
+                for sym, cond in defaults:
+                    if eval_expr(cond):
                         val = sym.str_value
                         self._write_to_conf = True
                         break
@@ -4448,6 +4972,19 @@ class Symbol(object):
         vis = self.visibility
         self._write_to_conf = (vis != 0)
 
+        # See Kconfig._build_evaluators()
+        eval_expr = self.kconfig._eval_expr
+        if self._eval_defaults is None:
+            defaults = self.defaults
+            rev_dep = self.rev_dep
+            weak_rev_dep = self.weak_rev_dep
+            direct_dep = self.direct_dep
+        else:
+            defaults = self._eval_defaults
+            rev_dep = self._eval_rev_dep
+            weak_rev_dep = self._eval_weak_rev_dep
+            direct_dep = self._eval_direct_dep
+
         val = 0
 
         if not self.choice:
@@ -4461,25 +4998,25 @@ class Symbol(object):
                 # Otherwise, look at defaults and weak reverse dependencies
                 # (implies)
 
-                for default, cond in self.defaults:
-                    dep_val = expr_value(cond)
+                for default, cond in defaults:
+                    dep_val = eval_expr(cond)
                     if dep_val:
-                        val = min(expr_value(default), dep_val)
+                        val = min(eval_expr(default), dep_val)
                         if val:
                             self._write_to_conf = True
                         break
 
                 # Weak reverse dependencies are only considered if our
                 # direct dependencies are met
-                dep_val = expr_value(self.weak_rev_dep)
-                if dep_val and expr_value(self.direct_dep):
+                dep_val = eval_expr(weak_rev_dep)
+                if dep_val and eval_expr(direct_dep):
                     val = max(dep_val, val)
                     self._write_to_conf = True
 
             # Reverse (select-related) dependencies take precedence
-            dep_val = expr_value(self.rev_dep)
+            dep_val = eval_expr(rev_dep)
             if dep_val:
-                if expr_value(self.direct_dep) < dep_val:
+                if eval_expr(direct_dep) < dep_val:
                     self._warn_select_unsatisfied_deps()
 
                 val = max(dep_val, val)
@@ -4487,8 +5024,8 @@ class Symbol(object):
 
             # m is promoted to y for (1) bool symbols and (2) symbols with a
             # weak_rev_dep (from imply) of y
-            if val == 1 and \
-               (self.type is BOOL or expr_value(self.weak_rev_dep) == 2):
+            if val == 1 and (self.type is BOOL or
+                             eval_expr(weak_rev_dep) == 2):
                 val = 2
 
         elif vis == 2:
@@ -4807,9 +5344,17 @@ class Symbol(object):
         self._was_set = \
         self._write_to_conf = False
 
-        # See Kconfig._build_dep()
+        # See Kconfig._build_dep(). Turned into a tuple by
+        # Kconfig._compact_dependents() after parsing.
         self._dependents = set()
 
+        # See Kconfig._build_evaluators(). Set only with compile_exprs=True,
+        # and only for defined symbols, which are the only ones whose values
+        # are calculated from expressions.
+        self._eval_defaults = self._eval_ranges = self._eval_rev_dep = \
+        self._eval_weak_rev_dep = self._eval_direct_dep = \
+        self._eval_prompt_conds = None
+
     def _assignable(self):
         # Worker function for the 'assignable' attribute
 
@@ -4822,14 +5367,23 @@ class Symbol(object):
         if not vis:
             return ()
 
-        rev_dep_val = expr_value(self.rev_dep)
+        # See Kconfig._build_evaluators()
+        eval_expr = self.kconfig._eval_expr
+        if self._eval_rev_dep is None:
+            weak_rev_dep = self.weak_rev_dep
+            rev_dep = self.rev_dep
+        else:
+            weak_rev_dep = self._eval_weak_rev_dep
+            rev_dep = self._eval_rev_dep
+
+        rev_dep_val = eval_expr(rev_dep)
 
         if vis == 2:
             if self.choice:
                 return (2,)
 
             if not rev_dep_val:
-                if self.type is BOOL or expr_value(self.weak_rev_dep) == 2:
+                if self.type is BOOL or eval_expr(weak_rev_dep) == 2:
                     return (0, 2)
                 return (0, 1, 2)
 
@@ -4838,7 +5392,7 @@ class Symbol(object):
 
             # rev_dep_val == 1
 
-            if self.type is BOOL or expr_value(self.weak_rev_dep) == 2:
+            if self.type is BOOL or eval_expr(weak_rev_dep) == 2:
                 return (2,)
             return (1, 2)
 
@@ -4847,7 +5401,7 @@ class Symbol(object):
         # Must be a tristate here, because bool m visibility gets promoted to y
 
         if not rev_dep_val:
-            return (0, 1) if expr_value(self.weak_rev_dep) != 2 else (0, 2)
+            return (0, 1) if eval_expr(weak_rev_dep) != 2 else (0, 2)
 
         if rev_dep_val == 2:
             return (2,)
@@ -4865,33 +5419,40 @@ class Symbol(object):
     def _rec_invalidate(self):
         # Invalidates the symbol and all items that (possibly) depend on it
 
-        if self is self.kconfig.modules:
-            # Invalidating MODULES has wide-ranging effects
-            self.kconfig._invalidate_all()
-        else:
-            self._invalidate()
+        if self.kconfig._deferred_invalidations is not None:
+            # See Kconfig._defer_invalidation()
+            self.kconfig._deferred_invalidations.add(self)
+            return
 
-            for item in self._dependents:
-                # _cached_vis doubles as a flag that tells us whether 'item'
-                # has cached values, because it's calculated as a side effect
-                # of calculating all other (non-constant) cached values.
-                #
-                # If item._cached_vis is None, it means there can't be cached
-                # values on other items that depend on 'item', because if there
-                # were, some value on 'item' would have been calculated and
-                # item._cached_vis set as a side effect. It's therefore safe to
-                # stop the invalidation at symbols with _cached_vis None.
-                #
-                # This approach massively speeds up scripts that set a lot of
-                # values, vs simply invalidating all possibly dependent symbols
-                # (even when you already have a list of all the dependent
-                # symbols, because some symbols get huge dependency trees).
-                #
-                # This gracefully handles dependency loops too, which is nice
-                # for choices, where the choice depends on the choice symbols
-                # and vice versa.
-                if item._cached_vis is not None:
-                    item._rec_invalidate()
+        self._invalidate()
+
+        dependents = self._dependents
+        if self is self.kconfig.modules:
+            # MODULES also affects all tristate symbols and choices. See
+            # Kconfig._build_dep().
+            dependents = self.kconfig._modules_dependents + list(dependents)
+
+        for item in dependents:
+            # _cached_vis doubles as a flag that tells us whether 'item'
+            # has cached values, because it's calculated as a side effect
+            # of calculating all other (non-constant) cached values.
+            #
+            # If item._cached_vis is None, it means there can't be cached
+            # values on other items that depend on 'item', because if there
+            # were, some value on 'item' would have been calculated and
+            # item._cached_vis set as a side effect. It's therefore safe to
+            # stop the invalidation at symbols with _cached_vis None.
+            #
+            # This approach massively speeds up scripts that set a lot of
+            # values, vs simply invalidating all possibly dependent symbols
+            # (even when you already have a list of all the dependent
+            # symbols, because some symbols get huge dependency trees).
+            #
+            # This gracefully handles dependency loops too, which is nice
+            # for choices, where the choice depends on the choice symbols
+            # and vice versa.
+            if item._cached_vis is not None:
+                item._rec_invalidate()
 
     def _rec_invalidate_if_has_prompt(self):
         # Invalidates the symbol and its dependent symbols, but only if the
@@ -5151,6 +5712,8 @@ class Choice(object):
         "_cached_selection",
         "_cached_vis",
         "_dependents",
+        "_eval_defaults",
+        "_eval_prompt_conds",
         "_visited",
         "_was_set",
         "defaults",
@@ -5399,9 +5962,13 @@ class Choice(object):
         # to special-case choices.
         self.is_constant = self.is_optional = False
 
-        # See Kconfig._build_dep()
+        # See Kconfig._build_dep(). Turned into a tuple by
+        # Kconfig._compact_dependents() after parsing.
         self._dependents = set()
 
+        # See Kconfig._build_evaluators()
+        self._eval_defaults = self._eval_prompt_conds = None
+
     def _assignable(self):
         # Worker function for the 'assignable' attribute
 
@@ -5439,9 +6006,13 @@ class Choice(object):
 
     def _selection_from_defaults(self):
         # Check if we have a default
-        for sym, cond in self.defaults:
+        eval_expr = self.kconfig._eval_expr
+        defaults = self.defaults if self._eval_defaults is None else \
+                   self._eval_defaults
+
+        for sym, cond in defaults:
             # The default symbol must be visible too
-            if expr_value(cond) and sym.visibility:
+            if eval_expr(cond) and sym.visibility:
                 return sym
 
         # Otherwise, pick the first visible symbol, if any
@@ -5459,6 +6030,10 @@ class Choice(object):
     def _rec_invalidate(self):
         # See Symbol._rec_invalidate()
 
+        if self.kconfig._deferred_invalidations is not None:
+            self.kconfig._deferred_invalidations.add(self)
+            return
+
         self._invalidate()
 
         for item in self._dependents:
@@ -5551,6 +6126,9 @@ class MenuNode(object):
       text. This was not the case before Kconfiglib 10.21.0, where the format
       was undocumented.
 
+      If the Kconfig instance was created with lazy_help=True, the help text
+      is read from the Kconfig file on first access.
+
     dep:
       The direct ('depends on') dependencies for the menu node, or
       self.kconfig.y if there are no direct dependencies.
@@ -5609,9 +6187,9 @@ class MenuNode(object):
       The Kconfig instance the menu node is from.
     """
     __slots__ = (
+        "_help",
         "dep",
         "filename",
-        "help",
         "include_path",
         "is_menuconfig",
         "item",
@@ -5639,6 +6217,20 @@ class MenuNode(object):
         self.implies = []
         self.ranges = []
 
+    @property
+    def help(self):
+        """
+        See the class documentation.
+        """
+        if self._help.__class__ is int:
+            # Lazily loaded help text. See Kconfig._parse_help().
+            self._help = self.kconfig._load_help(self.filename, self._help)
+        return self._help
+
+    @help.setter
+    def help(self, value):
+        self._help = value
+
     @property
     def orig_prompt(self):
         """
@@ -6194,10 +6786,11 @@ def unescape(s):
 _unescape_sub = re.compile(r"\\(.)").sub
 
 
-def standard_kconfig(description=None):
+def standard_kconfig(description=None, lazy_help=False):
     """
     Argument parsing helper for tools that take a single optional Kconfig file
-    argument (default: Kconfig). Returns the Kconfig instance for the parsed
+    argument (default: Kconfig), and a --strict flag that disables the
+    KCONFIG_CHECK_CACHE cache. Returns the Kconfig instance for the parsed
     configuration. Uses argparse internally.
 
     Exits with sys.exit() (which raises SystemExit) on errors.
@@ -6205,6 +6798,9 @@ def standard_kconfig(description=None):
     description (default: None):
       The 'description' passed to argparse.ArgumentParser().
       argparse.RawDescriptionHelpFormatter is used, so formatting is preserved.
+
+    lazy_help (default: False):
+      Passed on to Kconfig.__init__().
     """
     import argparse
 
@@ -6219,7 +6815,16 @@ def standard_kconfig(description=None):
         nargs="?",
         help="Top-level Kconfig file (default: Kconfig)")
 
-    return Kconfig(parser.parse_args().kconfig, suppress_traceback=True)
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Always run the sanity checks on the Kconfig files, ignoring "
+             "KCONFIG_CHECK_CACHE")
+
+    args = parser.parse_args()
+
+    return Kconfig(args.kconfig, suppress_traceback=True, lazy_help=lazy_help,
+                   force_checks=args.strict)
 
 
 def standard_config_filename():
@@ -6291,9 +6896,14 @@ def _visibility(sc):
 
     vis = 0
 
-    for node in sc.nodes:
-        if node.prompt:
-            vis = max(vis, expr_value(node.prompt[1]))
+    if sc._eval_prompt_conds is None:
+        for node in sc.nodes:
+            if node.prompt:
+                vis = max(vis, expr_value(node.prompt[1]))
+    else:
+        # Compiled prompt conditions. See Kconfig._build_evaluators().
+        for cond_fn in sc._eval_prompt_conds:
+            vis = max(vis, cond_fn())
 
     if sc.__class__ is Symbol and sc.choice:
         if sc.choice.orig_type is TRISTATE and \
@@ -6313,6 +6923,134 @@ def _visibility(sc):
     return vis
 
 
+def _call_evaluator(fn):
+    # Kconfig._eval_expr for compile_exprs=True, where expressions have been
+    # replaced by functions from _expr_evaluator()
+
+    return fn()
+
+
+def _expr_evaluator(expr, cache):
+    # Returns a function that takes no arguments and returns the value of
+    # 'expr', for Kconfig._build_evaluators(). 'cache' maps id()s of
+    # expressions to functions, so that shared (sub)expressions share a
+    # function. The expressions are kept alive by the symbols and choices, so
+    # the id()s stay unique.
+    #
+    # Chains of AND/OR and NOTs are compiled into closures that call the
+    # functions for their operands directly, skipping the type checks and
+    # recursion in expr_value(). Chains like A && B && C become a single
+    # closure that loops over the operands. Relations are left to
+    # expr_value(), which needs to look at the types of the operands anyway.
+
+    try:
+        return cache[id(expr)]
+    except KeyError:
+        pass
+
+    if expr.__class__ is not tuple:
+        # Symbol or Choice. Calls the tri_value property getter directly.
+        fn = partial(expr.__class__.tri_value.fget, expr)
+
+    elif expr[0] is NOT:
+        fn = _not_evaluator(_expr_evaluator(expr[1], cache))
+
+    elif expr[0] is AND or expr[0] is OR:
+        fns = [_expr_evaluator(operand, cache)
+               for operand in _flatten_expr(expr, expr[0])]
+
+        fn = _and_evaluator(fns) if expr[0] is AND else _or_evaluator(fns)
+
+    else:
+        # Relation
+        fn = partial(expr_value, expr)
+
+    cache[id(expr)] = fn
+    return fn
+
+
+def _flatten_expr(expr, op):
+    # Returns a list with the operands of a chain of 'op' (AND or OR) in
+    # 'expr', in evaluation order. (AND, (AND, A, B), C) gives [A, B, C].
+
+    res = []
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        if expr.__class__ is tuple and expr[0] is op:
+            stack.append(expr[2])
+            stack.append(expr[1])
+        else:
+            res.append(expr)
+
+    return res
+
+
+def _and_evaluator(fns):
+    # Compiled AND chain. Returns n as soon as an operand is n, like
+    # expr_value().
+
+    if len(fns) == 2:
+        # Most common case. Unrolled.
+        fn1, fn2 = fns
+
+        def and_fn():
+            v1 = fn1()
+            if not v1:
+                return 0
+            v2 = fn2()
+            return v1 if v1 < v2 else v2
+
+        return and_fn
+
+    def and_fn():
+        res = 2
+        for fn in fns:
+            v = fn()
+            if not v:
+                return 0
+            if v < res:
+                res = v
+        return res
+
+    return and_fn
+
+
+def _or_evaluator(fns):
+    # Compiled OR chain. Returns y as soon as an operand is y, like
+    # expr_value().
+
+    if len(fns) == 2:
+        fn1, fn2 = fns
+
+        def or_fn():
+            v1 = fn1()
+            if v1 == 2:
+                return 2
+            v2 = fn2()
+            return v1 if v1 > v2 else v2
+
+        return or_fn
+
+    def or_fn():
+        res = 0
+        for fn in fns:
+            v = fn()
+            if v == 2:
+                return 2
+            if v > res:
+                res = v
+        return res
+
+    return or_fn
+
+
+def _not_evaluator(fn):
+    # Compiled NOT
+
+    return lambda: 2 - fn()
+
+
 def _depend_on(sc, expr):
     # Adds 'sc' (symbol or choice) as a "dependee" to all symbols in 'expr'.
     # Constant symbols in 'expr' are skipped as they can never change value
@@ -6389,6 +7127,53 @@ def _touch_dep_file(path, sym_name):
         sym_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
 
 
+def _file_stat(path):
+    # Returns a (modification time, size) tuple for 'path', used to check if
+    # a file has changed since a snapshot was taken. Returns None if 'path'
+    # doesn't exist or isn't a regular file.
+
+    try:
+        st = os.stat(path)
+    except EnvironmentError:
+        return None
+
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    return (st.st_mtime, st.st_size)
+
+
+def _read_help(readline, expline, indent):
+    # Reads a help text. 'expline' is the first line of the help text, with
+    # tabs expanded, and 'indent' its indentation. The help text goes on till
+    # the first non-blank line with less indent than the first line.
+    #
+    # Returns a (help text, number of lines, line after help text) tuple. The
+    # line after the help text is "" at EOF.
+
+    len_ = len  # Micro-optimization
+
+    # Add the first line
+    lines = [expline[indent:]]
+    add_line = lines.append  # Micro-optimization
+
+    while 1:
+        line = readline()
+        if line.isspace():
+            # No need to preserve the exact whitespace in these
+            add_line("\n")
+        elif not line:
+            # End of file
+            break
+        else:
+            expline = line.expandtabs()
+            if len_(expline) - len_(expline.lstrip()) < indent:
+                break
+            add_line(expline[indent:])
+
+    return "".join(lines).rstrip(), len_(lines), line
+
+
 def _save_old(path):
     # See write_config()
 
@@ -6779,19 +7564,23 @@ def _error_if_fn(kconf, _, cond, msg):
 
 
 def _shell_fn(kconf, _, command):
-    import subprocess  # Only import as needed, to save some startup time
+    # Commands are only run once per Kconfig instance, and possibly once
+    # across runs. See the 'Caching of $(shell,...) output' section in the
+    # module docstring.
 
-    stdout, stderr = subprocess.Popen(
-        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    ).communicate()
+    if command in kconf._shell_cache:
+        stdout, stderr = kconf._shell_cache[command]
+    else:
+        res = _shell_disk_lookup(kconf, command)
+        if res is None:
+            res = _run_shell(kconf, command)
+            _shell_disk_store(kconf, command, res)
 
-    if not _IS_PY2:
-        try:
-            stdout = stdout.decode(kconf._encoding)
-            stderr = stderr.decode(kconf._encoding)
-        except UnicodeDecodeError as e:
-            _decoding_error(e, kconf.filename, kconf.linenr)
+        kconf._shell_cache[command] = res
+        stdout, stderr = res
 
+    # Warn for each expansion, so that the location is reported like without
+    # caching
     if stderr:
         kconf._warn("'{}' wrote to stderr: {}".format(
                         command, "\n".join(stderr.splitlines())),
@@ -6806,10 +7595,209 @@ def _shell_fn(kconf, _, command):
     # parameter was added in 3.6), so we do this manual version instead.
     return "\n".join(stdout.splitlines()).rstrip("\n").replace("\n", " ")
 
+
+def _run_shell(kconf, command):
+    # _shell_fn() helper. Runs 'command' and returns a (stdout, stderr) tuple
+    # with the decoded output.
+
+    import subprocess  # Only import as needed, to save some startup time
+
+    stdout, stderr = subprocess.Popen(
+        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ).communicate()
+
+    if not _IS_PY2:
+        try:
+            stdout = stdout.decode(kconf._encoding)
+            stderr = stderr.decode(kconf._encoding)
+        except UnicodeDecodeError as e:
+            _decoding_error(e, kconf.filename, kconf.linenr)
+
+    return stdout, stderr
+
+
+def _shell_disk_key(kconf, command):
+    # Returns the key for 'command' in the KCONFIG_SHELL_CACHE file. Commands
+    # might depend on the current directory and on the environment variables
+    # referenced from the Kconfig files so far (e.g. $(CC) or
+    # $(CROSS_COMPILE)), so those are included, along with the variables in
+    # _SHELL_CACHE_ENV_VARS. Unrelated variables (e.g. $OLDPWD or $SHLVL) are
+    # left out, so that changing them doesn't invalidate the entries.
+
+    import hashlib
+
+    names = kconf.env_vars.union(_SHELL_CACHE_ENV_VARS)
+
+    h = hashlib.sha256()
+    for s in [command, os.getcwd()] + \
+             ["{}={}".format(name, os.environ.get(name, ""))
+              for name in sorted(names)]:
+        h.update(s.encode("utf-8", "surrogateescape") if not _IS_PY2 else s)
+        h.update(b"\0")
+
+    return h.hexdigest()
+
+
+def _shell_disk_lookup(kconf, command):
+    # Returns the cached (stdout, stderr) tuple for 'command' from the
+    # KCONFIG_SHELL_CACHE file, or None if the persistent cache is disabled or
+    # has no entry for it
+
+    path = os.getenv("KCONFIG_SHELL_CACHE")
+    if not path:
+        return None
+
+    if kconf._shell_disk_cache is None:
+        import json
+
+        try:
+            with open(path) as f:
+                kconf._shell_disk_cache = json.load(f)
+        except (EnvironmentError, ValueError):
+            # Missing or corrupt. Start over.
+            kconf._shell_disk_cache = {}
+
+    key = _shell_disk_key(kconf, command)
+    res = kconf._shell_disk_cache.get(key)
+    if not res:
+        return None
+
+    kconf._shell_disk_used.add(key)
+    return tuple(res)
+
+
+def _shell_disk_store(kconf, command, res):
+    # Adds the (stdout, stderr) tuple 'res' for 'command' to the persistent
+    # cache, if enabled. The file is written once parsing is done.
+
+    if kconf._shell_disk_cache is not None:
+        key = _shell_disk_key(kconf, command)
+        kconf._shell_disk_cache[key] = res
+        kconf._shell_disk_used.add(key)
+        kconf._shell_disk_cache_dirty = True
+
+
+def _save_shell_disk_cache(kconf):
+    # Writes the persistent $(shell,...) cache to KCONFIG_SHELL_CACHE, keeping
+    # only the entries used by this run. Entries for other environments and
+    # for commands that are no longer run would otherwise pile up forever.
+
+    kconf._shell_disk_cache = dict(
+        (key, kconf._shell_disk_cache[key]) for key in kconf._shell_disk_used)
+
+    _write_json_cache(os.getenv("KCONFIG_SHELL_CACHE"),
+                      kconf._shell_disk_cache)
+
+    kconf._shell_disk_cache_dirty = False
+
+
+def _write_json_cache(path, data):
+    # Writes 'data' as JSON to the cache file 'path'. A temporary file is
+    # renamed over the old one, so that concurrent runs never see a partially
+    # written file. Errors are ignored, as the caches are just an
+    # optimization.
+
+    import json
+
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+
+    try:
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            (os.replace if hasattr(os, "replace") else os.rename)(tmp_path,
+                                                                  path)
+        finally:
+            # Left behind if writing or renaming failed
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except EnvironmentError:
+        pass
+
+
+def _warn_undef_enabled():
+    # True if warnings for references to undefined symbols are enabled
+
+    # KCONFIG_STRICT is an older alias for KCONFIG_WARN_UNDEF, supported for
+    # backwards compatibility
+    return os.getenv("KCONFIG_WARN_UNDEF") == "y" or \
+           os.getenv("KCONFIG_STRICT") == "y"
+
+
+def _tree_fingerprint(kconf):
+    # Returns a hash identifying the parsed Kconfig tree of 'kconf' for the
+    # KCONFIG_CHECK_CACHE file, or None if some Kconfig file can't be read.
+    #
+    # Covers the Kconfiglib version, the contents of all Kconfig files (in the
+    # order they were sourced), the values of the environment variables
+    # referenced in them, and the output of all $(shell,...) commands, which
+    # is everything the parsed tree depends on except for Python preprocessor
+    # functions.
+
+    import hashlib
+
+    h = hashlib.sha256()
+
+    def add(s):
+        h.update(s.encode("utf-8", "surrogateescape") if not _IS_PY2 else s)
+        h.update(b"\0")
+
+    add(repr((VERSION, _CHECK_CACHE_VERSION, _warn_undef_enabled())))
+    add(kconf.srctree)
+
+    digests = {}
+    for filename in kconf.kconfig_filenames:
+        if filename not in digests:
+            try:
+                with open(join(kconf.srctree, filename), "rb") as f:
+                    digests[filename] = hashlib.sha256(f.read()).hexdigest()
+            except EnvironmentError:
+                return None
+
+        add(filename)
+        add(digests[filename])
+
+    for name in sorted(kconf.env_vars):
+        add("{}={}".format(name, os.environ.get(name, "")))
+
+    for command in sorted(kconf._shell_cache):
+        add(command)
+        add("\0".join(kconf._shell_cache[command]))
+
+    return h.hexdigest()
+
+
+def _load_check_cache(path, fingerprint):
+    # Returns the list of cached warnings from the KCONFIG_CHECK_CACHE file at
+    # 'path', or None if it's missing, unreadable, or for a different tree
+
+    import json
+
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (EnvironmentError, ValueError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get("fingerprint") != fingerprint:
+        return None
+
+    return cache.get("warnings")
+
+
+def _save_check_cache(path, fingerprint, warnings):
+    # Writes the KCONFIG_CHECK_CACHE file
+
+    _write_json_cache(path, {"fingerprint": fingerprint, "warnings": warnings})
+
 #
 # Global constants
 #
 
+# Bump this when the checks in Kconfig._run_tree_checks() change, to
+# invalidate KCONFIG_CHECK_CACHE files from older versions
+_CHECK_CACHE_VERSION = 1
+
 TRI_TO_STR = {
     0: "n",
     1: "m",
@@ -6822,14 +7810,32 @@ STR_TO_TRI = {
     "y": 2,
 }
 
+# Environment variables that can affect the output of any $(shell,...)
+# command, even when they aren't referenced from the Kconfig files. Included in
+# the KCONFIG_SHELL_CACHE keys, together with the referenced variables.
+_SHELL_CACHE_ENV_VARS = frozenset({
+    "LANG",
+    "LC_ALL",
+    "LC_CTYPE",
+    "LC_MESSAGES",
+    "PATH",
+})
+
 # Constant representing that there's no cached choice selection. This is
 # distinct from a cached None (no selection). Any object that's not None or a
 # Symbol will do. We test this with 'is'.
 _NO_CACHED_SELECTION = 0
 
+# Bumped whenever the format of the auto.conf snapshot changes. See
+# Kconfig._write_old_vals_snapshot().
+_SNAPSHOT_VERSION = 1
+
 # Are we running on Python 2?
 _IS_PY2 = sys.version_info[0] < 3
 
+# String interning. intern() is a builtin on Python 2.
+_intern = intern if _IS_PY2 else sys.intern
+
 try:
     _UNAME_RELEASE = os.uname()[2]
 except AttributeError:
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+
+# SPDX-License-Identifier: ISC
+
+"""
+Long-lived Kconfig server. Parses the Kconfig files once and then answers
+requests over a Unix domain socket, which avoids the Python startup and
+Kconfig parsing costs of running a separate tool for each small query or
+change.
+
+Sample usage:
+
+  $ kconfigserver.py --socket /tmp/kconfig.sock &
+  $ kconfigserver.py --socket /tmp/kconfig.sock --send \\
+        '{"cmd": "set", "values": {"FOO": "y", "BAR_BITS": "8"}}'
+  $ echo '{"cmd": "get", "names": ["FOO"]}' | nc -U /tmp/kconfig.sock
+
+Requests and responses are JSON objects, one per line. Several requests can
+be sent over the same connection. Each response has an "ok" key, which is
+true if the request succeeded. Failed requests have an "error" key with an
+error message. Warnings generated while handling a request are returned in a
+"warnings" list.
+
+Requests (the "cmd" key selects the request type):
+
+  {"cmd": "get", "names": [<name>, ...]}
+    Returns {"values": {<name>: <value>, ...}}, with the string values of the
+    symbols. Undefined symbols get a value of null.
+
+  {"cmd": "set", "values": {<name>: <value>, ...}, "replace": <bool>}
+    Assigns user values, like setconfig.py. "replace" is optional (default:
+    false). If true, all other user values are removed first. Returns
+    {"problems": [[<name>, <value>, <message>], ...]} with assignments that
+    didn't take (see Kconfig.set_values()).
+
+  {"cmd": "eval", "expr": <expression>}
+    Evaluates an expression, e.g. "FOO && BAR", like Kconfig.eval_string().
+    Returns {"value": "n"/"m"/"y"}.
+
+  {"cmd": "load_config", "filename": <filename>, "replace": <bool>}
+  {"cmd": "write_config", "filename": <filename>}
+  {"cmd": "write_min_config", "filename": <filename>}
+  {"cmd": "write_autoconf", "filename": <filename>}
+    Call the Kconfig methods with the same names. "filename" is optional for
+    all except write_min_config, and defaults as for the Kconfig methods
+    (KCONFIG_CONFIG or '.config' for the configuration file). Relative paths
+    are relative to the working directory of the server. Returns
+    {"message": <message>}.
+
+  {"cmd": "reload"}
+    Reparses the Kconfig files.
+
+  {"cmd": "shutdown"}
+    Stops the server.
+
+Before each request, the modification times and sizes of all Kconfig files
+are checked, and the Kconfig files are reparsed if any of them changed. User
+values are carried over to the new tree.
+
+The socket is only accessible by the user running the server. Requests are
+handled one at a time.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=__doc__)
+
+    parser.add_argument(
+        "--socket",
+        required=True,
+        help="Path of the Unix domain socket to listen on (or connect to, "
+             "with --send)")
+
+    parser.add_argument(
+        "--send",
+        metavar="REQUEST",
+        help="Instead of starting a server, send the JSON request REQUEST to "
+             "a running server and print the response. The exit status is 1 "
+             "if the request failed.")
+
+    parser.add_argument(
+        "--kconfig",
+        default="Kconfig",
+        help="Top-level Kconfig file (default: Kconfig)")
+
+    parser.add_argument(
+        "--load-config",
+        action="store_true",
+        help="Load the configuration file (KCONFIG_CONFIG or '.config') at "
+             "startup")
+
+    args = parser.parse_args()
+
+    if args.send is not None:
+        sys.exit(_send(args.socket, args.send))
+
+    _serve(args)
+
+
+def _send(path, request):
+    # Sends 'request' to the server listening on 'path' and prints the
+    # response. Returns the exit status. This path does not import kconfiglib,
+    # to keep startup fast.
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except EnvironmentError as e:
+        return "error: failed to connect to '{}': {}".format(path, e.strerror)
+
+    with sock, sock.makefile("r") as rfile, sock.makefile("w") as wfile:
+        wfile.write(request.strip() + "\n")
+        wfile.flush()
+        response = rfile.readline()
+
+    if not response:
+        return "error: no response from server"
+
+    print(response, end="")
+
+    try:
+        return 0 if json.loads(response).get("ok") else 1
+    except ValueError:
+        return 1
+
+
+def _serve(args):
+    import kconfiglib
+
+    server = _KconfigServer(args.kconfig, args.load_config)
+
+    if os.path.exists(args.socket):
+        # Remove stale sockets from servers that didn't shut down cleanly, but
+        # don't steal the socket of a running server
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(args.socket)
+        except EnvironmentError:
+            os.remove(args.socket)
+        else:
+            probe.close()
+            sys.exit("error: a server is already listening on '{}'"
+                     .format(args.socket))
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        listener.bind(args.socket)
+    finally:
+        os.umask(old_umask)
+    listener.listen(16)
+
+    print("Listening on {} (Kconfiglib {})"
+          .format(args.socket, ".".join(map(str, kconfiglib.VERSION))))
+    sys.stdout.flush()
+
+    try:
+        while not server.shutdown:
+            conn, _ = listener.accept()
+            _handle_connection(server, conn)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        os.remove(args.socket)
+
+
+def _handle_connection(server, conn):
+    # Answers the requests sent over 'conn' until the client disconnects or
+    # the server is shut down. Errors on the connection (e.g. a client that
+    # disconnects in the middle of a response) only drop that client.
+
+    try:
+        # Separate files for reading and writing, as writing to a "rw" text
+        # file throws away buffered input (pipelined requests)
+        with conn, conn.makefile("r") as rfile, conn.makefile("w") as wfile:
+            for line in rfile:
+                if not line.strip():
+                    continue
+
+                wfile.write(json.dumps(server.handle_line(line)) + "\n")
+                wfile.flush()
+
+                if server.shutdown:
+                    break
+    except (EnvironmentError, UnicodeDecodeError):
+        pass
+
+
+class _KconfigServer(object):
+    # Holds the parsed Kconfig tree and handles requests
+
+    def __init__(self, kconfig_filename, load_config):
+        self.kconfig_filename = kconfig_filename
+        self.shutdown = False
+
+        self.kconf = None
+        self._load()
+
+        if load_config:
+            self.kconf.load_config()
+
+    def _load(self):
+        # (Re)parses the Kconfig files, carrying over user values from the
+        # old tree, if any
+
+        import kconfiglib
+
+        old_kconf = self.kconf
+
+        # Parsing errors at startup exit the server. Later, they're returned
+        # as errors for the request, and the old tree is kept.
+        self.kconf = kconfiglib.Kconfig(self.kconfig_filename,
+                                        warn_to_stderr=False,
+                                        suppress_traceback=not old_kconf,
+                                        lazy_help=True)
+        self.file_stats = self._kconfig_file_stats()
+
+        if old_kconf:
+            values = {}
+            for sym in old_kconf.unique_defined_syms:
+                if sym.user_value is not None:
+                    values[sym.name] = sym.user_value
+
+            # Choice selections are user values of the choice symbols
+            for choice in old_kconf.unique_choices:
+                if choice.user_selection and choice.user_selection.name:
+                    values[choice.user_selection.name] = 2
+
+            self.kconf.set_values(values)
+
+    def _kconfig_file_stats(self):
+        # Returns a dict that maps the paths of all Kconfig files to
+        # (modification time, size) tuples, or None for files that can't be
+        # stat()ed
+
+        stats = {}
+        for filename in self.kconf.kconfig_filenames:
+            path = os.path.join(self.kconf.srctree, filename)
+            if path not in stats:
+                try:
+                    st = os.stat(path)
+                    stats[path] = (st.st_mtime, st.st_size)
+                except EnvironmentError:
+                    stats[path] = None
+
+        return stats
+
+    def _kconfig_files_changed(self):
+        for path, old_stat in self.file_stats.items():
+            try:
+                st = os.stat(path)
+                new_stat = (st.st_mtime, st.st_size)
+            except EnvironmentError:
+                new_stat = None
+
+            if new_stat != old_stat:
+                return True
+
+        return False
+
+    def handle_line(self, line):
+        # Handles a single request line and returns the response as a dict
+
+        import kconfiglib
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+
+            handler = _HANDLERS.get(request.get("cmd"))
+            if not handler:
+                raise ValueError("unknown command {!r}"
+                                 .format(request.get("cmd")))
+
+            # 'reload' reparses anyway, and 'shutdown' should work even if the
+            # Kconfig files have been changed into something unparsable
+            if handler not in (_KconfigServer._reload,
+                               _KconfigServer._shutdown) and \
+               self._kconfig_files_changed():
+                self._load()
+
+            self.kconf.warnings = []
+
+            response = handler(self, request)
+            response["ok"] = True
+
+        except (ValueError, TypeError, KeyError, EnvironmentError,
+                kconfiglib.KconfigError) as e:
+            response = {"ok": False, "error": str(e)}
+
+        except Exception as e:
+            # A bug triggered by a request shouldn't kill the server
+            response = {"ok": False,
+                        "error": "internal error: {}: {}"
+                                 .format(type(e).__name__, e)}
+
+        if self.kconf and self.kconf.warnings:
+            response["warnings"] = self.kconf.warnings
+            self.kconf.warnings = []
+
+        return response
+
+    def _get(self, request):
+        syms = self.kconf.syms
+
+        values = {}
+        for name in _str_list(request, "names"):
+            sym = syms.get(name)
+            values[name] = sym.str_value if sym and sym.nodes else None
+
+        return {"values": values}
+
+    def _set(self, request):
+        problems = self.kconf.set_values(_values(request),
+                                         _bool(request, "replace", False))
+
+        return {"problems": [list(problem) for problem in problems]}
+
+    def _eval(self, request):
+        import kconfiglib
+
+        return {"value": kconfiglib.TRI_TO_STR[
+            self.kconf.eval_string(_str(request, "expr"))]}
+
+    def _load_config(self, request):
+        return {"message": self.kconf.load_config(
+            _str(request, "filename", None), _bool(request, "replace", True))}
+
+    def _write_config(self, request):
+        return {"message": self.kconf.write_config(
+            _str(request, "filename", None))}
+
+    def _write_min_config(self, request):
+        return {"message": self.kconf.write_min_config(
+            _str(request, "filename"))}
+
+    def _write_autoconf(self, request):
+        return {"message": self.kconf.write_autoconf(
+            _str(request, "filename", None))}
+
+    def _reload(self, request):
+        self._load()
+        return {}
+
+    def _shutdown(self, request):
+        self.shutdown = True
+        return {}
+
+
+# Helpers for checking the types of request fields. Mistyped fields are
+# reported as errors for the request instead of reaching Kconfiglib.
+
+_REQUIRED = object()
+
+# json.loads() returns 'unicode' strings on Python 2
+_STR_TYPES = (str, type(u""))
+
+
+def _field(request, key, default):
+    if key in request:
+        return request[key]
+
+    if default is _REQUIRED:
+        raise KeyError("missing field {!r}".format(key))
+
+    return default
+
+
+def _str(request, key, default=_REQUIRED):
+    value = _field(request, key, default)
+    if value is not default and not isinstance(value, _STR_TYPES):
+        raise TypeError("{!r} must be a string".format(key))
+
+    return value
+
+
+def _bool(request, key, default):
+    value = _field(request, key, default)
+    if not isinstance(value, bool):
+        raise TypeError("{!r} must be true or false".format(key))
+
+    return value
+
+
+def _str_list(request, key):
+    value = _field(request, key, _REQUIRED)
+    if not isinstance(value, list) or \
+       not all(isinstance(name, _STR_TYPES) for name in value):
+        raise TypeError("{!r} must be a list of strings".format(key))
+
+    return value
+
+
+def _values(request):
+    # Values are strings, or 0/1/2 for bool and tristate symbols, as for
+    # Symbol.set_value()
+    values = _field(request, "values", _REQUIRED)
+    if not isinstance(values, dict):
+        raise TypeError("'values' must be an object")
+
+    for name, value in values.items():
+        if not isinstance(value, _STR_TYPES) and \
+           (isinstance(value, bool) or value not in (0, 1, 2)):
+            raise TypeError("invalid value for {}: {!r}".format(name, value))
+
+    return values
+
+
+_HANDLERS = {
+    "get":              _KconfigServer._get,
+    "set":              _KconfigServer._set,
+    "eval":             _KconfigServer._eval,
+    "load_config":      _KconfigServer._load_config,
+    "write_config":     _KconfigServer._write_config,
+    "write_min_config": _KconfigServer._write_min_config,
+    "write_autoconf":   _KconfigServer._write_autoconf,
+    "reload":           _KconfigServer._reload,
+    "shutdown":         _KconfigServer._shutdown,
+}
+
+
+if __name__ == "__main__":
+    main()
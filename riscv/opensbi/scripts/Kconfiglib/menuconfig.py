@@ -215,6 +215,8 @@ import locale
 import re
 import textwrap
 
+from bisect import bisect_right
+
 from kconfiglib import Symbol, Choice, MENU, COMMENT, MenuNode, \
                        BOOL, TRISTATE, STRING, INT, HEX, \
                        AND, OR, \
@@ -275,8 +277,9 @@ _JUMP_TO_HELP_LINES = """
 Type text to narrow the search. Regexes are supported (via Python's 're'
 module). The up/down cursor keys step in the list. [Enter] jumps to the
 selected symbol. [ESC] aborts the search. Type multiple space-separated
-strings/regexes to find entries that match all of them. Type Ctrl-F to
-view the help of the selected item without leaving the dialog.
+strings/regexes to find entries that match all of them. Entries that only
+match in their help text are listed last. Type Ctrl-F to view the help of
+the selected item without leaving the dialog.
 """[1:-1].split("\n")
 
 #
@@ -2082,48 +2085,14 @@ def _jump_to_dialog():
                 # matches anywhere in the string.
                 #
                 # It's not horrible either way. Just a bit smoother.
-                regex_searches = [re.compile(regex).search
-                                  for regex in s.lower().split()]
+                #
+                # The search itself goes through _jump_to_index(), which
+                # narrows down earlier results when possible.
+                matches = _jump_to_index().search(s.lower().split())
 
                 # No exception thrown, so the regexes are okay
                 bad_re = None
 
-                # List of matching nodes
-                matches = []
-                add_match = matches.append
-
-                # Search symbols and choices
-
-                for node in _sorted_sc_nodes():
-                    # Symbol/choice
-                    sc = node.item
-
-                    for search in regex_searches:
-                        # Both the name and the prompt might be missing, since
-                        # we're searching both symbols and choices
-
-                        # Does the regex match either the symbol name or the
-                        # prompt (if any)?
-                        if not (sc.name and search(sc.name.lower()) or
-                                node.prompt and search(node.prompt[0].lower())):
-
-                            # Give up on the first regex that doesn't match, to
-                            # speed things up a bit when multiple regexes are
-                            # entered
-                            break
-
-                    else:
-                        add_match(node)
-
-                # Search menus and comments
-
-                for node in _sorted_menu_comment_nodes():
-                    for search in regex_searches:
-                        if not search(node.prompt[0].lower()):
-                            break
-                    else:
-                        add_match(node)
-
             except re.error as e:
                 # Bad regex. Remember the error message so we can show it.
                 bad_re = "Bad regular expression"
@@ -2241,6 +2210,224 @@ def _sorted_menu_comment_nodes(cached_nodes=[]):
     return cached_nodes
 
 
+def _jump_to_index(cached_index=[]):
+    # Returns the _JumpToIndex used by the jump-to dialog. It is built the
+    # first time the dialog is opened, and then reused, since the Kconfig tree
+    # (and hence the set of searchable nodes) never changes.
+
+    if not cached_index:
+        cached_index.append(_JumpToIndex(_sorted_sc_nodes() +
+                                         _sorted_menu_comment_nodes()))
+
+    return cached_index[0]
+
+
+class _JumpToIndex(object):
+    # Search index for the jump-to dialog.
+    #
+    # Each searchable node gets an index into 'nodes', and the lowercased
+    # name (symbols and choices only), prompt, and help text of each node are
+    # stored once up front, instead of being lowercased again on each
+    # keystroke.
+    #
+    # The names and prompts are also concatenated into one large string, as
+    # are the help texts, with 'starts' arrays giving the offset of each node
+    # in them. Plain strings (the common case) are looked up in these with
+    # str.find(), which is a lot faster than looking at each node in turn.
+    #
+    # The set of nodes matching each search string is remembered. When a
+    # plain search string is extended (e.g. 'usb' -> 'usb_h'), only the nodes
+    # that matched the shorter string need to be looked at, and deleting
+    # characters just brings back an earlier result.
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+        # (name, prompt, help) for each node, lowercased. None for a missing
+        # name/prompt/help.
+        self.fields = []
+
+        name_prompt_parts = []
+        help_parts = []
+
+        for node in nodes:
+            if node.item.__class__ in (Symbol, Choice):
+                name = node.item.name.lower() if node.item.name else None
+                help_ = node.help.lower() if node.help else None
+            else:
+                # Menus and comments only have prompts
+                name = help_ = None
+
+            prompt = node.prompt[0].lower() if node.prompt else None
+
+            self.fields.append((name, prompt, help_))
+
+            # Search strings never contain newlines (the search text is
+            # split on whitespace), so a match can never span fields
+            name_prompt_parts.append("{}\n{}\n".format(name or "",
+                                                        prompt or ""))
+            help_parts.append((help_ or "") + "\n")
+
+        self.name_prompt_text, self.name_prompt_starts = \
+            _join_with_starts(name_prompt_parts)
+
+        self.help_text, self.help_starts = _join_with_starts(help_parts)
+
+        # Maps search strings to (name_prompt_matches, all_matches) tuples
+        # with sets of node indices, where 'all_matches' includes nodes that
+        # only match in their help text
+        self.word_cache = {}
+
+    def search(self, words):
+        # Returns a list of nodes matching all search strings in 'words'.
+        # Nodes where all strings match the name or the prompt come first, in
+        # the original order. Nodes where some string only matches in the help
+        # text come after them. Raises re.error for invalid regexes.
+
+        if not words:
+            return self.nodes[:]
+
+        # Look up all strings first, so that invalid regexes raise re.error
+        # before anything else happens. Start intersecting with the smallest
+        # set.
+        word_matches = sorted((self._word_matches(word) for word in words),
+                              key=lambda matches: len(matches[1]))
+
+        name_prompt_matches = set(word_matches[0][0])
+        all_matches = set(word_matches[0][1])
+        for word_name_prompt_matches, word_all_matches in word_matches[1:]:
+            name_prompt_matches &= word_name_prompt_matches
+            all_matches &= word_all_matches
+
+        nodes = self.nodes
+        return [nodes[i] for i in sorted(name_prompt_matches)] + \
+               [nodes[i] for i in sorted(all_matches - name_prompt_matches)]
+
+    def _word_matches(self, word):
+        # Returns the (name_prompt_matches, all_matches) tuple for the single
+        # search string (regex) 'word'
+
+        cache = self.word_cache
+        if word in cache:
+            return cache[word]
+
+        if len(cache) > 1000:
+            # Just start over if the cache gets large, to limit memory usage
+            cache.clear()
+
+        if _is_plain_search(word):
+            # Narrow down the results for the most specific cached plain
+            # string contained in 'word', if any
+            base = None
+            for cached_word, cached_matches in cache.items():
+                if cached_word in word and _is_plain_search(cached_word) and \
+                   (base is None or len(cached_matches[1]) < len(base[1])):
+                    base = cached_matches
+
+            if base is None:
+                res = self._find_plain(word)
+            else:
+                res = self._narrow_plain(word, base[1])
+        else:
+            res = self._find_regex(re.compile(word).search)
+
+        cache[word] = res
+        return res
+
+    def _find_plain(self, word):
+        # Looks up the plain string 'word' in all nodes
+
+        name_prompt_matches = _find_all(self.name_prompt_text,
+                                        self.name_prompt_starts, word)
+
+        return (name_prompt_matches,
+                name_prompt_matches |
+                _find_all(self.help_text, self.help_starts, word))
+
+    def _narrow_plain(self, word, candidates):
+        # Looks up the plain string 'word' in the nodes with the indices in
+        # 'candidates', which must include all nodes that can match
+
+        name_prompt_matches = set()
+        all_matches = set()
+
+        fields = self.fields
+        for i in candidates:
+            name, prompt, help_ = fields[i]
+
+            if name and word in name or prompt and word in prompt:
+                name_prompt_matches.add(i)
+                all_matches.add(i)
+            elif help_ and word in help_:
+                all_matches.add(i)
+
+        return name_prompt_matches, all_matches
+
+    def _find_regex(self, search):
+        # Looks up a regex in all nodes. 'search' is the search() method of
+        # the compiled regex.
+        #
+        # There's no narrowing for regexes, as extending a regex can make it
+        # match more things (e.g. 'a' -> 'a|b').
+
+        name_prompt_matches = set()
+        all_matches = set()
+
+        for i, (name, prompt, help_) in enumerate(self.fields):
+            # Both the name and the prompt might be missing, since we're
+            # searching both symbols and choices, and menus and comments
+            if name and search(name) or prompt and search(prompt):
+                name_prompt_matches.add(i)
+                all_matches.add(i)
+            elif help_ and search(help_):
+                all_matches.add(i)
+
+        return name_prompt_matches, all_matches
+
+
+def _join_with_starts(parts):
+    # Joins the strings in 'parts' into a single string. Returns a tuple with
+    # the string and a list of the offsets of the parts within it, with the
+    # length of the string appended to mark the end.
+
+    starts = []
+    offset = 0
+    for part in parts:
+        starts.append(offset)
+        offset += len(part)
+    starts.append(offset)
+
+    return "".join(parts), starts
+
+
+def _find_all(text, starts, word):
+    # Returns a set with the indices of all parts of 'text' (see
+    # _join_with_starts()) that contain 'word'
+
+    res = set()
+
+    find = text.find
+    i = find(word)
+    while i != -1:
+        part_i = bisect_right(starts, i) - 1
+        res.add(part_i)
+        # Skip ahead to the next part
+        i = find(word, starts[part_i + 1])
+
+    return res
+
+
+def _is_plain_search(word):
+    # True if the search string 'word' contains no special regex characters,
+    # meaning it matches exactly the strings that contain it
+
+    return not _REGEX_SPECIAL_CHARS.intersection(word)
+
+
+# Characters with a special meaning in regexes, for _is_plain_search()
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
 def _resize_jump_to_dialog(edit_box, matches_win, bot_sep_win, help_win,
                            sel_node_i, scroll):
     # Resizes the jump-to dialog to fill the terminal.
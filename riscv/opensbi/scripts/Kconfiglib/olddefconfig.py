@@ -19,7 +19,7 @@ import kconfiglib
 
 
 def main():
-    kconf = kconfiglib.standard_kconfig(__doc__)
+    kconf = kconfiglib.standard_kconfig(__doc__, lazy_help=True)
     print(kconf.load_config())
     print(kconf.write_config())
 
@@ -32,6 +32,12 @@ def main():
         default="Kconfig",
         help="Top-level Kconfig file (default: Kconfig)")
 
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Always run the sanity checks on the Kconfig files, ignoring "
+             "KCONFIG_CHECK_CACHE")
+
     parser.add_argument(
         "--out",
         metavar="MINIMAL_CONFIGURATION",
@@ -40,7 +46,8 @@ def main():
 
     args = parser.parse_args()
 
-    kconf = kconfiglib.Kconfig(args.kconfig, suppress_traceback=True)
+    kconf = kconfiglib.Kconfig(args.kconfig, suppress_traceback=True,
+                               lazy_help=True, force_checks=args.strict)
     print(kconf.load_config())
     print(kconf.write_min_config(args.out))
 
@@ -0,0 +1,72 @@
+# Tests for the output and caching behavior of kconfiglib. Run with pytest
+# from this directory.
+
+import kconfiglib
+
+
+def _kconfig(tmp_path, text, **kwargs):
+    path = tmp_path / "Kconfig"
+    path.write_text(text)
+    return kconfiglib.Kconfig(str(path), warn_to_stderr=False, **kwargs)
+
+
+def test_write_config_header_change(tmp_path):
+    kconf = _kconfig(tmp_path, 'config FOO\n\tbool "foo"\n\tdefault y\n')
+    config = str(tmp_path / ".config")
+
+    kconf.config_header = "# first\n"
+    kconf.write_config(config)
+    assert open(config).read().startswith("# first\n")
+
+    # Symbol values are the same, but the header is not
+    kconf.config_header = "# second\n"
+    assert kconf.write_config(config).startswith("Configuration saved")
+    assert open(config).read().startswith("# second\n")
+
+    assert kconf.write_config(config).startswith("No change")
+
+
+def test_reassigned_expressions_are_honored(tmp_path):
+    text = 'config FOO\n\tbool "foo"\n\tdefault y\n'
+    kconf = _kconfig(tmp_path, text)
+    foo = kconf.syms["FOO"]
+
+    foo.defaults = []
+    assert foo.str_value == "n"
+
+    # The compiled tree is frozen after parsing
+    kconf = _kconfig(tmp_path, text, compile_exprs=True)
+    foo = kconf.syms["FOO"]
+
+    foo.defaults = []
+    assert foo.str_value == "y"
+
+
+def test_shell_cache_ignores_unrelated_environment(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KCONFIG_SHELL_CACHE", str(tmp_path / "shell-cache"))
+    monkeypatch.setenv("FOO", "y")
+    # The shell reads $FOO itself. The preprocessor assignment references it.
+    text = ('foo := $(FOO)\n'
+            'config BAR\n\tbool "bar"\n'
+            '\tdefault $(shell,echo >>runs; echo $FOO)\n')
+
+    def parse():
+        return _kconfig(tmp_path, text).syms["BAR"].str_value
+
+    def runs():
+        return len(open("runs").read().splitlines())
+
+    assert parse() == "y"
+    assert runs() == 1
+
+    # Not referenced from the Kconfig files, so the cached output is used
+    monkeypatch.setenv("SHLVL", "42")
+    monkeypatch.setenv("TERM", "dumb")
+    assert parse() == "y"
+    assert runs() == 1
+
+    # Referenced from the Kconfig files, so the command is run again
+    monkeypatch.setenv("FOO", "n")
+    assert parse() == "n"
+    assert runs() == 2